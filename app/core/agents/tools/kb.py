@@ -5,8 +5,10 @@ from loguru import logger
 from pydantic import BaseModel, Field
 
 from agents import RunContextWrapper
-from app.core.connectors.milvus import MilvusSearch
-from app.core.pdf_uploader.embedder import AsyncEmbedder
+from app.core.connectors.milvus import filter_expr
+from app.core.fusion import FusionName
+from app.core.search_cache import hybrid_search_hits
+from app.rag.schemas import SearchFilters
 
 
 class Arguments(BaseModel):
@@ -18,51 +20,67 @@ class Arguments(BaseModel):
 	dense_weight: float = Field(
 		0.5, description="Weight for dense search results (0.0 to 1.0)"
 	)
+	file_ids: list[str] = Field(
+		default_factory=list, description="Only search these documents (file ids)"
+	)
+	filenames: list[str] = Field(
+		default_factory=list, description="Only search documents with these filenames"
+	)
+	titles: list[str] = Field(
+		default_factory=list, description="Only search documents with these titles"
+	)
+	page_from: int | None = Field(
+		None, description="Only search from this page number on (inclusive)"
+	)
+	page_to: int | None = Field(
+		None, description="Only search up to this page number (inclusive)"
+	)
+	fusion: FusionName = Field(
+		"weighted",
+		description="How to merge the dense and keyword results: "
+		"'weighted' (uses the weights) or 'rrf' (rank-based)",
+	)
+	mmr_lambda: float | None = Field(
+		None,
+		ge=0,
+		le=1,
+		description="Set (e.g. 0.7) to skip near-duplicate chunks; "
+		"1.0 ranks by relevance only",
+	)
 
 
 async def kb_retrieve(ctx: RunContextWrapper[Any], args: str) -> str:
 	try:
 		parsed = Arguments.model_validate_json(args)
-		embedder = AsyncEmbedder()
-		milvus = MilvusSearch()
 
 		logger.debug(
 			f"Query: {parsed.query}, top_k: {parsed.top_k},"
 			f" sparse_weight: {parsed.sparse_weight}, "
 			f"dense_weight: {parsed.dense_weight}"
 		)
-
-		# Embed the query
-		vectors = await embedder.encode([parsed.query])
-
-		if not vectors:
-			return "[]"
-		query_vec = vectors[0]
-
-		logger.debug(f"Query vector length: {len(query_vec)}")
 		logger.info("Performing hybrid search in Milvus")
 
-		raw = milvus.search(
-			query=parsed.query,
-			dense_embedding=query_vec,
-			expr="",
+		hits = await hybrid_search_hits(
+			parsed.query,
 			dense_weight=parsed.dense_weight,
 			sparse_weight=parsed.sparse_weight,
-			limit=parsed.top_k,
+			top_k=parsed.top_k,
+			expr=filter_expr(
+				SearchFilters(
+					file_ids=parsed.file_ids,
+					filenames=parsed.filenames,
+					titles=parsed.titles,
+					page_from=parsed.page_from,
+					page_to=parsed.page_to,
+				)
+			),
+			fusion=parsed.fusion,
+			mmr_lambda=parsed.mmr_lambda,
 		)
 
-		# Normalize Milvus response into a list of hit dicts
-		hits = []
-		if isinstance(raw, dict):
-			maybe_hits = raw.get("data")
-			if isinstance(maybe_hits, list):
-				hits = [h for h in maybe_hits if isinstance(h, dict)]
-		elif isinstance(raw, list):
-			hits = [h for h in raw if isinstance(h, dict)]  # type: ignore
-
 		# Build items to return as JSON
 		items = []
-		for h in hits[: parsed.top_k]:
+		for h in hits:
 			text_val = h.get("text")
 			if text_val is None:
 				text_val = ""
@@ -71,8 +89,8 @@ async def kb_retrieve(ctx: RunContextWrapper[Any], args: str) -> str:
 					"text": str(text_val),
 					"source": h.get("source", "not provided"),
 					"file_id": h.get("file_id", ""),
-					"page": h.get("page", None),
-					"chunk_index": h.get("chunk_index", None),
+					"page": h.get("page_idx", None),
+					"chunk_index": h.get("chunk_idx", None),
 					"filename": h.get("filename", "not provided"),
 					"score": h.get("distance", None),
 				}
@@ -0,0 +1,527 @@
+import asyncio
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from loguru import logger
+
+from app.core.connectors.milvus import MilvusInsert, MilvusSearch
+from app.core.connectors.milvus_http import dumps, loads
+from app.core.connectors.search_profiles import SearchProfile
+from app.core.fusion import fuse
+from app.core.metrics import SEARCH_REQUESTS, observe
+from app.rag.schemas import EmbeddedChunk
+from app.settings import Settings
+
+# scalar fields kept next to each vector (the Milvus collection schema)
+FIELDS = ("file_id", "filename", "title", "page_idx", "chunk_idx", "source", "text")
+
+# Milvus BM25 defaults (bm25_k1, bm25_b) and its standard analyzer, roughly
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_TOKEN_RE = re.compile(r"\w+")
+
+_CLAUSE_RE = re.compile(r"\s*(\w+)\s*(==|!=|>=|<=|>|<|not\s+in\b|in\b)\s*")
+_AND_RE = re.compile(r"\s*and\s+|\s*$")
+
+
+def tokenize(text: str) -> list[str]:
+	return _TOKEN_RE.findall(text.lower())
+
+
+def parse_filter(expr: str) -> list[tuple[str, str, Any]]:
+	"""
+	Parses the subset of Milvus boolean expressions the app writes: clauses
+	`field op literal` joined by `and`, where op is a comparison, `in` or
+	`not in` and the literal is JSON (string, number or list).
+	"""
+	clauses: list[tuple[str, str, Any]] = []
+	decoder = json.JSONDecoder()
+	expr, pos = expr.strip(), 0
+	while pos < len(expr):
+		m = _CLAUSE_RE.match(expr, pos)
+		if m is None:
+			raise ValueError(f"Unsupported filter expression: {expr!r}")
+		field, op = m.group(1), " ".join(m.group(2).split())
+		try:
+			value, pos = decoder.raw_decode(expr, m.end())
+		except json.JSONDecodeError as e:
+			raise ValueError(f"Unsupported filter expression: {expr!r}") from e
+		if field not in FIELDS and field != "chunk_id":
+			raise ValueError(f"Unknown filter field {field!r} in {expr!r}")
+		clauses.append((field, op, value))
+		sep = _AND_RE.match(expr, pos)
+		if sep is None:
+			raise ValueError(f"Unsupported filter expression: {expr!r}")
+		pos = sep.end()
+	return clauses
+
+
+def _matches(op: str, actual: Any, value: Any) -> bool:
+	if op == "in":
+		return actual in value
+	if op == "not in":
+		return actual not in value
+	if op == "==":
+		return actual == value
+	if op == "!=":
+		return actual != value
+	if op == ">=":
+		return actual >= value
+	if op == "<=":
+		return actual <= value
+	if op == ">":
+		return actual > value
+	return actual < value
+
+
+def _cosine_score(similarity: np.ndarray) -> np.ndarray:
+	return (1 + similarity) * 0.5
+
+
+def _bm25_score(score: np.ndarray) -> np.ndarray:
+	return 2 * np.arctan(score) / math.pi
+
+
+class EmbeddedStore:
+	"""
+	In-process stand-in for the Milvus collection, for tests and single-node
+	deployments:
+
+	- dense: float32 matrix of unit vectors, exact cosine top-k with NumPy;
+	- sparse: inverted index over the chunk texts, scored with BM25;
+	- fusion: the rerankers of Milvus, weighted (leg scores normalised to [0, 1],
+	weighted and summed; a leg that missed a chunk adds nothing) or RRF.
+
+	Deletes and replaced upserts only clear a row's `alive` flag until
+	`compact()` drops them. `save()` writes a snapshot (vectors.npy + meta.json)
+	that `load()` memory-maps, so a restart does not read every vector into RAM
+	until the first write.
+
+	One store per process: run a single API worker with this backend.
+	"""
+
+	def __init__(self, path: str = ""):
+		self.path = path
+		self.dim = 0
+		self._lock = threading.RLock()
+		# one snapshot at a time: they share the tmp and old directories
+		self._save_lock = threading.Lock()
+		self._n = 0
+		self._vectors = np.zeros((0, 0), dtype=np.float32)
+		self._alive = np.zeros(0, dtype=bool)
+		self._ids: list[str] = []
+		self._rows: dict[str, int] = {}
+		self._columns: dict[str, list] = {f: [] for f in FIELDS}
+		self._lengths = np.zeros(0, dtype=np.float32)
+		self._postings: dict[str, dict[int, int]] = {}
+		self._dirty = False
+		self._saved_at = time.monotonic()
+
+	def __len__(self) -> int:
+		return int(self._alive[: self._n].sum())
+
+	# writes
+
+	def upsert(self, chunks: List[EmbeddedChunk]) -> int:
+		if not chunks:
+			return 0
+		vectors = np.asarray([c.vector for c in chunks], dtype=np.float32)
+		norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+		vectors /= np.where(norms == 0, 1, norms)
+		with self._lock:
+			if not self.dim:
+				self.dim = vectors.shape[1]
+				self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+			if vectors.shape[1] != self.dim:
+				raise ValueError(
+					f"Vectors have {vectors.shape[1]} dims, the store {self.dim}"
+				)
+			self._reserve(self._n + len(chunks))
+			for c, vector in zip(chunks, vectors):
+				old = self._rows.get(c.chunk_id)
+				if old is not None:
+					self._alive[old] = False
+				row = self._n
+				self._n += 1
+				self._vectors[row] = vector
+				self._alive[row] = True
+				self._ids.append(c.chunk_id)
+				self._rows[c.chunk_id] = row
+				for f in FIELDS:
+					self._columns[f].append(getattr(c, f))
+				self._index_text(row, c.text)
+			self._dirty = True
+		return len(chunks)
+
+	def delete(self, expr: str) -> int:
+		with self._lock:
+			rows = np.flatnonzero(self._mask(expr))
+			self._alive[rows] = False
+			for row in rows:
+				self._rows.pop(self._ids[row], None)
+			self._dirty = self._dirty or len(rows) > 0
+			return len(rows)
+
+	def count(self, expr: str = "") -> int:
+		with self._lock:
+			return int(self._mask(expr).sum())
+
+	def file_ids(self, expr: str = "", limit: int = 16384) -> set[str]:
+		with self._lock:
+			rows = np.flatnonzero(self._mask(expr))[:limit]
+			return {self._columns["file_id"][row] for row in rows}
+
+	def compact(self) -> int:
+		"""Drops the deleted rows; returns how many."""
+		with self._lock:
+			keep = np.flatnonzero(self._alive[: self._n])
+			dropped = self._n - len(keep)
+			if dropped:
+				self._rebuild(
+					self._vectors[keep],
+					[self._ids[i] for i in keep],
+					{f: [self._columns[f][i] for i in keep] for f in FIELDS},
+				)
+				self._dirty = True
+			return dropped
+
+	def _reserve(self, rows: int) -> None:
+		if rows <= len(self._vectors) and self._vectors.flags.writeable:
+			return
+		# also copies a memory-mapped snapshot into RAM on the first write
+		capacity = max(rows, 2 * len(self._vectors), 1024)
+		vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+		vectors[: self._n] = self._vectors[: self._n]
+		alive = np.zeros(capacity, dtype=bool)
+		alive[: self._n] = self._alive[: self._n]
+		lengths = np.zeros(capacity, dtype=np.float32)
+		lengths[: self._n] = self._lengths[: self._n]
+		self._vectors, self._alive, self._lengths = vectors, alive, lengths
+
+	def _index_text(self, row: int, text: str) -> None:
+		tokens = tokenize(text)
+		self._lengths[row] = len(tokens)
+		for token in tokens:
+			posting = self._postings.setdefault(token, {})
+			posting[row] = posting.get(row, 0) + 1
+
+	def _rebuild(
+		self, vectors: np.ndarray, ids: list[str], columns: dict[str, list]
+	) -> None:
+		self._n = len(ids)
+		self._vectors = vectors
+		self._alive = np.ones(self._n, dtype=bool)
+		self._lengths = np.zeros(self._n, dtype=np.float32)
+		self._ids = ids
+		self._rows = {chunk_id: row for row, chunk_id in enumerate(ids)}
+		self._columns = columns
+		self._postings = {}
+		for row, text in enumerate(columns["text"]):
+			self._index_text(row, text)
+
+	# reads
+
+	def _mask(self, expr: str) -> np.ndarray:
+		mask = self._alive[: self._n].copy()
+		for field, op, value in parse_filter(expr):
+			if op in ("in", "not in"):
+				value = set(value)
+			column = self._ids if field == "chunk_id" else self._columns[field]
+			mask &= np.fromiter(
+				(_matches(op, actual, value) for actual in column),
+				dtype=bool,
+				count=self._n,
+			)
+		return mask
+
+	def _bm25(self, query: str, mask: np.ndarray, drop_ratio: float) -> np.ndarray:
+		scores = np.zeros(self._n, dtype=np.float32)
+		alive = self._alive[: self._n]
+		docs = int(alive.sum())
+		if not docs:
+			return scores
+		avgdl = float(self._lengths[: self._n][alive].mean()) or 1.0
+		terms = []
+		for token in set(tokenize(query)):
+			posting = self._postings.get(token)
+			if not posting:
+				continue
+			rows = np.fromiter(posting.keys(), dtype=np.int64, count=len(posting))
+			tfs = np.fromiter(posting.values(), dtype=np.float32, count=len(posting))
+			df = int(alive[rows].sum())
+			if df:
+				idf = math.log(1 + (docs - df + 0.5) / (df + 0.5))
+				terms.append((idf, rows, tfs))
+		# like drop_ratio_search: ignore the least informative query terms
+		terms.sort(key=lambda t: t[0])
+		for idf, rows, tfs in terms[int(len(terms) * drop_ratio) :]:
+			norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * self._lengths[rows] / avgdl)
+			scores[rows] += idf * tfs * (_BM25_K1 + 1) / (tfs + norm)
+		scores[~mask] = 0
+		return scores
+
+	def search(
+		self,
+		queries: list[str],
+		dense_embeddings: list[list[float]],
+		expr: str,
+		dense_weight: float,
+		sparse_weight: float,
+		limit: int,
+		profile: SearchProfile,
+		fusion: str = "weighted",
+		with_vectors: bool = False,
+	) -> list[list[dict]]:
+		"""Hybrid search of each query; hits carry the fused score as `distance`."""
+		with self._lock:
+			if not self._n or not queries:
+				return [[] for _ in queries]
+			mask = self._mask(expr)
+			leg_limit = profile.leg_limit(limit)
+			q = np.asarray(dense_embeddings, dtype=np.float32)
+			norms = np.linalg.norm(q, axis=1, keepdims=True)
+			q /= np.where(norms == 0, 1, norms)
+			similarity = q @ self._vectors[: self._n].T
+			similarity[:, ~mask] = -np.inf
+
+			results = []
+			for query, sims in zip(queries, similarity):
+				dense = _top(sims, leg_limit)
+				bm25 = self._bm25(query, mask, profile.sparse_drop_ratio)
+				sparse = _top(np.where(bm25 > 0, bm25, -np.inf), leg_limit)
+				rows, scores = fuse(
+					[
+						(dense, _cosine_score(sims[dense])),
+						(sparse, _bm25_score(bm25[sparse])),
+					],
+					[dense_weight, sparse_weight],
+					fusion,
+				)
+				results.append(
+					[
+						self._hit(int(row), float(score), with_vectors)
+						for row, score in zip(rows[:limit], scores[:limit])
+					]
+				)
+			return results
+
+	def _hit(self, row: int, score: float, with_vector: bool = False) -> dict:
+		hit = {f: self._columns[f][row] for f in FIELDS}
+		hit["chunk_id"] = self._ids[row]
+		hit["distance"] = score
+		if with_vector:
+			hit["vector"] = self._vectors[row].tolist()
+		return hit
+
+	# snapshots
+
+	def save(self) -> None:
+		"""Writes a compacted snapshot to `path`, replacing the previous one."""
+		with self._save_lock:
+			self._save()
+
+	def save_if_due(self, interval: float) -> None:
+		with self._save_lock:
+			if self._dirty and time.monotonic() - self._saved_at >= interval:
+				self._save()
+
+	def _save(self) -> None:
+		if not self.path:
+			return
+		with self._lock:
+			keep = np.flatnonzero(self._alive[: self._n])
+			meta = {
+				"dim": self.dim,
+				"ids": [self._ids[i] for i in keep],
+				"columns": {f: [self._columns[f][i] for i in keep] for f in FIELDS},
+			}
+			vectors = np.ascontiguousarray(self._vectors[keep])
+			self._dirty = False
+			self._saved_at = time.monotonic()
+		try:
+			tmp = f"{self.path}.tmp"
+			shutil.rmtree(tmp, ignore_errors=True)
+			os.makedirs(tmp)
+			np.save(os.path.join(tmp, "vectors.npy"), vectors)
+			with open(os.path.join(tmp, "meta.json"), "wb") as f:
+				f.write(dumps(meta))
+		except BaseException:
+			self._dirty = True  # the writes are still only in memory
+			raise
+		old = f"{self.path}.old"
+		shutil.rmtree(old, ignore_errors=True)
+		if os.path.exists(self.path):
+			os.replace(self.path, old)
+		os.replace(tmp, self.path)
+		shutil.rmtree(old, ignore_errors=True)
+		logger.info(f"Embedded vector store saved: {len(keep)} vectors in {self.path}")
+
+	def load(self) -> None:
+		"""Reads the snapshot at `path`, if any (vectors stay memory-mapped)."""
+		meta_path = os.path.join(self.path, "meta.json")
+		if not self.path or not os.path.exists(meta_path):
+			return
+		with open(meta_path, "rb") as f:
+			meta = loads(f.read())
+		vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+		with self._lock:
+			self.dim = int(meta["dim"])
+			self._rebuild(vectors, meta["ids"], meta["columns"])
+		logger.info(f"Embedded vector store loaded: {self._n} vectors from {self.path}")
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+	"""Rows of the k highest finite scores, best first."""
+	k = min(k, int(np.isfinite(scores).sum()))
+	if k <= 0:
+		return np.zeros(0, dtype=np.int64)
+	top = np.argpartition(-scores, k - 1)[:k]
+	return top[np.argsort(-scores[top])]
+
+
+_store_singleton: Optional[EmbeddedStore] = None
+
+
+def get_embedded_store() -> EmbeddedStore:
+	global _store_singleton
+	if _store_singleton is None:
+		store = EmbeddedStore(path=Settings.get().EMBEDDED_STORE_PATH)
+		store.load()
+		_store_singleton = store
+	return _store_singleton
+
+
+def close_embedded_store() -> None:
+	global _store_singleton
+	if _store_singleton is not None:
+		if _store_singleton._dirty:
+			_store_singleton.save()
+		_store_singleton = None
+
+
+class EmbeddedInsert(MilvusInsert):
+	"""MilvusInsert (same indexing pipeline) writing to the embedded store."""
+
+	def __init__(self, store: EmbeddedStore | None = None):
+		super().__init__()
+		self.store = store if store is not None else get_embedded_store()
+		self.vector_storage = "float32"
+		self.snapshot_interval = Settings.get().EMBEDDED_SNAPSHOT_INTERVAL
+
+	async def upsert(self, data: List[EmbeddedChunk]):
+		count = await asyncio.to_thread(self.store.upsert, data)
+		await self._snapshot()
+		return {"code": 0, "data": {"upsertCount": count}}
+
+	async def delete(self, filter: str) -> dict:
+		count = await asyncio.to_thread(self.store.delete, filter)
+		await self._snapshot()
+		return {"code": 0, "data": {"deleteCount": count}}
+
+	async def count(self, filter: str = "") -> int:
+		return await asyncio.to_thread(self.store.count, filter)
+
+	async def file_ids(self, filter: str = "", limit: int = 16384) -> set[str]:
+		return await asyncio.to_thread(self.store.file_ids, filter, limit)
+
+	async def compact(self) -> dict:
+		await asyncio.to_thread(self.store.compact)
+		await asyncio.to_thread(self.store.save)
+		return {"code": 0, "data": {}}
+
+	async def _snapshot(self) -> None:
+		await asyncio.to_thread(self.store.save_if_due, self.snapshot_interval)
+
+
+class EmbeddedSearch(MilvusSearch):
+	"""MilvusSearch answered by the embedded store (same hits, same fusion)."""
+
+	def __init__(self, store: EmbeddedStore | None = None):
+		super().__init__()
+		self.store = store if store is not None else get_embedded_store()
+
+	async def asearch(
+		self,
+		query: str,
+		dense_embedding: list[float],
+		expr: str,
+		dense_weight: float,
+		sparse_weight: float,
+		limit: int = 3,
+		profile: str | None = None,
+		fusion: str = "weighted",
+		with_vectors: bool = False,
+	) -> dict:
+		[hits] = await self.asearch_many(
+			[query],
+			[dense_embedding],
+			expr,
+			dense_weight,
+			sparse_weight,
+			limit,
+			profile,
+			fusion,
+			with_vectors,
+		)
+		return {"code": 0, "data": hits}
+
+	async def asearch_many(
+		self,
+		queries: list[str],
+		dense_embeddings: list[list[float]],
+		expr: str,
+		dense_weight: float,
+		sparse_weight: float,
+		limit: int = 3,
+		profile: str | None = None,
+		fusion: str = "weighted",
+		with_vectors: bool = False,
+	) -> list[list[dict]]:
+		SEARCH_REQUESTS.inc(len(queries))
+		with observe("embedded_search"):
+			return await asyncio.to_thread(
+				self.store.search,
+				queries,
+				dense_embeddings,
+				expr,
+				dense_weight,
+				sparse_weight,
+				limit,
+				self.resolve_profile(profile),
+				fusion,
+				with_vectors,
+			)
+
+	def search(
+		self,
+		query: str,
+		dense_embedding: list[float],
+		expr: str,
+		dense_weight: float,
+		sparse_weight: float,
+		limit: int = 3,
+		profile: str | None = None,
+		fusion: str = "weighted",
+		with_vectors: bool = False,
+	) -> dict:
+		SEARCH_REQUESTS.inc()
+		with observe("embedded_search"):
+			[hits] = self.store.search(
+				[query],
+				[dense_embedding],
+				expr,
+				dense_weight,
+				sparse_weight,
+				limit,
+				self.resolve_profile(profile),
+				fusion,
+				with_vectors,
+			)
+		return {"code": 0, "data": hits}
@@ -1,9 +1,20 @@
 import asyncio
-from typing import List
+import json
+from typing import TYPE_CHECKING, Awaitable, Callable, List, TypeVar
 
 import httpx
 from loguru import logger
 
+from app.core.connectors.milvus_http import get_milvus_http, loads
+from app.core.connectors.retry import (
+	RetryBudget,
+	is_input_error,
+	is_retryable,
+	with_retries,
+)
+from app.core.connectors.search_profiles import SEARCH_PROFILES, SearchProfile
+from app.core.connectors.vector_format import encode_vector
+from app.core.fusion import milvus_rerank
 from app.core.metrics import (
 	MILVUS_INSERT_BATCHES,
 	MILVUS_INSERT_ERRORS,
@@ -11,10 +22,24 @@ from app.core.metrics import (
 	SEARCH_REQUESTS,
 	observe,
 )
-from app.core.pdf_uploader.embedder import AsyncEmbedder
-from app.rag.schemas import Chunk, EmbeddedChunk, FailedChunk, IndexingResult
+from app.rag.schemas import (
+	Chunk,
+	EmbeddedChunk,
+	FailedChunk,
+	IndexingResult,
+	SearchFilters,
+)
 from app.settings import Settings
 
+if TYPE_CHECKING:
+	from app.core.pdf_uploader.embedder import AsyncEmbedder
+
+T = TypeVar("T")
+
+# approximate JSON size of one vector component and of an entity's other fields
+_JSON_BYTES_PER_DIM = {"float32": 21, "float16": 8, "bfloat16": 8, "int8": 4}
+_ENTITY_OVERHEAD_BYTES = 256
+
 
 class MilvusInsert:
 	def __init__(self):
@@ -22,33 +47,100 @@ class MilvusInsert:
 		self.collection_name = sets.MILVUS_COLLECTION
 		self.cluster_endpoint = sets.MILVUS_URL.rstrip("/")
 		self.token = sets.MILVUS_SECRET
-		self.BATCH_SIZE = 64
 		self.VECTOR_FIELD = "vector"
+		self.vector_storage = sets.VECTOR_STORAGE
+		self.embed_batch_size = max(1, sets.EMBED_BATCH_SIZE)
+		self.embed_concurrency = max(1, sets.INDEX_EMBED_CONCURRENCY)
+		self.insert_concurrency = max(1, sets.INDEX_INSERT_CONCURRENCY)
+		self.insert_max_bytes = max(1, sets.MILVUS_INSERT_MAX_BYTES)
+		self.retry_attempts = max(1, sets.INDEX_RETRY_ATTEMPTS)
+		self.retry_budget = sets.INDEX_RETRY_BUDGET
+		self.retry_base_delay = sets.INDEX_RETRY_BASE_DELAY
+		self.retry_max_delay = sets.INDEX_RETRY_MAX_DELAY
 
-	async def insert(self, data: List[EmbeddedChunk]):
-		url = f"{self.cluster_endpoint}/v2/vectordb/entities/insert"
-		headers = {
-			"Content-Type": "application/json",
+	async def upsert(self, data: List[EmbeddedChunk]):
+		"""
+		Writes entities keyed by chunk_id: rewriting a chunk replaces its vector,
+		so a retried or repeated batch never leaves duplicates behind.
+		"""
+		url = f"{self.cluster_endpoint}/v2/vectordb/entities/upsert"
+		payload = {
+			"collectionName": self.collection_name,
+			"data": [d.model_dump() for d in data],
 		}
-		if self.token:
-			headers["Authorization"] = f"Bearer {self.token}"
+		resp = await get_milvus_http().post(url, payload, self.token)
+		resp.raise_for_status()
+		resp_json = loads(resp.content)
+		if resp_json.get("code") != 0:
+			raise httpx.HTTPStatusError(
+				f"Milvus upsert error: {resp_json}",
+				request=resp.request,
+				response=resp,
+			)
+		return resp_json
 
+	async def delete(self, filter: str) -> dict:
+		"""Deletes the entities matching a Milvus boolean `filter` expression."""
+		url = f"{self.cluster_endpoint}/v2/vectordb/entities/delete"
+		payload = {"collectionName": self.collection_name, "filter": filter}
+		resp = await get_milvus_http().post(url, payload, self.token)
+		resp.raise_for_status()
+		resp_json = loads(resp.content)
+		if resp_json.get("code") != 0:
+			raise httpx.HTTPStatusError(
+				f"Milvus delete error: {resp_json}",
+				request=resp.request,
+				response=resp,
+			)
+		return resp_json
+
+	async def count(self, filter: str = "") -> int:
+		"""Number of entities matching a Milvus boolean `filter` expression."""
+		url = f"{self.cluster_endpoint}/v2/vectordb/entities/query"
 		payload = {
 			"collectionName": self.collection_name,
-			"data": [d.model_dump() for d in data],
+			"filter": filter,
+			"outputFields": ["count(*)"],
 		}
-		async with httpx.AsyncClient(timeout=60) as client:
-			resp = await client.post(url, json=payload, headers=headers)
-			resp.raise_for_status()
-			resp_json = resp.json()
-			if resp_json.get("code") != 0:
-				raise httpx.HTTPStatusError(
-					f"Milvus insert error: {resp_json}",
-					request=resp.request,
-					response=resp,
-				)
-			return resp.json()
-		return {}
+		resp = await get_milvus_http().post(url, payload, self.token)
+		resp.raise_for_status()
+		resp_json = loads(resp.content)
+		if resp_json.get("code") != 0:
+			raise httpx.HTTPStatusError(
+				f"Milvus count error: {resp_json}",
+				request=resp.request,
+				response=resp,
+			)
+		rows = resp_json.get("data") or [{}]
+		return int(rows[0].get("count(*)", 0))
+
+	async def file_ids(self, filter: str = "", limit: int = 16384) -> set[str]:
+		"""Distinct file_id of up to `limit` entities matching `filter`."""
+		url = f"{self.cluster_endpoint}/v2/vectordb/entities/query"
+		payload = {
+			"collectionName": self.collection_name,
+			"filter": filter,
+			"outputFields": ["file_id"],
+			"limit": limit,
+		}
+		resp = await get_milvus_http().post(url, payload, self.token)
+		resp.raise_for_status()
+		resp_json = loads(resp.content)
+		if resp_json.get("code") != 0:
+			raise httpx.HTTPStatusError(
+				f"Milvus query error: {resp_json}",
+				request=resp.request,
+				response=resp,
+			)
+		return {str(row["file_id"]) for row in resp_json.get("data") or []}
+
+	async def compact(self) -> dict:
+		"""Starts a compaction, which physically drops deleted entities."""
+		url = f"{self.cluster_endpoint}/v2/vectordb/collections/compact"
+		payload = {"collectionName": self.collection_name}
+		resp = await get_milvus_http().post(url, payload, self.token)
+		resp.raise_for_status()
+		return loads(resp.content)
 
 	async def upload_chunks(
 		self,
@@ -56,25 +148,84 @@ class MilvusInsert:
 		embedder: "AsyncEmbedder",
 		file_id: str,
 		chunk_ids: List[str],
+		retry_budget: RetryBudget | None = None,
 	) -> IndexingResult:
 		"""
 		Insert chunk embeddings into Milvus and return an IndexingResult.
 		'chunks' must contain: id, file_id, page, chunk_index, source, text
+		`retry_budget` caps the retries of transient failures; pass the same one
+		for every batch of an ingestion.
+
+		Two bounded stages: up to `embed_concurrency` embedding batches are in
+		flight while up to `insert_concurrency` inserts drain the vectors already
+		embedded, so inserting batch N overlaps with embedding batch N+1. Insert
+		batches are cut by estimated payload bytes, not by chunk count.
 		"""
 		n = len(chunks)
+		if len(chunk_ids) != n:
+			raise ValueError(f"upload_chunks: {len(chunk_ids)} ids for {n} chunks")
 		logger.debug(
 			f"Inserting {n} chunks into Milvus collection '{self.collection_name}'"
 		)
 
-		# launch batch tasks; each returns List[FailedChunk]
-		tasks = []
-		for start in range(0, n, self.BATCH_SIZE):
-			batch = chunks[start : start + self.BATCH_SIZE]
-			tasks.append(self._process_batch(batch, embedder))
+		budget = retry_budget or RetryBudget(self.retry_budget)
+		errors: List[FailedChunk] = []
+		insert_q: asyncio.Queue = asyncio.Queue(maxsize=self.insert_concurrency * 2)
+		embed_limit = asyncio.Semaphore(self.embed_concurrency)
+		pending: List[EmbeddedChunk] = []
+		pending_bytes = 0
+
+		async def flush() -> None:
+			nonlocal pending_bytes
+			if pending:
+				group = pending.copy()
+				pending.clear()
+				pending_bytes = 0
+				await insert_q.put(group)
+
+		async def embed_one(batch: List[Chunk], ids: List[str]) -> None:
+			nonlocal pending_bytes
+			try:
+				entities, failed = await self._embed_entities(
+					batch, ids, embedder, file_id, budget
+				)
+			finally:
+				embed_limit.release()
+			errors.extend(failed)
+			for ent in entities:
+				size = self._entity_bytes(ent)
+				if pending and pending_bytes + size > self.insert_max_bytes:
+					await flush()
+				pending.append(ent)
+				pending_bytes += size
+
+		async def embed_stage() -> None:
+			try:
+				async with asyncio.TaskGroup() as tg:
+					for start in range(0, n, self.embed_batch_size):
+						stop = start + self.embed_batch_size
+						await embed_limit.acquire()
+						tg.create_task(
+							embed_one(chunks[start:stop], chunk_ids[start:stop])
+						)
+			except ExceptionGroup as eg:
+				raise eg.exceptions[0]
+			await flush()
+			for _ in range(self.insert_concurrency):
+				await insert_q.put(None)
+
+		async def insert_worker() -> None:
+			while (group := await insert_q.get()) is not None:
+				errors.extend(await self._insert_entities(group, budget))
+
+		try:
+			async with asyncio.TaskGroup() as tg:
+				tg.create_task(embed_stage())
+				for _ in range(self.insert_concurrency):
+					tg.create_task(insert_worker())
+		except ExceptionGroup as eg:
+			raise eg.exceptions[0]
 
-		batch_results = await asyncio.gather(*tasks)
-		# flatten errors
-		errors: List[FailedChunk] = [err for errs in batch_results for err in errs]
 		return IndexingResult(
 			total_chunks=n,
 			errors=errors,
@@ -83,30 +234,58 @@ class MilvusInsert:
 			inserted_chunk_ids=[str(cid) for cid in chunk_ids],
 		)
 
-	async def _process_batch(
-		self, batch: List[Chunk], embedder: "AsyncEmbedder"
-	) -> List[FailedChunk]:
-		"""Embed + insert one batch; collect failures per chunk."""
-		# 1) Embed
+	def _entity_bytes(self, ent: EmbeddedChunk) -> int:
+		"""Rough size of the entity in the JSON insert payload."""
+		return (
+			_ENTITY_OVERHEAD_BYTES
+			+ len(ent.text.encode())
+			+ len(ent.filename)
+			+ len(ent.source)
+			+ len(ent.title or "")
+			+ len(ent.vector) * _JSON_BYTES_PER_DIM[self.vector_storage]
+		)
+
+	async def _embed_entities(
+		self,
+		batch: List[Chunk],
+		chunk_ids: List[str],
+		embedder: "AsyncEmbedder",
+		file_id: str,
+		budget: RetryBudget,
+	) -> tuple[List[EmbeddedChunk], List[FailedChunk]]:
+		"""
+		Embed one batch into insertable entities; collect failures per chunk.
+		Transient errors are retried, and the batch is reported as failed once the
+		attempts or the budget run out; a batch rejected because of its inputs is
+		split in half until the chunks that cause it are isolated. Any other error
+		(auth, permission, missing collection) is raised: it would fail every
+		batch the same way.
+		"""
 		try:
-			texts = [c.text for c in batch]
-			vectors = await embedder.encode(texts)
+			vectors = await self._retry(
+				lambda: embedder.encode([c.text for c in batch]), "embed", budget
+			)
+			# if model returned fewer vectors than inputs, mark missing ones
+			if len(vectors) != len(batch):
+				raise ValueError(
+					f"length mismatch (got {len(vectors)}, expected {len(batch)})"
+				)
 		except Exception as e:
-			msg = _short_err("embed", e)
-			return [
-				FailedChunk(
-					chunk=c,
-					error=msg,
+			# a short response (ValueError above) may also come from one input
+			split = is_input_error(e) or isinstance(e, ValueError)
+			if not (split or is_retryable(e)):
+				raise
+			if split and len(batch) > 1:
+				mid = len(batch) // 2
+				left = await self._embed_entities(
+					batch[:mid], chunk_ids[:mid], embedder, file_id, budget
 				)
-				for c in batch
-			]
-
-		# if model returned fewer vectors than inputs, mark missing ones
-		errors: List[FailedChunk] = []
-		if len(vectors) != len(batch):
-			msg = f"embed: length mismatch (got {len(vectors)}, expected {len(batch)})"
-			# mark all as failed, safest fallback
-			return [
+				right = await self._embed_entities(
+					batch[mid:], chunk_ids[mid:], embedder, file_id, budget
+				)
+				return left[0] + right[0], left[1] + right[1]
+			msg = _short_err("embed", e)
+			return [], [
 				FailedChunk(
 					chunk=c,
 					error=msg,
@@ -114,18 +293,19 @@ class MilvusInsert:
 				for c in batch
 			]
 
-		# 2) Build entities
 		entities: List[EmbeddedChunk] = []
-		for c, v in zip(batch, vectors):
+		errors: List[FailedChunk] = []
+		for c, chunk_id, v in zip(batch, chunk_ids, vectors):
 			try:
 				entities.append(
 					EmbeddedChunk(
-						**c.model_dump(by_alias=True, exclude={"title"}),
+						**c.model_dump(by_alias=True, exclude={"title", "simhash"}),
 						title=c.title or "N/A",
-						vector=(
-							v.tolist()  # type: ignore
-							if hasattr(v, "tolist")
-							else [float(x) for x in v]  # type: ignore
+						chunk_id=str(chunk_id),
+						file_id=file_id,
+						vector=encode_vector(
+							v.tolist() if hasattr(v, "tolist") else v,  # type: ignore
+							self.vector_storage,
 						),
 					)
 				)
@@ -136,18 +316,27 @@ class MilvusInsert:
 						error=_short_err("prepare", e),
 					)
 				)
+		return entities, errors
 
-		# if all failed to prepare, stop here
-		if not entities:
-			return errors
+	async def _insert_entities(
+		self, entities: List[EmbeddedChunk], budget: RetryBudget
+	) -> List[FailedChunk]:
+		"""
+		Insert one batch of entities, with the same retry, bisection and re-raise
+		policy as embedding; returns the entities that could not be inserted.
+		"""
 
-		# 3) Insert
-		try:
+		async def insert() -> None:
 			MILVUS_INSERT_BATCHES.inc()
 			with observe("milvus_insert"):
-				await self.insert(entities)
+				await self.upsert(entities)
+
+		try:
+			await self._retry(insert, "insert", budget)
+			return []
 		except httpx.HTTPStatusError as e:
 			MILVUS_INSERT_ERRORS.inc()
+			error: Exception = e
 
 			status = e.response.status_code if e.response else "?"
 			body = ""
@@ -156,28 +345,97 @@ class MilvusInsert:
 			except Exception:
 				body = str(e)
 			msg = f"insert HTTP {status}: {body}"
-			# mark entire batch as failed (only those we attempted to insert)
-			errors.extend(
-				FailedChunk(
-					chunk=ent,
-					error=msg,
-				)
-				for ent in entities
-			)
-			logger.error(f"Milvus insert error: {msg}")
 		except Exception as e:
 			MILVUS_INSERT_ERRORS.inc()
+			error = e
 			msg = _short_err("insert", e)
-			errors.extend(
-				FailedChunk(
-					chunk=ent,
-					error=msg,
-				)
-				for ent in entities
-			)
+
+		split = is_input_error(error)
+		if not (split or is_retryable(error)):
 			logger.error(f"Milvus insert error: {msg}")
+			raise error
+		if split and len(entities) > 1:
+			mid = len(entities) // 2
+			logger.warning(
+				f"Milvus insert of {len(entities)} entities failed ({msg}); "
+				"retrying as two halves"
+			)
+			return [
+				*await self._insert_entities(entities[:mid], budget),
+				*await self._insert_entities(entities[mid:], budget),
+			]
+
+		logger.error(f"Milvus insert error: {msg}")
+		return [
+			FailedChunk(
+				chunk=ent,
+				error=msg,
+			)
+			for ent in entities
+		]
+
+	async def _retry(
+		self, call: Callable[[], Awaitable[T]], stage: str, budget: RetryBudget
+	) -> T:
+		return await with_retries(
+			call,
+			stage,
+			budget,
+			attempts=self.retry_attempts,
+			base_delay=self.retry_base_delay,
+			max_delay=self.retry_max_delay,
+		)
+
+
+def _split_hits(raw: dict, nq: int, limit: int) -> list[list[dict]] | None:
+	"""
+	Per-query hits of a search response. Milvus nests them ([[...], [...]]) or,
+	depending on the version, returns one flat list with the per-query counts
+	in "topks". None when a flat list cannot be split: no "topks" and some
+	query found fewer than `limit` hits.
+	"""
+	data = raw.get("data") if isinstance(raw, dict) else raw
+	if not isinstance(data, list):
+		return [[] for _ in range(nq)]
+	if data and all(isinstance(d, list) for d in data):
+		groups = data
+	elif nq == 1:
+		groups = [data]
+	else:
+		topks = raw.get("topks") if isinstance(raw, dict) else None
+		sizes = topks if isinstance(topks, list) else [limit] * nq
+		if len(sizes) != nq or sum(sizes) != len(data):
+			return None
+		groups, start = [], 0
+		for size in sizes:
+			groups.append(data[start : start + size])
+			start += size
+	groups = list(groups) + [[] for _ in range(nq - len(groups))]
+	return [[h for h in g[:limit] if isinstance(h, dict)] for g in groups[:nq]]
 
-		return errors
+
+def filter_expr(filters: SearchFilters | None) -> str:
+	"""
+	Milvus boolean expression for `filters` ("" matches everything). The fields
+	have INVERTED indexes (see milvus_bootstrap), so filtered searches only
+	visit the matching chunks.
+	"""
+	if filters is None:
+		return ""
+	clauses = [
+		f"{field} in {json.dumps(values, ensure_ascii=False)}"
+		for field, values in (
+			("file_id", filters.file_ids),
+			("filename", filters.filenames),
+			("title", filters.titles),
+		)
+		if values
+	]
+	if filters.page_from is not None:
+		clauses.append(f"page_idx >= {int(filters.page_from)}")
+	if filters.page_to is not None:
+		clauses.append(f"page_idx <= {int(filters.page_to)}")
+	return " and ".join(clauses)
 
 
 def _short_err(stage: str, e: Exception, limit: int = 300) -> str:
@@ -191,6 +449,112 @@ class MilvusSearch:
 		self.cluster_endpoint = sets.MILVUS_URL.rstrip("/")
 		self.token = sets.MILVUS_SECRET
 		self.collection_name = "doc_chunks"
+		self.vector_storage = sets.VECTOR_STORAGE
+		self.default_profile = sets.SEARCH_PROFILE
+
+	async def asearch(
+		self,
+		query: str,
+		dense_embedding: list[float],
+		expr: str,
+		dense_weight: float,
+		sparse_weight: float,
+		limit: int = 3,
+		profile: str | None = None,
+		fusion: str = "weighted",
+		with_vectors: bool = False,
+	) -> dict:
+		"""Hybrid (dense + BM25) search, awaited without blocking the event loop."""
+		SEARCH_REQUESTS.inc()
+		payload = self._search_payload(
+			[query],
+			[dense_embedding],
+			expr,
+			dense_weight,
+			sparse_weight,
+			limit,
+			self.resolve_profile(profile),
+			fusion,
+			with_vectors,
+		)
+		with observe("milvus_search"):
+			try:
+				response = await get_milvus_http().post(
+					self._search_url, payload, self.token
+				)
+				response.raise_for_status()
+			except Exception as e:
+				self._search_failed(e)
+				raise
+
+		return loads(response.content)
+
+	async def asearch_many(
+		self,
+		queries: list[str],
+		dense_embeddings: list[list[float]],
+		expr: str,
+		dense_weight: float,
+		sparse_weight: float,
+		limit: int = 3,
+		profile: str | None = None,
+		fusion: str = "weighted",
+		with_vectors: bool = False,
+	) -> list[list[dict]]:
+		"""
+		Hybrid search of several queries in one advanced_search request (one query
+		vector and one BM25 text per query). Returns the hits of each query, in
+		order.
+		"""
+		if not queries:
+			return []
+		SEARCH_REQUESTS.inc(len(queries))
+		payload = self._search_payload(
+			queries,
+			dense_embeddings,
+			expr,
+			dense_weight,
+			sparse_weight,
+			limit,
+			self.resolve_profile(profile),
+			fusion,
+			with_vectors,
+		)
+		with observe("milvus_search"):
+			try:
+				response = await get_milvus_http().post(
+					self._search_url, payload, self.token
+				)
+				response.raise_for_status()
+			except Exception as e:
+				self._search_failed(e)
+				raise
+
+		hits = _split_hits(loads(response.content), len(queries), limit)
+		if hits is not None:
+			return hits
+
+		logger.warning(
+			f"Milvus batch search response of {len(queries)} queries cannot be "
+			"split per query; searching them one by one"
+		)
+		raws = await asyncio.gather(
+			*(
+				self.asearch(
+					query,
+					embedding,
+					expr,
+					dense_weight,
+					sparse_weight,
+					limit,
+					profile,
+					fusion,
+					with_vectors,
+				)
+				for query, embedding in zip(queries, dense_embeddings)
+			)
+		)
+		return [(_split_hits(raw, 1, limit) or [[]])[0] for raw in raws]
 
 	def search(
 		self,
@@ -200,56 +564,87 @@ class MilvusSearch:
 		dense_weight: float,
 		sparse_weight: float,
 		limit: int = 3,
+		profile: str | None = None,
+		fusion: str = "weighted",
+		with_vectors: bool = False,
 	) -> dict:
+		"""Blocking variant of `asearch`, for callers outside the event loop."""
 		SEARCH_REQUESTS.inc()
-		url = f"{self.cluster_endpoint}/v2/vectordb/entities/advanced_search"
-		headers = {
-			"Content-Type": "application/json",
-		}
-		if self.token:
-			headers["Authorization"] = f"Bearer {self.token}"
+		payload = self._search_payload(
+			[query],
+			[dense_embedding],
+			expr,
+			dense_weight,
+			sparse_weight,
+			limit,
+			self.resolve_profile(profile),
+			fusion,
+			with_vectors,
+		)
+		with observe("milvus_search"):
+			try:
+				response = get_milvus_http().post_sync(
+					self._search_url, payload, self.token
+				)
+				response.raise_for_status()
+			except Exception as e:
+				self._search_failed(e)
+				raise
 
-		payload = {
+		return loads(response.content)
+
+	def resolve_profile(self, name: str | None = None) -> SearchProfile:
+		"""The named search profile, or the configured SEARCH_PROFILE."""
+		return SEARCH_PROFILES[name or self.default_profile]
+
+	@property
+	def _search_url(self) -> str:
+		return f"{self.cluster_endpoint}/v2/vectordb/entities/advanced_search"
+
+	def _search_payload(
+		self,
+		queries: list[str],
+		dense_embeddings: list[list[float]],
+		expr: str,
+		dense_weight: float,
+		sparse_weight: float,
+		limit: int,
+		profile: SearchProfile,
+		fusion: str = "weighted",
+		with_vectors: bool = False,
+	) -> dict:
+		leg_limit = profile.leg_limit(limit)
+		fields = ["text", "source", "filename", "file_id", "title", "page_idx"]
+		fields.append("chunk_idx")
+		if with_vectors:  # for client-side MMR
+			fields.append("vector")
+		return {
 			"collectionName": self.collection_name,
 			"search": [
 				{
-					"data": [dense_embedding],  # type: ignore
+					"data": [
+						encode_vector(v, self.vector_storage) for v in dense_embeddings
+					],
 					"annsField": "vector",
-					"params": {"params": {"nprobe": 10}},
-					"limit": limit,
+					"params": {"params": profile.dense_params(limit)},
+					"limit": leg_limit,
 					"filter": expr,
 				},
 				{
-					"data": [query],
+					"data": queries,
 					"annsField": "sparse_vector",
-					"params": {},
-					"limit": limit,
+					"params": {"params": profile.sparse_params()},
+					"limit": leg_limit,
 					"filter": expr,
 				},
 			],
-			"rerank": {
-				"strategy": "weighted",
-				"params": {"weights": [dense_weight, sparse_weight]},
-			},
+			"rerank": milvus_rerank(fusion, dense_weight, sparse_weight),
 			"limit": limit,
-			"outputFields": [
-				"text",
-				"source",
-				"filename",
-				"file_id",
-				"page",
-				"chunk_index",
-			],
+			"consistencyLevel": profile.consistency,
+			"outputFields": fields,
 		}
-		with observe("milvus_search"):
-			try:
-				with httpx.Client(timeout=60) as client:
-					response = client.post(url, json=payload, headers=headers)
-					response.raise_for_status()
-			except Exception as e:
-				SEARCH_ERRORS.inc()
-				msg = _short_err("milvus_search", e)
-				logger.error(f"Milvus search error: {msg}")
-				raise
 
-		return response.json()
+	def _search_failed(self, e: Exception) -> None:
+		SEARCH_ERRORS.inc()
+		msg = _short_err("milvus_search", e)
+		logger.error(f"Milvus search error: {msg}")
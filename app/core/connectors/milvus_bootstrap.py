@@ -4,17 +4,12 @@ from typing import Any, Dict, Optional
 import httpx
 from loguru import logger
 
+from app.core.connectors.milvus_http import get_milvus_http, loads
+from app.core.connectors.vector_format import MILVUS_VECTOR_TYPES
+from app.core.pdf_uploader.embedding_providers import provider_dimension
 from app.settings import Settings
 
 DEFAULT_DB = "default"
-DIMENSIONS = 1536  # default for the embedding model used on the application
-
-
-def _auth_headers(token: Optional[str]) -> Dict[str, str]:
-	headers = {"Content-Type": "application/json"}
-	if token and str(token).strip():
-		headers["Authorization"] = f"Bearer {token}"
-	return headers
 
 
 async def _post(
@@ -24,13 +19,10 @@ async def _post(
 	payload: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
 	url = f"{base_url.rstrip('/')}{path}"
-	async with httpx.AsyncClient(timeout=60) as client:
-		resp = await client.post(
-			url, headers=_auth_headers(token), json=(payload or {})
-		)
+	resp = await get_milvus_http().post(url, payload or {}, token)
 
 	try:
-		body = resp.json()
+		body = loads(resp.content)
 	except ValueError:
 		resp.raise_for_status()
 		return {}
@@ -72,18 +64,23 @@ async def collection_exists(
 
 
 async def create_doc_chunks_collection(
-	base_url: str, token: Optional[str], collection_name: str, dim: int
+	base_url: str,
+	token: Optional[str],
+	collection_name: str,
+	dim: int,
+	vector_type: str = "FloatVector",
 ) -> Dict[str, Any]:
 	payload: Dict[str, Any] = {
 		"collectionName": collection_name,
 		"schema": {
 			"enableDynamicField": True,
-			"autoID": True,
+			# keyed by the Mongo chunk id, so writes can be idempotent upserts
+			"autoID": False,
 			"fields": [
-				{"fieldName": "id", "dataType": "Int64", "isPrimary": True},
 				{
 					"fieldName": "chunk_id",
 					"dataType": "VarChar",
+					"isPrimary": True,
 					"elementTypeParams": {"max_length": 64},
 				},
 				{
@@ -116,7 +113,7 @@ async def create_doc_chunks_collection(
 				{"fieldName": "sparse_vector", "dataType": "SparseFloatVector"},
 				{
 					"fieldName": "vector",
-					"dataType": "FloatVector",
+					"dataType": vector_type,
 					"elementTypeParams": {"dim": int(dim)},
 				},
 			],
@@ -134,6 +131,41 @@ async def create_doc_chunks_collection(
 	return await _post(base_url, "/v2/vectordb/collections/create", token, payload)
 
 
+async def describe_collection(
+	base_url: str, token: Optional[str], collection_name: str
+) -> Dict[str, Any]:
+	"""The description of an existing collection, or {} if it cannot be read."""
+	try:
+		body = await _post(
+			base_url,
+			"/v2/vectordb/collections/describe",
+			token,
+			{"collectionName": collection_name},
+		)
+	except Exception as e:
+		logger.warning(f"Could not describe collection {collection_name}: {e}")
+		return {}
+	return body.get("data") or {}
+
+
+def _vector_dim(description: Dict[str, Any]) -> int | None:
+	"""Dimension of the `vector` field."""
+	for field in description.get("fields", []):
+		if field.get("name") != "vector":
+			continue
+		for param in field.get("params", []):
+			if param.get("key") == "dim":
+				return int(param.get("value"))
+	return None
+
+
+def _primary_field(description: Dict[str, Any]) -> str | None:
+	for field in description.get("fields", []):
+		if field.get("primaryKey"):
+			return field.get("name")
+	return None
+
+
 essential_indexes = [
 	{
 		"fieldName": "vector",
@@ -152,6 +184,13 @@ essential_indexes = [
 ]
 
 
+# INVERTED indexes on the fields searches filter by (see milvus.filter_expr)
+scalar_indexes = [
+	{"fieldName": field, "indexName": f"{field}_inverted", "indexType": "INVERTED"}
+	for field in ("file_id", "filename", "title", "page_idx")
+]
+
+
 async def create_index(
 	base_url: str,
 	token: Optional[str],
@@ -204,24 +243,43 @@ async def init_milvus() -> None:
 
 	await _wait_milvus_ready(base_url, token)
 
-	dim: int = DIMENSIONS
+	# the vector field follows the configured embedding provider
+	dim: int = provider_dimension(settings)
 
 	logger.info(
 		f"Initializing Milvus at {base_url} to initialize collection {collection_name}"
 	)
 
 	if not await collection_exists(base_url, token, collection_name):
-		res = await create_doc_chunks_collection(base_url, token, collection_name, dim)
+		vector_type = MILVUS_VECTOR_TYPES[settings.VECTOR_STORAGE]
+		res = await create_doc_chunks_collection(
+			base_url, token, collection_name, dim, vector_type
+		)
 		logger.info(f"Created collection {collection_name}: {res}")
 	else:
 		logger.info(
 			f"Collection {collection_name} already exists - skipping its creation"
 		)
+		description = await describe_collection(base_url, token, collection_name)
+		existing_dim = _vector_dim(description)
+		if existing_dim and existing_dim != dim:
+			logger.error(
+				f"Collection {collection_name} stores {existing_dim}-d vectors but "
+				f"the embedding provider produces {dim}-d ones; inserts will fail. "
+				"Use another MILVUS_COLLECTION or drop the collection."
+			)
+		primary = _primary_field(description)
+		if primary and primary != "chunk_id":
+			logger.error(
+				f"Collection {collection_name} is keyed by '{primary}', not "
+				"'chunk_id'; upserts will fail. Use another MILVUS_COLLECTION or "
+				"drop the collection (and re-ingest)."
+			)
 
-	index_results = await create_index(
-		base_url, token, collection_name, essential_indexes
-	)
-	logger.info(f"Index creation results: {index_results}")
+	# one request per index, so an existing one does not hide a new one
+	for spec in essential_indexes + scalar_indexes:
+		res = await create_index(base_url, token, collection_name, [spec])
+		logger.info(f"Index {spec['indexName']} creation result: {res}")
 
 	await load_collection(base_url, token, collection_name)
 	logger.info(f"Loaded collection {collection_name}")
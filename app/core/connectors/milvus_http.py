@@ -0,0 +1,125 @@
+import gzip
+import json
+from typing import Any, Optional
+
+import httpx
+from loguru import logger
+
+from app.settings import Settings
+
+try:
+	import orjson
+except ImportError:  # optional: falls back to compact stdlib json
+	orjson = None
+
+try:
+	import h2  # noqa: F401
+except ImportError:  # optional: HTTP/2 needs httpx[http2]
+	h2 = None
+
+# bodies smaller than this are sent uncompressed even with compression on
+_COMPRESS_MIN_BYTES = 4096
+
+
+def dumps(payload: Any) -> bytes:
+	if orjson is not None:
+		return orjson.dumps(payload)
+	return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def loads(content: bytes) -> Any:
+	if orjson is not None:
+		return orjson.loads(content)
+	return json.loads(content)
+
+
+def encode_request(
+	payload: Any, token: Optional[str], compress: bool = False
+) -> tuple[bytes, dict[str, str]]:
+	"""JSON body and headers of a Milvus REST request."""
+	body = dumps(payload)
+	headers = {"Content-Type": "application/json"}
+	if token and str(token).strip():
+		headers["Authorization"] = f"Bearer {token}"
+	if compress and len(body) >= _COMPRESS_MIN_BYTES:
+		body = gzip.compress(body, compresslevel=1)
+		headers["Content-Encoding"] = "gzip"
+	return body, headers
+
+
+class MilvusHttp:
+	"""
+	Long-lived, pooled HTTP clients for the Milvus REST API.
+	Connections are kept alive between requests, so inserts and searches do not
+	pay TCP (and TLS) setup each time. The sync client serves callers that are
+	not on the event loop.
+	"""
+
+	def __init__(
+		self,
+		max_connections: int = 32,
+		http2: bool = False,
+		compress: bool = False,
+		timeout: float = 60,
+	):
+		if http2 and h2 is None:
+			logger.warning("MILVUS_HTTP2 is on but h2 is not installed; using HTTP/1.1")
+			http2 = False
+		self.compress = compress
+		self._options: dict[str, Any] = dict(
+			timeout=timeout,
+			http2=http2,
+			limits=httpx.Limits(
+				max_connections=max(1, max_connections),
+				max_keepalive_connections=max(1, max_connections),
+				keepalive_expiry=30,
+			),
+		)
+		self.client = httpx.AsyncClient(**self._options)
+		self._sync_client: httpx.Client | None = None
+
+	@property
+	def sync_client(self) -> httpx.Client:
+		if self._sync_client is None:
+			self._sync_client = httpx.Client(**self._options)
+		return self._sync_client
+
+	async def post(
+		self, url: str, payload: Any, token: Optional[str] = None
+	) -> httpx.Response:
+		body, headers = encode_request(payload, token, self.compress)
+		return await self.client.post(url, content=body, headers=headers)
+
+	def post_sync(
+		self, url: str, payload: Any, token: Optional[str] = None
+	) -> httpx.Response:
+		body, headers = encode_request(payload, token, self.compress)
+		return self.sync_client.post(url, content=body, headers=headers)
+
+	async def close(self) -> None:
+		await self.client.aclose()
+		if self._sync_client is not None:
+			self._sync_client.close()
+
+
+_milvus_http_singleton: Optional[MilvusHttp] = None
+
+
+def get_milvus_http() -> MilvusHttp:
+	global _milvus_http_singleton
+	if _milvus_http_singleton is None:
+		s = Settings.get()
+		_milvus_http_singleton = MilvusHttp(
+			max_connections=s.MILVUS_HTTP_MAX_CONNECTIONS,
+			http2=s.MILVUS_HTTP2,
+			compress=s.MILVUS_HTTP_COMPRESSION,
+			timeout=s.MILVUS_HTTP_TIMEOUT,
+		)
+	return _milvus_http_singleton
+
+
+async def close_milvus_http() -> None:
+	global _milvus_http_singleton
+	if _milvus_http_singleton is not None:
+		await _milvus_http_singleton.close()
+		_milvus_http_singleton = None
@@ -0,0 +1,110 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+import openai
+from loguru import logger
+
+from app.core.metrics import INDEX_RETRIES
+
+T = TypeVar("T")
+
+# throttling and server-side failures; anything else fails the same way again
+_RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+def is_retryable(e: BaseException) -> bool:
+	"""True for transient failures: timeouts, dropped connections, 429 and 5xx."""
+	if isinstance(e, (httpx.TransportError, openai.APIConnectionError, TimeoutError)):
+		return True
+	status = getattr(e, "status_code", None)
+	if status is None and isinstance(e, httpx.HTTPStatusError):
+		status = e.response.status_code
+	return status in _RETRYABLE_STATUS
+
+
+# statuses that blame the request content rather than the client or the server
+_INPUT_STATUS = {400, 413, 422}
+# Milvus (HTTP 200, error in the body) "invalid parameter": rows that break the
+# schema, e.g. a text longer than the VARCHAR max_length
+_MILVUS_INPUT_CODES = {1100}
+
+
+def is_input_error(e: BaseException) -> bool:
+	"""
+	True when the failure is caused by some of the inputs (a 400 from the
+	provider, a row Milvus rejects), so splitting the batch can isolate them.
+	Auth, permission, missing-collection and schema-wide errors (like a vector
+	dimension mismatch) fail every row the same way.
+	"""
+	if isinstance(e, (openai.BadRequestError, openai.UnprocessableEntityError)):
+		return True
+	if not isinstance(e, httpx.HTTPStatusError):
+		return False
+	if e.response.status_code in _INPUT_STATUS:
+		return True
+	try:
+		body = e.response.json()
+	except Exception:
+		return False
+	message = str(body.get("message", "")).lower()
+	return body.get("code") in _MILVUS_INPUT_CODES and "dim" not in message
+
+
+def _retry_after(e: BaseException) -> float:
+	response = getattr(e, "response", None)
+	try:
+		return float(response.headers.get("retry-after", 0))  # type: ignore[union-attr]
+	except (AttributeError, TypeError, ValueError):
+		return 0.0
+
+
+class RetryBudget:
+	"""
+	Retries left for one ingestion, shared by all of its batches, so a provider
+	or Milvus outage fails the document after a bounded amount of waiting
+	instead of retrying every batch to exhaustion.
+	"""
+
+	def __init__(self, retries: int):
+		self.remaining = max(0, retries)
+		self.used = 0
+
+	def take(self) -> bool:
+		if self.remaining <= 0:
+			return False
+		self.remaining -= 1
+		self.used += 1
+		return True
+
+
+async def with_retries(
+	call: Callable[[], Awaitable[T]],
+	stage: str,
+	budget: RetryBudget,
+	attempts: int = 4,
+	base_delay: float = 0.5,
+	max_delay: float = 30,
+) -> T:
+	"""
+	Awaits `call()`, retrying transient failures up to `attempts` tries in total
+	with full-jitter exponential backoff (or the server's Retry-After, if longer).
+	Each retry is taken from `budget`; the last error is raised once either runs out.
+	"""
+	attempt = 1
+	while True:
+		try:
+			return await call()
+		except Exception as e:
+			if attempt >= attempts or not is_retryable(e) or not budget.take():
+				raise
+			delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+			delay = min(max_delay, max(delay, _retry_after(e)))
+			INDEX_RETRIES.labels(stage).inc()
+			logger.warning(
+				f"{stage} failed ({type(e).__name__}: {e}); "
+				f"retry {attempt}/{attempts - 1} in {delay:.2f}s"
+			)
+			await asyncio.sleep(delay)
+			attempt += 1
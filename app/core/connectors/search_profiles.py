@@ -0,0 +1,45 @@
+from dataclasses import dataclass
+from typing import Literal
+
+SearchProfileName = Literal["fast", "balanced", "exhaustive"]
+
+
+@dataclass(frozen=True)
+class SearchProfile:
+	"""
+	How hard a hybrid search looks for the true nearest neighbours:
+
+	- ef: HNSW candidate list size of the dense leg (at least the leg's limit).
+	- overfetch: each leg hands limit * overfetch hits to the reranker, so a chunk
+	just below the cut on one leg can still win on the fused score.
+	- sparse_drop_ratio: share of the smallest query-term weights BM25 ignores.
+	- consistency: "Strong" waits for every acknowledged write, "Bounded"
+	tolerates a few seconds of lag and "Eventually" does not wait at all.
+	"""
+
+	ef: int
+	overfetch: int
+	sparse_drop_ratio: float
+	consistency: Literal["Strong", "Bounded", "Eventually"]
+
+	def leg_limit(self, limit: int) -> int:
+		return limit * max(1, self.overfetch)
+
+	def dense_params(self, limit: int) -> dict:
+		return {"ef": max(self.ef, self.leg_limit(limit))}
+
+	def sparse_params(self) -> dict:
+		return {"drop_ratio_search": self.sparse_drop_ratio}
+
+
+SEARCH_PROFILES: dict[str, SearchProfile] = {
+	"fast": SearchProfile(
+		ef=32, overfetch=1, sparse_drop_ratio=0.2, consistency="Eventually"
+	),
+	"balanced": SearchProfile(
+		ef=96, overfetch=2, sparse_drop_ratio=0.0, consistency="Bounded"
+	),
+	"exhaustive": SearchProfile(
+		ef=512, overfetch=4, sparse_drop_ratio=0.0, consistency="Strong"
+	),
+}
@@ -0,0 +1,42 @@
+from loguru import logger
+
+from app.core.connectors.embedded_store import (
+	EmbeddedInsert,
+	EmbeddedSearch,
+	close_embedded_store,
+	get_embedded_store,
+)
+from app.core.connectors.milvus import MilvusInsert, MilvusSearch
+from app.core.connectors.milvus_bootstrap import init_milvus
+from app.core.connectors.milvus_http import close_milvus_http, get_milvus_http
+from app.settings import Settings
+
+
+def _embedded() -> bool:
+	return Settings.get().VECTOR_BACKEND == "embedded"
+
+
+def vector_insert() -> MilvusInsert:
+	"""Writer for the backend selected by VECTOR_BACKEND."""
+	return EmbeddedInsert() if _embedded() else MilvusInsert()
+
+
+def vector_search() -> MilvusSearch:
+	"""Searcher for the backend selected by VECTOR_BACKEND."""
+	return EmbeddedSearch() if _embedded() else MilvusSearch()
+
+
+async def init_vector_backend() -> None:
+	if _embedded():
+		store = get_embedded_store()
+		logger.info(f"Embedded vector store ready ({len(store)} vectors)")
+		return
+	# one pooled HTTP client for the whole process
+	get_milvus_http()
+	await init_milvus()
+	logger.info("Milvus bootstrap completed.")
+
+
+async def close_vector_backend() -> None:
+	close_embedded_store()
+	await close_milvus_http()
@@ -0,0 +1,49 @@
+import math
+from typing import Literal, Sequence
+
+VectorStorage = Literal["float32", "float16", "bfloat16", "int8"]
+
+# Milvus field type for each storage mode (all indexed with HNSW/COSINE)
+MILVUS_VECTOR_TYPES: dict[str, str] = {
+	"float32": "FloatVector",
+	"float16": "Float16Vector",
+	"bfloat16": "BFloat16Vector",
+	"int8": "Int8Vector",  # Milvus >= 2.6
+}
+BYTES_PER_DIM: dict[str, int] = {
+	"float32": 4,
+	"float16": 2,
+	"bfloat16": 2,
+	"int8": 1,
+}
+
+# decimals kept in the JSON payload of half-precision vectors: beyond this
+# float16/bfloat16 cannot represent the difference anyway
+_HALF_DECIMALS = 4
+
+
+def truncate(vector: Sequence[float], dim: int) -> list[float]:
+	"""
+	Matryoshka truncation: keep the first `dim` components and re-normalise.
+	Only meaningful for models trained for it (OpenAI text-embedding-3).
+	"""
+	head = list(vector[:dim]) if dim and dim < len(vector) else list(vector)
+	norm = math.sqrt(sum(x * x for x in head)) or 1.0
+	return [x / norm for x in head]
+
+
+def encode_vector(
+	vector: Sequence[float], storage: VectorStorage = "float32"
+) -> list[float] | list[int]:
+	"""
+	Converts a float vector to the JSON representation of the `storage` type.
+	int8 vectors are scaled per vector so the largest component maps to 127;
+	cosine similarity does not depend on the scale.
+	"""
+	if storage == "int8":
+		peak = max((abs(x) for x in vector), default=0.0) or 1.0
+		scale = 127 / peak
+		return [round(x * scale) for x in vector]
+	if storage in ("float16", "bfloat16"):
+		return [round(x, _HALF_DECIMALS) for x in vector]
+	return [float(x) for x in vector]
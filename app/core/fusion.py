@@ -0,0 +1,94 @@
+from typing import Literal, Sequence
+
+import numpy as np
+from loguru import logger
+
+FusionName = Literal["weighted", "rrf"]
+
+# smoothing constant of Reciprocal Rank Fusion (the Milvus default)
+RRF_K = 60
+
+
+def milvus_rerank(fusion: str, dense_weight: float, sparse_weight: float) -> dict:
+	"""The `rerank` section of a Milvus advanced_search for `fusion`."""
+	if fusion == "rrf":
+		return {"strategy": "rrf", "params": {"k": RRF_K}}
+	return {
+		"strategy": "weighted",
+		"params": {"weights": [dense_weight, sparse_weight]},
+	}
+
+
+def fuse(
+	legs: Sequence[tuple[np.ndarray, np.ndarray]],
+	weights: Sequence[float],
+	fusion: str = "weighted",
+) -> tuple[np.ndarray, np.ndarray]:
+	"""
+	Merges ranked legs, each (rows best first, scores normalised to [0, 1]), into
+	(rows, fused scores) best first. "weighted" sums weight * score; "rrf" sums
+	1 / (RRF_K + rank) and ignores the scores and weights, like Milvus.
+	"""
+	legs = [(rows, scores) for rows, scores in legs if len(rows)]
+	if not legs:
+		return np.zeros(0, dtype=np.int64), np.zeros(0)
+	rows = np.concatenate([r for r, _ in legs])
+	if fusion == "rrf":
+		parts = [1 / (RRF_K + np.arange(1, len(r) + 1)) for r, _ in legs]
+	else:
+		parts = [
+			w * np.asarray(s, dtype=np.float64) for (_, s), w in zip(legs, weights)
+		]
+	unique, where = np.unique(rows, return_inverse=True)
+	scores = np.bincount(where, weights=np.concatenate(parts))
+	order = np.argsort(-scores, kind="stable")
+	return unique[order], scores[order]
+
+
+def mmr(
+	relevance: np.ndarray, vectors: np.ndarray, k: int, lambda_: float
+) -> list[int]:
+	"""
+	Maximal Marginal Relevance: picks k candidates one at a time, maximising
+	lambda * relevance - (1 - lambda) * (cosine to the closest one picked), so
+	near-duplicates of a picked chunk drop down. Relevance is min-max scaled, so
+	any fused score works. Returns indices in pick order.
+	"""
+	n = len(relevance)
+	if n == 0 or k <= 0:
+		return []
+	span = relevance.max() - relevance.min()
+	rel = (relevance - relevance.min()) / (span or 1.0)
+	norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+	unit = vectors / np.where(norms == 0, 1, norms)
+	similarity = unit @ unit.T
+
+	picked = [int(np.argmax(rel))]
+	available = np.ones(n, dtype=bool)
+	available[picked[0]] = False
+	closest = similarity[picked[0]].copy()
+	while len(picked) < min(k, n):
+		score = lambda_ * rel - (1 - lambda_) * closest
+		score[~available] = -np.inf
+		i = int(np.argmax(score))
+		picked.append(i)
+		available[i] = False
+		np.maximum(closest, similarity[i], out=closest)
+	return picked
+
+
+def diversify(hits: list[dict], k: int, lambda_: float) -> list[dict]:
+	"""
+	The k hits MMR keeps out of `hits` (best first, each with its "vector"),
+	without the vectors. Falls back to the first k if any vector is missing.
+	"""
+	vectors = [h.pop("vector", None) for h in hits]
+	if len(hits) <= k:
+		return hits
+	dim = len(vectors[0]) if isinstance(vectors[0], list) else 0
+	if not dim or any(not isinstance(v, list) or len(v) != dim for v in vectors):
+		logger.debug("MMR skipped: the search returned no usable vectors")
+		return hits[:k]
+	relevance = np.asarray([float(h.get("distance") or 0.0) for h in hits])
+	picked = mmr(relevance, np.asarray(vectors, dtype=np.float32), k, lambda_)
+	return [hits[i] for i in picked]
@@ -1,7 +1,7 @@
 import time
 from contextlib import contextmanager
 
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 INGEST_FILES = Counter(
 	"ingest_files_total",
@@ -17,10 +17,18 @@ INGEST_CHUNKS = Counter(
 	"ingest_chunks_total",
 	"Chunks gerados",
 )
+INGEST_CHUNKS_SUPPRESSED = Counter(
+	"ingest_chunks_suppressed_total",
+	"Chunks descartados por serem quase duplicados",
+)
 INGEST_OCR_PAGES = Counter(
 	"ingest_ocr_pages_total",
 	"Paginas OCR aplicadas",
 )
+INGEST_OCR_QUEUE_DEPTH = Gauge(
+	"ingest_ocr_queue_depth",
+	"Paginas aguardando OCR na fila",
+)
 
 EMBED_REQUESTS = Counter(
 	"embed_requests_total",
@@ -31,6 +39,29 @@ EMBED_VECTORS = Counter(
 	"Quantidade de textos embedados",
 )
 
+EMBED_QUEUE_DEPTH = Gauge(
+	"embed_queue_depth",
+	"Textos aguardando embedding no agendador",
+	["priority"],  # interactive | bulk
+)
+EMBED_CACHE_HITS = Counter(
+	"embed_cache_hits_total",
+	"Embeddings servidos pelo cache",
+	["tier"],  # memory | persistent
+)
+EMBED_CACHE_MISSES = Counter(
+	"embed_cache_misses_total",
+	"Embeddings ausentes do cache (enviados ao provedor)",
+)
+EMBED_CACHE_ENTRIES = Gauge(
+	"embed_cache_entries",
+	"Embeddings no cache em memoria",
+)
+EMBED_CACHE_BYTES = Gauge(
+	"embed_cache_bytes",
+	"Bytes ocupados pelo cache em memoria",
+)
+
 MILVUS_INSERT_BATCHES = Counter(
 	"milvus_insert_batches_total", "Batches enviados ao Milvus"
 )
@@ -38,6 +69,15 @@ MILVUS_INSERT_ERRORS = Counter(
 	"milvus_insert_errors_total",
 	"Falhas ao inserir",
 )
+MILVUS_ORPHANS_PURGED = Counter(
+	"milvus_orphans_purged_total",
+	"Vetores orfaos removidos do Milvus pela reconciliacao",
+)
+INDEX_RETRIES = Counter(
+	"index_retries_total",
+	"Novas tentativas apos falhas transitorias na indexacao",
+	["stage"],  # embed | insert | query_embed
+)
 
 QUERY_REQUESTS = Counter(
 	"query_requests_total",
@@ -56,13 +96,30 @@ SEARCH_ERRORS = Counter(
 	"search_errors_total",
 	"Erros em consultas de busca",
 )
+SEARCH_CACHE_HITS = Counter(
+	"search_cache_hits_total",
+	"Consultas servidas pelo cache de busca",
+	["level"],  # embedding | results
+)
+SEARCH_CACHE_MISSES = Counter(
+	"search_cache_misses_total",
+	"Consultas ausentes do cache de busca",
+	["level"],  # embedding | results
+)
+SEARCH_CACHE_SAVED_SECONDS = Counter(
+	"search_cache_saved_seconds_total",
+	"Latencia economizada pelo cache de busca (segundos)",
+	["level"],  # embedding | results
+)
 
 # latencias por estágio (segundos)
 STAGE_LATENCY = Histogram(
 	"rag_stage_latency_seconds",
 	"Latencia por estagio do pipeline",
 	["stage"],
-	# parse | chunkfy | embed | milvus_insert | search_dense | search_sparse | rerank | generate
+	# parse | ocr_page | chunkfy | embed | embed_throttle | milvus_insert
+	# | milvus_search | embedded_search | search_dense | search_sparse | rerank
+	# | generate
 	buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10),
 )
 
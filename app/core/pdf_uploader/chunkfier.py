@@ -1,10 +1,27 @@
 import re
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import Any, Callable, Dict, List
+
+from loguru import logger
 
 from app.rag.schemas import Chunk
 
+from .dedup import signature
+
+try:
+	import tiktoken
+except ImportError:  # optional: token counts fall back to a regex estimate
+	tiktoken = None
+
 _MD_IMG_RE = re.compile(r"!\[[^\]]*\]\([^)]+\)")
 _WS_RE = re.compile(r"\s+")
+# hyphenated line breaks and markdown images, removed in one pass
+_CLEAN_RE = re.compile(r"(?<=\w)-[ \t\r]*\n\s*(?=\w)|!\[[^\]]*\]\([^)]+\)")
+_SENT_END_RE = re.compile(r"(?<=[\.!?…])\s+(?=\S)")
+_WORD_RE = re.compile(r"\S+")
+_APPROX_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+DEFAULT_ENCODING = "cl100k_base"  # tokenizer of the OpenAI embedding models
 
 
 def _strip_md_images(text: str) -> str:
@@ -60,6 +77,102 @@ def _chunk_text(text: str, max_chars: int = 1200, overlap: int = 150) -> List[st
 	return [c for c in chunks if c]
 
 
+@lru_cache(maxsize=4)
+def get_token_counter(encoding: str = DEFAULT_ENCODING) -> Callable[[str], int]:
+	"""
+	Token counter for `encoding`. Uses tiktoken when it is installed and the
+	encoding can be loaded; otherwise words and punctuation marks are counted,
+	which slightly underestimates BPE token counts.
+	"""
+	if tiktoken is not None:
+		try:
+			enc = tiktoken.get_encoding(encoding)
+			return lambda text: len(enc.encode_ordinary(text))
+		except Exception as e:
+			logger.warning(f"tiktoken encoding {encoding!r} unavailable ({e!r})")
+	logger.warning(
+		"Counting tokens with the regex approximation, which undercounts BPE "
+		"tokens: token-budgeted chunks may exceed the embedding model's limit"
+	)
+	return lambda text: len(_APPROX_TOKEN_RE.findall(text))
+
+
+def _clean_text(text: str) -> str:
+	text = _CLEAN_RE.sub("", text or "")
+	return _WS_RE.sub(" ", text).strip()
+
+
+def _chunk_text_tokens(
+	text: str,
+	max_tokens: int = 300,
+	overlap_tokens: int = 40,
+	count_tokens: Callable[[str], int] | None = None,
+) -> List[str]:
+	"""
+	Token-budgeted, sentence-aware chunking.
+	Sentence spans are found once and token-counted once; each chunk is a single
+	slice of the cleaned text covering whole sentences, and consecutive chunks
+	share trailing sentences worth up to `overlap_tokens` tokens. Sentences
+	longer than `max_tokens` are split on word boundaries.
+	"""
+	count_tokens = count_tokens or get_token_counter()
+	text = _clean_text(text)
+	if not text:
+		return []
+
+	# (start, end, tokens) of every sentence, oversized ones pre-split
+	spans: list[tuple[int, int, int]] = []
+	start = 0
+	for m in [*_SENT_END_RE.finditer(text), None]:
+		end = m.start() if m else len(text)
+		n = count_tokens(text[start:end])
+		if n <= max_tokens:
+			spans.append((start, end, n))
+		else:
+			spans.extend(_split_words(text, start, end, max_tokens, count_tokens))
+		start = m.end() if m else end
+
+	chunks: List[str] = []
+	first = 0
+	while first < len(spans):
+		last, budget = first, spans[first][2]
+		while last + 1 < len(spans) and budget + spans[last + 1][2] <= max_tokens:
+			last += 1
+			budget += spans[last][2]
+		chunks.append(text[spans[first][0] : spans[last][1]])
+		if last + 1 >= len(spans):
+			break
+
+		# start the next chunk on the trailing sentences that fit the overlap
+		nxt, carried = last + 1, 0
+		while nxt - 1 > first and carried + spans[nxt - 1][2] <= overlap_tokens:
+			nxt -= 1
+			carried += spans[nxt][2]
+		first = nxt
+	return chunks
+
+
+def _split_words(
+	text: str,
+	start: int,
+	end: int,
+	max_tokens: int,
+	count_tokens: Callable[[str], int],
+) -> list[tuple[int, int, int]]:
+	pieces: list[tuple[int, int, int]] = []
+	piece_start, piece_end, budget = start, start, 0
+	for w in _WORD_RE.finditer(text, start, end):
+		n = count_tokens(w.group())
+		if budget and budget + n > max_tokens:
+			pieces.append((piece_start, piece_end, budget))
+			piece_start, budget = w.start(), 0
+		piece_end = w.end()
+		budget += n
+	if budget:
+		pieces.append((piece_start, piece_end, budget))
+	return pieces
+
+
 def add_extra_info(text: str, **info: Any) -> str:
 	extras = " ".join(f"[{k}:{v}]" for k, v in info.items() if v is not None)
 	return f"{text} {extras}".strip() if extras else text
@@ -72,19 +185,32 @@ def chunkfy_pages(
 	title: str | None = None,
 	max_chars: int = 1200,
 	overlap: int = 150,
+	signatures: bool = False,
+	max_tokens: int | None = None,
+	overlap_tokens: int = 0,
 ) -> List[Chunk]:
 	"""
 	Input: pages like those from pymupdf4llm.to_markdown(page_chunks=True),
 		e.g. [{"page": 1, "text": "...markdown..."}, ...]
 	Output: list of objects ready for your MilvusInsert.upload_chunks()
+	With `signatures`, each chunk gets the SimHash of its text (before the extra
+	info is appended) for near-duplicate suppression.
+	With `max_tokens`, chunk size and overlap are measured in tokens instead of
+	characters.
 	"""
 	chunks: List[Chunk] = []
 	for i, p in enumerate(pages, start=1):
 		page_no = int(p.get("page") or p.get("number") or i)
 		text = p.get("text") or p.get("content") or (p if isinstance(p, str) else "")
-		parts = _chunk_text(text, max_chars=max_chars, overlap=overlap)
+		if max_tokens:
+			parts = _chunk_text_tokens(
+				text, max_tokens=max_tokens, overlap_tokens=overlap_tokens
+			)
+		else:
+			parts = _chunk_text(text, max_chars=max_chars, overlap=overlap)
 
 		for idx, ch in enumerate(parts):
+			sig = signature(ch) if signatures else None
 			ch = add_extra_info(
 				ch, filename=filename, page_number=page_no, file_id=file_id, title=title
 			)
@@ -100,6 +226,7 @@ def chunkfy_pages(
 						if filename
 						else f"file#{file_id}#p{page_no}#{idx}"
 					),
+					simhash=sig,
 				)
 			)
 	return chunks
@@ -0,0 +1,165 @@
+import asyncio
+import re
+from hashlib import blake2b
+from typing import Iterable, Optional
+
+from beanie import PydanticObjectId
+from loguru import logger
+from pydantic import BaseModel
+
+from app.rag.models import ChunkDAO
+from app.settings import Settings
+
+_TOKEN_RE = re.compile(r"\w+")
+_BITS = 64
+_SHINGLE = 3  # words per shingle
+_MIN_TOKENS = 8  # shorter texts only collapse on an exact signature match
+
+Ref = tuple[str, int]  # (file_id, page_idx) that owns a signature
+
+
+def simhash(text: str) -> int:
+	"""64-bit SimHash of the word 3-shingles of `text` (case-insensitive)."""
+	tokens = _TOKEN_RE.findall(text.lower())
+	if not tokens:
+		return 0
+	shingles = {
+		" ".join(tokens[i : i + _SHINGLE])
+		for i in range(max(1, len(tokens) - _SHINGLE + 1))
+	}
+	hashes = [
+		int.from_bytes(blake2b(s.encode(), digest_size=8).digest(), "big")
+		for s in shingles
+	]
+	half = len(hashes) / 2
+	out = 0
+	for bit in range(_BITS):
+		mask = 1 << bit
+		if sum(1 for h in hashes if h & mask) > half:
+			out |= mask
+	return out
+
+
+def signature(text: str) -> str:
+	"""Hex signature stored on Chunk.simhash; very short texts get an 'x' prefix."""
+	sig = f"{simhash(text):016x}"
+	return sig if len(_TOKEN_RE.findall(text)) >= _MIN_TOKENS else f"x{sig}"
+
+
+class _SignatureRef(BaseModel):
+	file_id: PydanticObjectId
+	page_idx: int
+	simhash: str
+
+
+class SimHashIndex:
+	"""
+	In-memory near-duplicate index over chunk signatures.
+	Signatures are split into `max_distance + 1` bands; two signatures within
+	`max_distance` bits of each other share at least one band exactly, so only
+	the signatures in matching buckets are compared.
+	"""
+
+	def __init__(self, max_distance: int = 3):
+		self.max_distance = max(0, min(max_distance, _BITS // 2 - 1))
+		bands = self.max_distance + 1
+		width = _BITS // bands
+		self._bands = [
+			(i * width, (1 << (width if i < bands - 1 else _BITS - i * width)) - 1)
+			for i in range(bands)
+		]
+		self._buckets: list[dict[int, set[str]]] = [{} for _ in self._bands]
+		self._refs: dict[str, set[Ref]] = {}
+		self._by_file: dict[str, set[str]] = {}
+		self._loaded = False
+		self._load_lock = asyncio.Lock()
+
+	def __len__(self) -> int:
+		return len(self._refs)
+
+	def find(self, sig: str) -> Ref | None:
+		"""Returns an owner of a signature within `max_distance` of `sig`."""
+		refs = self._refs.get(sig)
+		if refs:
+			return next(iter(refs))
+		if sig.startswith("x"):
+			return None
+
+		value = int(sig, 16)
+		for (shift, mask), buckets in zip(self._bands, self._buckets):
+			for other in buckets.get((value >> shift) & mask, ()):
+				if (value ^ int(other, 16)).bit_count() <= self.max_distance:
+					return next(iter(self._refs[other]))
+		return None
+
+	def add(self, sig: str, ref: Ref) -> None:
+		refs = self._refs.get(sig)
+		if refs is None:
+			refs = self._refs[sig] = set()
+			if not sig.startswith("x"):
+				value = int(sig, 16)
+				for (shift, mask), buckets in zip(self._bands, self._buckets):
+					buckets.setdefault((value >> shift) & mask, set()).add(sig)
+		refs.add(ref)
+		self._by_file.setdefault(ref[0], set()).add(sig)
+
+	def remove(self, file_id: str, pages: Iterable[int] | None = None) -> None:
+		"""Forgets the signatures of a file, or of some of its pages."""
+		page_set = None if pages is None else set(pages)
+		sigs = self._by_file.get(file_id, set())
+		for sig in list(sigs):
+			refs = self._refs[sig]
+			refs -= {
+				r
+				for r in refs
+				if r[0] == file_id and (page_set is None or r[1] in page_set)
+			}
+			if not any(r[0] == file_id for r in refs):
+				sigs.discard(sig)
+			if not refs:
+				self._drop(sig)
+		if not sigs:
+			self._by_file.pop(file_id, None)
+
+	def _drop(self, sig: str) -> None:
+		del self._refs[sig]
+		if sig.startswith("x"):
+			return
+		value = int(sig, 16)
+		for (shift, mask), buckets in zip(self._bands, self._buckets):
+			key = (value >> shift) & mask
+			bucket = buckets.get(key)
+			if bucket is not None:
+				bucket.discard(sig)
+				if not bucket:
+					del buckets[key]
+
+	async def ensure_loaded(self) -> None:
+		"""Fills the index from the signatures of the chunks already in MongoDB."""
+		if self._loaded:
+			return
+		async with self._load_lock:
+			if self._loaded:
+				return
+			count = 0
+			async for ref in ChunkDAO.find({"simhash": {"$ne": None}}).project(
+				_SignatureRef
+			):
+				self.add(ref.simhash, (str(ref.file_id), ref.page_idx))
+				count += 1
+			self._loaded = True
+			logger.info(f"Near-duplicate index loaded with {count} chunk signatures")
+
+
+_dedup_index_singleton: Optional[SimHashIndex] = None
+
+
+def get_dedup_index() -> SimHashIndex | None:
+	"""The shared index, or None when near-duplicate suppression is disabled."""
+	global _dedup_index_singleton
+	s = Settings.get()
+	if not s.DEDUP_ENABLED:
+		return None
+	if _dedup_index_singleton is None:
+		_dedup_index_singleton = SimHashIndex(max_distance=s.DEDUP_MAX_DISTANCE)
+	return _dedup_index_singleton
@@ -0,0 +1,194 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Literal
+
+from loguru import logger
+
+from app.core.metrics import EMBED_QUEUE_DEPTH, observe
+
+Priority = Literal["interactive", "bulk"]
+SendBatch = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+class TokenBucket:
+	"""Refills `per_minute` units per minute up to `capacity`; 0 disables it."""
+
+	def __init__(self, per_minute: float, capacity: float | None = None):
+		self.rate = per_minute / 60
+		self.capacity = capacity or per_minute
+		self._level = self.capacity
+		self._stamp = time.monotonic()
+
+	async def acquire(self, amount: float) -> None:
+		if self.rate <= 0:
+			return
+		# a single oversized request still goes through, once the bucket is full
+		amount = min(amount, self.capacity)
+		while True:
+			now = time.monotonic()
+			self._level = min(
+				self.capacity, self._level + (now - self._stamp) * self.rate
+			)
+			self._stamp = now
+			if self._level >= amount:
+				self._level -= amount
+				return
+			await asyncio.sleep((amount - self._level) / self.rate)
+
+
+@dataclass
+class _Pending:
+	text: str
+	tokens: int
+	future: asyncio.Future
+
+
+class EmbeddingScheduler:
+	"""
+	Process-wide embedding request scheduler.
+
+	Texts from every caller are queued and a single dispatcher packs them into
+	provider requests of up to `batch_size` texts / `max_batch_tokens` tokens,
+	waiting `window` seconds for more texts when a batch is not yet full.
+	Interactive texts (queries) are always taken before bulk ones (ingestion).
+	Requests are paced by requests/min and tokens/min buckets, at most
+	`max_concurrency` are in flight, and each caller gets its own vectors back.
+	"""
+
+	def __init__(
+		self,
+		send: SendBatch,
+		count_tokens: Callable[[str], int],
+		batch_size: int = 64,
+		max_batch_tokens: int = 100_000,
+		window: float = 0.005,
+		requests_per_minute: int = 0,
+		tokens_per_minute: int = 0,
+		max_concurrency: int = 4,
+	):
+		self.send = send
+		self.count_tokens = count_tokens
+		self.batch_size = max(1, batch_size)
+		self.max_batch_tokens = max(1, max_batch_tokens)
+		self.window = window
+		self._requests = TokenBucket(requests_per_minute)
+		self._tokens = TokenBucket(tokens_per_minute)
+		self._limit = asyncio.Semaphore(max(1, max_concurrency))
+		self._queues: dict[Priority, deque[_Pending]] = {
+			"interactive": deque(),
+			"bulk": deque(),
+		}
+		self._wakeup = asyncio.Event()
+		self._dispatcher: asyncio.Task | None = None
+		self._inflight: set[asyncio.Task] = set()
+
+	async def embed(
+		self, texts: List[str], priority: Priority = "bulk"
+	) -> List[List[float]]:
+		if not texts:
+			return []
+		self._start()
+		loop = asyncio.get_running_loop()
+		queue = self._queues[priority]
+		futures = []
+		for text in texts:
+			fut = loop.create_future()
+			queue.append(_Pending(text, self.count_tokens(text), fut))
+			futures.append(fut)
+		EMBED_QUEUE_DEPTH.labels(priority).inc(len(texts))
+		self._wakeup.set()
+		try:
+			return list(await asyncio.gather(*futures))
+		except BaseException:
+			for fut in futures:
+				if not fut.done():
+					fut.cancel()
+				elif not fut.cancelled():
+					fut.exception()  # retrieved: one failure is raised, not each
+			raise
+
+	def _start(self) -> None:
+		if self._dispatcher is None or self._dispatcher.done():
+			self._dispatcher = asyncio.create_task(
+				self._dispatch(), name="embedding-scheduler"
+			)
+
+	def _pending(self) -> int:
+		return sum(len(q) for q in self._queues.values())
+
+	async def _dispatch(self) -> None:
+		while True:
+			await self._wakeup.wait()
+			if not self._pending():
+				self._wakeup.clear()
+				continue
+
+			# coalescing window: let concurrent callers top the batch up
+			if self._pending() < self.batch_size:
+				await asyncio.sleep(self.window)
+
+			await self._limit.acquire()
+			batch = self._take_batch()
+			if not batch:
+				self._limit.release()
+				continue
+
+			with observe("embed_throttle"):
+				await self._requests.acquire(1)
+				await self._tokens.acquire(sum(p.tokens for p in batch))
+			task = asyncio.create_task(self._send(batch))
+			self._inflight.add(task)
+			task.add_done_callback(self._inflight.discard)
+
+	def _take_batch(self) -> List[_Pending]:
+		batch: List[_Pending] = []
+		tokens = 0
+		for priority, queue in self._queues.items():
+			while queue and len(batch) < self.batch_size:
+				item = queue[0]
+				if batch and tokens + item.tokens > self.max_batch_tokens:
+					return batch
+				queue.popleft()
+				EMBED_QUEUE_DEPTH.labels(priority).dec()
+				if item.future.done():  # caller went away
+					continue
+				batch.append(item)
+				tokens += item.tokens
+		return batch
+
+	async def _send(self, batch: List[_Pending]) -> None:
+		try:
+			vectors = await self.send([p.text for p in batch])
+			if len(vectors) != len(batch):
+				raise ValueError(
+					f"embed: got {len(vectors)} vectors for {len(batch)} texts"
+				)
+			for item, vec in zip(batch, vectors):
+				if not item.future.done():
+					item.future.set_result(vec)
+		except asyncio.CancelledError:
+			for item in batch:
+				item.future.cancel()
+			raise
+		except Exception as e:
+			logger.error(f"Embedding request of {len(batch)} texts failed: {e!r}")
+			for item in batch:
+				if not item.future.done():
+					item.future.set_exception(e)
+		finally:
+			self._limit.release()
+
+	async def close(self) -> None:
+		tasks = [t for t in (self._dispatcher, *self._inflight) if t is not None]
+		for task in tasks:
+			task.cancel()
+		await asyncio.gather(*tasks, return_exceptions=True)
+		self._dispatcher = None
+		for priority, queue in self._queues.items():
+			EMBED_QUEUE_DEPTH.labels(priority).dec(len(queue))
+			while queue:
+				fut = queue.popleft().future
+				if not fut.done():
+					fut.cancel()
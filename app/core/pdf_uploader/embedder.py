@@ -1,34 +1,126 @@
 import asyncio
-from typing import List
-
-from openai import OpenAI
+from typing import List, Optional
 
 from app.core.metrics import EMBED_REQUESTS, EMBED_VECTORS, observe
 from app.settings import Settings
 
+from .chunkfier import get_token_counter
+from .embed_scheduler import EmbeddingScheduler, Priority
+from .embedding_cache import EmbeddingCache, cache_key, get_embedding_cache
+from .embedding_providers import EmbeddingProvider, OpenAIProvider, build_provider
+
 setts = Settings.get()
 
 
 class AsyncEmbedder:
+	"""
+	Embeds texts with an EmbeddingProvider (OpenAI by default).
+	Inputs larger than `batch_size` are split into sub-batches that are sent
+	concurrently, at most `max_concurrency` at a time per embedder. With a
+	`scheduler`, requests are instead packed, paced and prioritised by it.
+	"""
+
 	def __init__(
 		self,
 		model_name: str = "text-embedding-3-small",
 		batch_size: int = 32,
+		max_concurrency: int = 4,
+		cache: EmbeddingCache | None = None,
+		provider: EmbeddingProvider | None = None,
+		scheduler: EmbeddingScheduler | None = None,
 	):
-		self.client = OpenAI(api_key=setts.OPENAI_API_KEY)
-		self.model_name = model_name
-		self.batch_size = batch_size
+		self.provider = provider or OpenAIProvider(
+			model=model_name, max_connections=max_concurrency
+		)
+		# names the vector space in cache keys
+		self.model_name = self.provider.model
+		self.dim = self.provider.dim
+		self.batch_size = max(1, batch_size)
+		self._limit = asyncio.Semaphore(max(1, max_concurrency))
+		if cache is None and setts.EMBED_CACHE_ENABLED:
+			cache = get_embedding_cache()
+		self.cache = cache
+		self.scheduler = scheduler
+
+	async def encode(
+		self, texts: List[str], priority: Priority = "bulk"
+	) -> List[List[float]]:
+		"""
+		Encode a list of texts.
+		Cached embeddings are reused; only the misses (deduplicated) are sent to
+		the provider. Queries should pass priority="interactive" so they are not
+		queued behind ingestion.
+		"""
+		if self.cache is None:
+			return await self._encode_remote(texts, priority)
+
+		keys = [cache_key(self.model_name, t) for t in texts]
+		found = await self.cache.get_many(keys)
+
+		# identical texts share a key and are only embedded once
+		misses = {k: t for k, t in zip(keys, texts) if k not in found}
+		if misses:
+			vectors = await self._encode_remote(list(misses.values()), priority)
+			fresh = dict(zip(misses, vectors))
+			await self.cache.put_many(self.model_name, fresh)
+			found.update(fresh)
+
+		return [found[k] for k in keys]
 
-	async def encode(self, texts: List[str]) -> List[List[float]]:
-		"""Encode a list of texts off the event loop."""
-		EMBED_REQUESTS.inc()
-		EMBED_VECTORS.inc(len(texts))
+	async def _encode_remote(
+		self, texts: List[str], priority: Priority = "bulk"
+	) -> List[List[float]]:
+		if self.scheduler is not None:
+			return await self.scheduler.embed(texts, priority)
 
-		loop = asyncio.get_running_loop()
+		batches = [
+			texts[i : i + self.batch_size]
+			for i in range(0, len(texts), self.batch_size)
+		]
+		results = await asyncio.gather(*(self._embed_batch(b) for b in batches))
+		return [vec for vectors in results for vec in vectors]
 
-		def _encode(batch):
+	async def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+		async with self._limit:
+			EMBED_REQUESTS.inc()
+			EMBED_VECTORS.inc(len(batch))
 			with observe("embed"):
-				resp = self.client.embeddings.create(input=batch, model=self.model_name)
-			return [d.embedding for d in resp.data]
+				return await self.provider.embed(batch)
+
+	async def close(self) -> None:
+		if self.scheduler is not None:
+			await self.scheduler.close()
+		await self.provider.close()
+
+
+_embedder_singleton: Optional[AsyncEmbedder] = None
+
+
+def get_embedder() -> AsyncEmbedder:
+	"""Process-wide embedder, so every caller shares one connection pool."""
+	global _embedder_singleton
+	if _embedder_singleton is None:
+		embedder = AsyncEmbedder(
+			provider=build_provider(setts),
+			batch_size=setts.EMBED_BATCH_SIZE,
+			max_concurrency=setts.EMBED_CONCURRENCY,
+		)
+		embedder.scheduler = EmbeddingScheduler(
+			send=embedder._embed_batch,
+			count_tokens=get_token_counter(),
+			batch_size=setts.EMBED_BATCH_SIZE,
+			max_batch_tokens=setts.EMBED_MAX_BATCH_TOKENS,
+			window=setts.EMBED_COALESCE_MS / 1000,
+			requests_per_minute=setts.EMBED_RPM,
+			tokens_per_minute=setts.EMBED_TPM,
+			max_concurrency=setts.EMBED_CONCURRENCY,
+		)
+		_embedder_singleton = embedder
+	return _embedder_singleton
+
 
-		return await loop.run_in_executor(None, _encode, texts)
+async def close_embedder() -> None:
+	global _embedder_singleton
+	if _embedder_singleton is not None:
+		await _embedder_singleton.close()
+		_embedder_singleton = None
@@ -0,0 +1,184 @@
+import hashlib
+import time
+from array import array
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from loguru import logger
+from pymongo.errors import BulkWriteError
+
+from app.core.metrics import (
+	EMBED_CACHE_BYTES,
+	EMBED_CACHE_ENTRIES,
+	EMBED_CACHE_HITS,
+	EMBED_CACHE_MISSES,
+)
+from app.rag.models import EmbeddingCacheDAO
+from app.settings import Settings
+
+_ENTRY_OVERHEAD = 64 + 112  # key string + OrderedDict slot, roughly
+_TRIM_INTERVAL = 60.0  # seconds between size checks of the persistent tier
+
+
+def cache_key(model: str, text: str) -> str:
+	"""Content address of an embedding: sha256 over the model name and the text."""
+	h = hashlib.sha256(model.encode("utf-8"))
+	h.update(b"\0")
+	h.update(text.encode("utf-8"))
+	return h.hexdigest()
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+	return array("f", vector).tobytes()
+
+
+def unpack_vector(data: bytes) -> list[float]:
+	vec = array("f")
+	vec.frombytes(data)
+	return vec.tolist()
+
+
+class EmbeddingCache:
+	"""
+	Two-tier embedding cache keyed by `cache_key(model, text)`:
+
+	- memory: LRU of float32 vectors, bounded by `max_entries` and `max_bytes`
+	- persistent: EmbeddingCacheDAO in Mongo, shared across restarts and replicas,
+	bounded by EMBED_CACHE_TTL_DAYS and `persist_max_entries` (oldest evicted)
+
+	Persistent-tier failures (e.g. Beanie not initialised) are logged and treated
+	as misses, so the cache never fails an embedding call.
+	"""
+
+	def __init__(
+		self,
+		max_entries: int = 50_000,
+		max_bytes: int = 256 * 1024 * 1024,
+		persistent: bool = True,
+		persist_max_entries: int = 0,
+	):
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.persistent = persistent
+		self.persist_max_entries = persist_max_entries
+		self._trimmed_at = float("-inf")
+		self._mem: OrderedDict[str, bytes] = OrderedDict()
+		self._bytes = 0
+
+	def __len__(self) -> int:
+		return len(self._mem)
+
+	@property
+	def nbytes(self) -> int:
+		return self._bytes
+
+	async def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+		"""Returns the cached vectors for `keys`; missing keys are left out."""
+		found: dict[str, list[float]] = {}
+		missing: list[str] = []
+		unique = dict.fromkeys(keys)
+		for key in unique:
+			data = self._mem.get(key)
+			if data is None:
+				missing.append(key)
+				continue
+			self._mem.move_to_end(key)
+			found[key] = unpack_vector(data)
+		EMBED_CACHE_HITS.labels("memory").inc(len(found))
+
+		if missing and self.persistent:
+			stored = await self._load(missing)
+			for key, data in stored.items():
+				self._remember(key, data)
+				found[key] = unpack_vector(data)
+			EMBED_CACHE_HITS.labels("persistent").inc(len(stored))
+
+		EMBED_CACHE_MISSES.inc(len(unique) - len(found))
+		self._update_gauges()
+		return found
+
+	async def put_many(self, model: str, items: dict[str, list[float]]) -> None:
+		packed = {key: pack_vector(vec) for key, vec in items.items()}
+		for key, data in packed.items():
+			self._remember(key, data)
+		self._update_gauges()
+		if packed and self.persistent:
+			await self._store(model, packed)
+			await self._trim()
+
+	def clear(self) -> None:
+		self._mem.clear()
+		self._bytes = 0
+		self._update_gauges()
+
+	def _remember(self, key: str, data: bytes) -> None:
+		old = self._mem.pop(key, None)
+		if old is not None:
+			self._bytes -= len(old) + _ENTRY_OVERHEAD
+		self._mem[key] = data
+		self._bytes += len(data) + _ENTRY_OVERHEAD
+		while self._mem and (
+			(self.max_entries and len(self._mem) > self.max_entries)
+			or (self.max_bytes and self._bytes > self.max_bytes)
+		):
+			_, evicted = self._mem.popitem(last=False)
+			self._bytes -= len(evicted) + _ENTRY_OVERHEAD
+
+	def _update_gauges(self) -> None:
+		EMBED_CACHE_ENTRIES.set(len(self._mem))
+		EMBED_CACHE_BYTES.set(self._bytes)
+
+	async def _load(self, keys: list[str]) -> dict[str, bytes]:
+		try:
+			docs = await EmbeddingCacheDAO.find({"key": {"$in": keys}}).to_list()
+		except Exception as e:
+			logger.warning(f"Embedding cache lookup failed: {e!r}")
+			return {}
+		return {d.key: d.vector for d in docs}
+
+	async def _store(self, model: str, packed: dict[str, bytes]) -> None:
+		docs = [
+			EmbeddingCacheDAO(key=key, model=model, vector=data)
+			for key, data in packed.items()
+		]
+		try:
+			await EmbeddingCacheDAO.insert_many(docs, ordered=False)
+		except BulkWriteError:
+			pass  # keys written concurrently by another ingestion/replica
+		except Exception as e:
+			logger.warning(f"Embedding cache write failed: {e!r}")
+
+	async def _trim(self) -> None:
+		"""Deletes the oldest persistent entries beyond `persist_max_entries`."""
+		now = time.monotonic()
+		if not self.persist_max_entries or now - self._trimmed_at < _TRIM_INTERVAL:
+			return
+		self._trimmed_at = now
+		try:
+			collection = EmbeddingCacheDAO.get_pymongo_collection()
+			excess = await collection.estimated_document_count()
+			excess -= self.persist_max_entries
+			if excess <= 0:
+				return
+			oldest = collection.find({}, {"_id": 1}).sort("created_at", 1).limit(excess)
+			ids = [doc["_id"] async for doc in oldest]
+			await collection.delete_many({"_id": {"$in": ids}})
+			logger.info(f"Embedding cache: evicted {len(ids)} oldest entries")
+		except Exception as e:
+			logger.warning(f"Embedding cache trim failed: {e!r}")
+
+
+_embedding_cache_singleton: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+	global _embedding_cache_singleton
+	if _embedding_cache_singleton is None:
+		s = Settings.get()
+		_embedding_cache_singleton = EmbeddingCache(
+			max_entries=s.EMBED_CACHE_MAX_ENTRIES,
+			max_bytes=s.EMBED_CACHE_MAX_BYTES,
+			persistent=s.EMBED_CACHE_PERSIST,
+			persist_max_entries=s.EMBED_CACHE_PERSIST_MAX_ENTRIES,
+		)
+	return _embedding_cache_singleton
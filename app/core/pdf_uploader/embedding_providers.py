@@ -0,0 +1,151 @@
+import asyncio
+import hashlib
+import math
+import re
+from typing import List
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from app.settings import Settings
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# output dimension of the OpenAI embedding models
+OPENAI_DIMENSIONS = {
+	"text-embedding-3-small": 1536,
+	"text-embedding-3-large": 3072,
+	"text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingProvider:
+	"""
+	Backend that turns a batch of texts into vectors.
+	`model` identifies the vector space (it is part of the embedding cache key)
+	and `dim` is the vector size, which the Milvus collection is created with.
+	"""
+
+	model: str
+	dim: int
+
+	async def embed(self, texts: List[str]) -> List[List[float]]:
+		raise NotImplementedError
+
+	async def close(self) -> None:
+		pass
+
+
+class OpenAIProvider(EmbeddingProvider):
+	def __init__(
+		self,
+		model: str = "text-embedding-3-small",
+		max_connections: int = 4,
+		api_key: str | None = None,
+		dimensions: int = 0,
+	):
+		# text-embedding-3 models return Matryoshka-truncated vectors on request
+		self.dimensions = dimensions
+		self.model = f"{model}@{dimensions}" if dimensions else model
+		self.model_name = model
+		self.dim = dimensions or OPENAI_DIMENSIONS.get(model, 1536)
+		self.client = AsyncOpenAI(
+			api_key=api_key if api_key is not None else Settings.get().OPENAI_API_KEY,
+			# retries are owned by with_retries (per-ingestion budget for documents,
+			# a few quick ones for queries); the SDK's own would multiply them
+			max_retries=0,
+			http_client=DefaultAsyncHttpxClient(
+				limits=httpx.Limits(
+					max_connections=max(1, max_connections),
+					max_keepalive_connections=max(1, max_connections),
+				)
+			),
+		)
+
+	async def embed(self, texts: List[str]) -> List[List[float]]:
+		if self.dimensions:
+			resp = await self.client.embeddings.create(
+				input=texts, model=self.model_name, dimensions=self.dimensions
+			)
+		else:
+			resp = await self.client.embeddings.create(
+				input=texts, model=self.model_name
+			)
+		return [d.embedding for d in resp.data]
+
+	async def close(self) -> None:
+		await self.client.close()
+
+
+class HashingProvider(EmbeddingProvider):
+	"""
+	CPU-local lexical encoder: word unigrams and bigrams are hashed into `dim`
+	signed buckets with log term-frequency weights, then L2-normalised. Texts
+	sharing vocabulary land close together, so search behaves plausibly without
+	a network call.
+	"""
+
+	def __init__(self, dim: int = 384):
+		self.dim = dim
+		self.model = f"hashing-{dim}"
+
+	def _encode(self, text: str) -> List[float]:
+		tokens = _TOKEN_RE.findall(text.lower())
+		counts: dict[str, int] = {}
+		for feature in [*tokens, *map(" ".join, zip(tokens, tokens[1:]))]:
+			counts[feature] = counts.get(feature, 0) + 1
+
+		vec = [0.0] * self.dim
+		for feature, tf in counts.items():
+			h = int.from_bytes(
+				hashlib.blake2b(feature.encode(), digest_size=8).digest()
+			)
+			vec[h % self.dim] += (1.0 + math.log(tf)) * (1 if h >> 63 else -1)
+		norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+		return [v / norm for v in vec]
+
+	async def embed(self, texts: List[str]) -> List[List[float]]:
+		return await asyncio.to_thread(lambda: [self._encode(t) for t in texts])
+
+
+class FakeProvider(EmbeddingProvider):
+	"""
+	Deterministic unit vectors derived from a hash of the text: identical texts
+	get identical vectors, anything else is unrelated. For load tests where only
+	throughput matters.
+	"""
+
+	def __init__(self, dim: int = 384):
+		self.dim = dim
+		self.model = f"fake-{dim}"
+
+	def _encode(self, text: str) -> List[float]:
+		raw = hashlib.shake_256(text.encode()).digest(self.dim)
+		vec = [b - 127.5 for b in raw]
+		norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+		return [v / norm for v in vec]
+
+	async def embed(self, texts: List[str]) -> List[List[float]]:
+		return [self._encode(t) for t in texts]
+
+
+def build_provider(settings: Settings | None = None) -> EmbeddingProvider:
+	"""The provider selected by EMBED_PROVIDER."""
+	s = settings or Settings.get()
+	if s.EMBED_PROVIDER == "hashing":
+		return HashingProvider(dim=s.EMBED_DIM)
+	if s.EMBED_PROVIDER == "fake":
+		return FakeProvider(dim=s.EMBED_DIM)
+	return OpenAIProvider(
+		model=s.EMBED_MODEL,
+		max_connections=s.EMBED_CONCURRENCY,
+		dimensions=s.EMBED_DIMENSIONS,
+	)
+
+
+def provider_dimension(settings: Settings | None = None) -> int:
+	"""Vector size of the configured provider, without building a client."""
+	s = settings or Settings.get()
+	if s.EMBED_PROVIDER in ("hashing", "fake"):
+		return s.EMBED_DIM
+	return s.EMBED_DIMENSIONS or OPENAI_DIMENSIONS.get(s.EMBED_MODEL, 1536)
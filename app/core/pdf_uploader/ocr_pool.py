@@ -0,0 +1,185 @@
+import asyncio
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+from pymupdf import Document
+
+from app.core.metrics import INGEST_OCR_PAGES, INGEST_OCR_QUEUE_DEPTH, observe
+from app.settings import Settings
+
+from .parser import PdfSource, _ocr_page, open_pdf
+
+# per worker process: documents opened from disk, reused across their pages
+_DOC_CACHE: "OrderedDict[tuple[str, int], Document]" = OrderedDict()
+_DOC_CACHE_SIZE = 4
+
+
+def _cached_doc(path: str) -> Document:
+	key = (path, os.stat(path).st_mtime_ns)
+	doc = _DOC_CACHE.get(key)
+	if doc is None:
+		doc = open_pdf(path)
+		_DOC_CACHE[key] = doc
+		while len(_DOC_CACHE) > _DOC_CACHE_SIZE:
+			_, old = _DOC_CACHE.popitem(last=False)
+			old.close()
+	else:
+		_DOC_CACHE.move_to_end(key)
+	return doc
+
+
+@lru_cache(maxsize=1)
+def _spool_dir() -> Path:
+	return Path(Settings.get().INGEST_SPOOL_DIR).resolve()
+
+
+def _is_spooled(path: str) -> bool:
+	return Path(path).resolve().is_relative_to(_spool_dir())
+
+
+def _ocr_task(
+	source: PdfSource, page_index: int, dpi: int, lang: str, timeout: float
+) -> str:
+	"""Runs in an OCR worker process: OCR a single page."""
+	# spool files are deleted once ingested, and a cached handle would keep their
+	# disk space until evicted: those are opened per page (OCR dominates anyway)
+	if isinstance(source, str) and not _is_spooled(source):
+		return _ocr_page(_cached_doc(source), page_index, dpi, lang, timeout)
+
+	doc = open_pdf(source)
+	try:
+		return _ocr_page(doc, page_index, dpi, lang, timeout)
+	finally:
+		doc.close()
+
+
+class OcrPool:
+	"""
+	Persistent pool of OCR worker processes fed by a shared work queue.
+	`max_workers` bounds how many pages are OCR'd at once across all ingestions;
+	each page gets at most `page_timeout` seconds (0 = no limit).
+	"""
+
+	def __init__(self, max_workers: int | None = None, page_timeout: float = 120):
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self.page_timeout = page_timeout
+		self._pool: ProcessPoolExecutor | None = None
+		self._queue: asyncio.Queue | None = None
+		self._workers: list[asyncio.Task] = []
+
+	def _start(self) -> asyncio.Queue:
+		if self._queue is None:
+			self._pool = ProcessPoolExecutor(
+				max_workers=self.max_workers,
+				mp_context=multiprocessing.get_context("spawn"),
+			)
+			self._queue = asyncio.Queue()
+			self._workers = [
+				asyncio.create_task(self._worker(), name=f"ocr-worker-{i}")
+				for i in range(self.max_workers)
+			]
+			logger.info(f"Started OCR pool with {self.max_workers} workers")
+		return self._queue
+
+	async def ocr_pages(
+		self,
+		source: PdfSource,
+		page_indexes: list[int],
+		dpi: int = 300,
+		lang: str = "por+eng+spa",
+	) -> list[str]:
+		"""
+		OCR the given 0-based pages. Returns the texts in the same order as
+		`page_indexes`; pages that fail or time out come back as "".
+		"""
+		queue = self._start()
+		loop = asyncio.get_running_loop()
+		futures: list[asyncio.Future] = []
+		for page_index in page_indexes:
+			fut = loop.create_future()
+			futures.append(fut)
+			queue.put_nowait((source, page_index, dpi, lang, fut))
+			INGEST_OCR_QUEUE_DEPTH.inc()
+		return await asyncio.gather(*futures)
+
+	async def _worker(self) -> None:
+		assert self._queue is not None
+		loop = asyncio.get_running_loop()
+		# tesseract enforces page_timeout itself; the grace period covers the
+		# rendering before it, and guards against a stuck worker
+		wait = self.page_timeout * 1.5 + 5 if self.page_timeout > 0 else None
+		while True:
+			source, page_index, dpi, lang, fut = await self._queue.get()
+			INGEST_OCR_QUEUE_DEPTH.dec()
+			try:
+				if fut.cancelled():
+					continue
+				with observe("ocr_page"):
+					text = await asyncio.wait_for(
+						loop.run_in_executor(
+							self._pool,
+							_ocr_task,
+							source,
+							page_index,
+							dpi,
+							lang,
+							self.page_timeout,
+						),
+						timeout=wait,
+					)
+				INGEST_OCR_PAGES.inc()
+				if not fut.done():
+					fut.set_result(text)
+			except asyncio.CancelledError:
+				if not fut.done():
+					fut.cancel()
+				raise
+			except Exception as e:
+				logger.error(f"OCR worker failed on page {page_index + 1}: {e!r}")
+				if not fut.done():
+					fut.set_result("")
+			finally:
+				self._queue.task_done()
+
+	def shutdown(self) -> None:
+		for task in self._workers:
+			task.cancel()
+		self._workers = []
+		if self._queue is not None:
+			# unblock anyone still waiting on queued pages
+			while not self._queue.empty():
+				*_, fut = self._queue.get_nowait()
+				INGEST_OCR_QUEUE_DEPTH.dec()
+				if not fut.done():
+					fut.cancel()
+			self._queue = None
+		if self._pool is not None:
+			self._pool.shutdown(wait=False, cancel_futures=True)
+			self._pool = None
+
+
+_ocr_pool_singleton: Optional[OcrPool] = None
+
+
+def get_ocr_pool() -> OcrPool:
+	global _ocr_pool_singleton
+	if _ocr_pool_singleton is None:
+		s = Settings.get()
+		_ocr_pool_singleton = OcrPool(
+			max_workers=s.OCR_WORKERS or None,
+			page_timeout=s.OCR_PAGE_TIMEOUT,
+		)
+	return _ocr_pool_singleton
+
+
+def shutdown_ocr_pool() -> None:
+	global _ocr_pool_singleton
+	if _ocr_pool_singleton is not None:
+		_ocr_pool_singleton.shutdown()
+		_ocr_pool_singleton = None
@@ -0,0 +1,230 @@
+import asyncio
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Optional
+
+from loguru import logger
+
+from app.core.metrics import observe
+from app.settings import Settings
+
+from .ocr_pool import OcrPool, get_ocr_pool, shutdown_ocr_pool
+from .parser import (
+	PdfSource,
+	apply_ocr,
+	markdown_parse,
+	open_pdf,
+	page_fingerprint,
+)
+
+
+def _inspect(source: PdfSource) -> tuple[int, dict[str, Any]]:
+	"""Runs in a worker process: page count and document metadata."""
+	doc = open_pdf(source)
+	try:
+		return doc.page_count, dict(doc.metadata or {})
+	finally:
+		doc.close()
+
+
+def _page_hashes(source: PdfSource) -> list[str]:
+	"""Runs in a worker process: `page_fingerprint` of every page, in order."""
+	doc = open_pdf(source)
+	try:
+		return [page_fingerprint(doc, i) for i in range(doc.page_count)]
+	finally:
+		doc.close()
+
+
+def _parse_range(source: PdfSource, start: int, stop: int) -> list[dict]:
+	"""
+	Runs in a worker process: parses pages [start, stop) of the document.
+	OCR is left to the OCR pool; pages that need it come back flagged.
+	Only the fields used downstream are returned to keep the IPC payload small.
+	"""
+	doc = open_pdf(source)
+	try:
+		md = markdown_parse(doc, pages=list(range(start, stop)), ocr=False)
+	finally:
+		doc.close()
+
+	return [
+		{
+			"page": p["page"],
+			"text": p.get("text") or p.get("content") or "",
+			"needs_ocr": bool(p.get("needs_ocr")),
+		}
+		for p in md
+	]
+
+
+class ParseEngine:
+	"""
+	Parses PDFs on a process pool so the event loop stays responsive.
+	Documents are split into page ranges that are parsed in parallel and merged
+	back in page order. Image-only pages are handed to the OCR pool.
+	"""
+
+	def __init__(
+		self,
+		max_workers: int | None = None,
+		pages_per_task: int = 8,
+		ocr_pool: OcrPool | None = None,
+	):
+		self.max_workers = max_workers or os.cpu_count() or 1
+		self.pages_per_task = max(1, pages_per_task)
+		self._ocr_pool = ocr_pool
+		self._pool: ProcessPoolExecutor | None = None
+
+	@property
+	def ocr_pool(self) -> OcrPool:
+		if self._ocr_pool is None:
+			self._ocr_pool = get_ocr_pool()
+		return self._ocr_pool
+
+	@property
+	def pool(self) -> ProcessPoolExecutor:
+		if self._pool is None:
+			# spawn: forking a process that already runs an event loop and the
+			# motor/httpx threads is not safe
+			self._pool = ProcessPoolExecutor(
+				max_workers=self.max_workers,
+				mp_context=multiprocessing.get_context("spawn"),
+			)
+			logger.info(f"Started PDF parse pool with {self.max_workers} workers")
+		return self._pool
+
+	def page_ranges(
+		self, page_count: int, pages: list[int] | None = None
+	) -> list[tuple[int, int]]:
+		"""
+		Splits the document into [start, stop) ranges of at most `pages_per_task`
+		pages. With `pages` (0-based), only runs of those pages are covered.
+		"""
+		if pages is None:
+			return [
+				(start, min(start + self.pages_per_task, page_count))
+				for start in range(0, page_count, self.pages_per_task)
+			]
+
+		ranges: list[tuple[int, int]] = []
+		for p in sorted(set(pages)):
+			if not 0 <= p < page_count:
+				continue
+			if ranges:
+				start, stop = ranges[-1]
+				if p == stop and stop - start < self.pages_per_task:
+					ranges[-1] = (start, p + 1)
+					continue
+			ranges.append((p, p + 1))
+		return ranges
+
+	async def inspect(self, source: PdfSource) -> tuple[int, dict[str, Any]]:
+		"""Returns (page_count, metadata) without blocking the event loop."""
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self.pool, _inspect, source)
+
+	async def page_hashes(self, source: PdfSource) -> list[str]:
+		"""Per-page content fingerprints, computed on the pool."""
+		loop = asyncio.get_running_loop()
+		return await loop.run_in_executor(self.pool, _page_hashes, source)
+
+	async def iter_pages(
+		self,
+		source: PdfSource,
+		page_count: int | None = None,
+		ocr_lang: str = "por+eng+spa",
+		dpi: int = 300,
+		pages: list[int] | None = None,
+	) -> AsyncIterator[list[dict]]:
+		"""
+		Yields parsed page ranges in page order as soon as each one (including its
+		OCR) is ready. At most two ranges per worker are in flight, so memory does
+		not grow with the size of the document.
+		`pages` (0-based) restricts parsing to those pages.
+		"""
+		if page_count is None:
+			page_count, _ = await self.inspect(source)
+
+		loop = asyncio.get_running_loop()
+
+		async def parse_range(start: int, stop: int) -> list[dict]:
+			with observe("parse"):
+				parsed = await loop.run_in_executor(
+					self.pool, _parse_range, source, start, stop
+				)
+			await self._apply_ocr(source, parsed, ocr_lang=ocr_lang, dpi=dpi)
+			return parsed
+
+		ranges = deque(self.page_ranges(page_count, pages))
+		pending: deque[asyncio.Task] = deque()
+		window = self.max_workers * 2
+		try:
+			while ranges or pending:
+				while ranges and len(pending) < window:
+					pending.append(
+						asyncio.ensure_future(parse_range(*ranges.popleft()))
+					)
+				yield await pending.popleft()
+		finally:
+			for task in pending:
+				task.cancel()
+
+	async def parse(
+		self,
+		source: PdfSource,
+		page_count: int | None = None,
+		ocr_lang: str = "por+eng+spa",
+		dpi: int = 300,
+	) -> list[dict]:
+		"""
+		Parses every page of the document on the pool.
+		Returns page dicts ({"page", "text"} plus "ocr" on OCR'd pages) in page
+		order.
+		"""
+		return [
+			p
+			async for pages in self.iter_pages(source, page_count, ocr_lang, dpi)
+			for p in pages
+		]
+
+	async def _apply_ocr(
+		self, source: PdfSource, pages: list[dict], ocr_lang: str, dpi: int
+	) -> None:
+		pending = [p for p in pages if p.pop("needs_ocr", False)]
+		if not pending:
+			return
+		texts = await self.ocr_pool.ocr_pages(
+			source, [p["page"] - 1 for p in pending], dpi=dpi, lang=ocr_lang
+		)
+		for page_obj, ocr_txt in zip(pending, texts):
+			apply_ocr(page_obj, ocr_txt)
+
+	def shutdown(self) -> None:
+		if self._pool is not None:
+			self._pool.shutdown(wait=False, cancel_futures=True)
+			self._pool = None
+
+
+_parse_engine_singleton: Optional[ParseEngine] = None
+
+
+def get_parse_engine() -> ParseEngine:
+	global _parse_engine_singleton
+	if _parse_engine_singleton is None:
+		s = Settings.get()
+		_parse_engine_singleton = ParseEngine(
+			max_workers=s.PARSE_WORKERS or None,
+			pages_per_task=s.PARSE_PAGES_PER_TASK,
+		)
+	return _parse_engine_singleton
+
+
+def shutdown_parse_engine() -> None:
+	global _parse_engine_singleton
+	if _parse_engine_singleton is not None:
+		_parse_engine_singleton.shutdown()
+		_parse_engine_singleton = None
+	shutdown_ocr_pool()
@@ -1,13 +1,38 @@
+import hashlib
+
 import pytesseract
 from loguru import logger
 from PIL import Image
 from pymupdf import Document
+from pymupdf import open as pdf_open
 from pymupdf4llm import to_markdown
 
-from app.core.metrics import INGEST_OCR_PAGES
-
 REPLACEMENT_CHAR = "\ufffd"
 
+# raw PDF bytes or a path to the PDF on disk
+PdfSource = bytes | str
+
+
+def open_pdf(source: PdfSource) -> Document:
+	if isinstance(source, (bytes, bytearray)):
+		return pdf_open(stream=source, filetype="pdf")
+	return pdf_open(source)
+
+
+def page_fingerprint(doc: Document, page_index: int) -> str:
+	"""
+	Cheap content hash of one page: its content stream, geometry and the raw
+	streams of the images it draws. Unchanged pages of a re-exported PDF keep
+	their fingerprint, so they need not be parsed again.
+	"""
+	page = doc[page_index]
+	h = hashlib.sha256()
+	h.update(f"{tuple(page.rect)}:{page.rotation}".encode())
+	h.update(page.read_contents())
+	for img in page.get_images(full=True):
+		h.update(doc.xref_stream_raw(img[0]) or b"")
+	return h.hexdigest()
+
 
 def _needs_ocr(text: str, min_replacements: int = 5, max_ratio: float = 0.01) -> bool:
 	"""
@@ -25,7 +50,11 @@ def _needs_ocr(text: str, min_replacements: int = 5, max_ratio: float = 0.01) ->
 
 
 def _ocr_page(
-	doc: Document, page_index: int, dpi: int = 300, lang: str = "por+eng+spa"
+	doc: Document,
+	page_index: int,
+	dpi: int = 300,
+	lang: str = "por+eng+spa",
+	timeout: float = 0,
 ) -> str:
 	page = doc[page_index]
 	# Create a pixmap (image representation) from the PDF page
@@ -34,30 +63,56 @@ def _ocr_page(
 	img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
 
 	try:
-		return pytesseract.image_to_string(img, lang=lang, config="--psm 6")
+		# timeout > 0 kills the tesseract subprocess once exceeded
+		return pytesseract.image_to_string(
+			img, lang=lang, config="--psm 6", timeout=timeout
+		)
 	except Exception as e:
 		logger.error(f"OCR failed on page {page_index + 1}: {e}")
 		return ""
 
 
+def apply_ocr(page_obj: dict, ocr_txt: str) -> None:
+	"""Replace the page text with the OCR output when it is clearly better."""
+	txt = page_obj.get("text") or page_obj.get("content") or ""
+	page_obj["ocr"] = True
+	if ocr_txt and (
+		REPLACEMENT_CHAR in txt or len(txt.strip()) < len(ocr_txt.strip()) * 0.5
+	):
+		logger.debug(f"Applied OCR fallback on page {page_obj.get('page')}")
+		page_obj["text"] = ocr_txt
+
+
 def markdown_parse(
-	doc: Document, ocr_lang: str = "por+eng+spa", dpi: int = 300
+	doc: Document,
+	ocr_lang: str = "por+eng+spa",
+	dpi: int = 300,
+	pages: list[int] | None = None,
+	ocr: bool = True,
 ) -> list[dict]:
+	"""
+	Parse `pages` (0-based indexes, all pages when None) into markdown page dicts.
+	Each dict carries its 1-based page number under "page", and "ocr" when the
+	OCR fallback ran on it.
+	With `ocr=False` pages that need OCR are only flagged with "needs_ocr", so the
+	caller can schedule them elsewhere.
+	"""
+	page_indexes = list(pages) if pages is not None else list(range(doc.page_count))
 	md: list[dict] = to_markdown(
 		doc,
+		pages=page_indexes,
 		page_chunks=True,
 		embed_images=False,
 	)  # type: ignore
 
-	for i, page_obj in enumerate(md):
+	for page_index, page_obj in zip(page_indexes, md):
+		page_obj["page"] = page_index + 1
 		txt = page_obj.get("text") or page_obj.get("content") or ""
-		if _needs_ocr(txt):
-			ocr_txt = _ocr_page(doc, i, dpi=dpi, lang=ocr_lang)
-			INGEST_OCR_PAGES.inc()
-			if ocr_txt and (
-				REPLACEMENT_CHAR in txt or len(txt.strip()) < len(ocr_txt.strip()) * 0.5
-			):
-				logger.debug(f"Applied OCR fallback on page {i + 1}")
-				page_obj["text"] = ocr_txt
+		if not _needs_ocr(txt):
+			continue
+		if ocr:
+			apply_ocr(page_obj, _ocr_page(doc, page_index, dpi=dpi, lang=ocr_lang))
+		else:
+			page_obj["needs_ocr"] = True
 
 	return md
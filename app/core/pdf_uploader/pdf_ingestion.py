@@ -1,50 +1,83 @@
+import asyncio
 import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
 
 from beanie import PydanticObjectId
 from fastapi import HTTPException, UploadFile
 from loguru import logger
-from pymupdf import open as pdf_open
 
-from app.core.connectors.milvus import MilvusInsert
-from app.core.metrics import INGEST_CHUNKS, INGEST_DUPLICATES, INGEST_FILES, observe
+from app.core.connectors.vector_backend import vector_insert
+from app.core.db.timestamps import now_utc
+from app.core.metrics import INGEST_DUPLICATES, INGEST_FILES
+from app.core.search_cache import bump_collection_version
 from app.rag.models import ChunkDAO, FileDAO
-from app.rag.schemas import Chunk, IndexingResult
+from app.rag.schemas import IndexingResult, IngestProgress
+from app.settings import Settings
 
-from .chunkfier import chunkfy_pages
-from .embedder import AsyncEmbedder
-from .parser import markdown_parse
+from .dedup import get_dedup_index
+from .embedder import get_embedder
+from .parse_engine import get_parse_engine
+from .pipeline import IngestPipeline
 
 
-def _sha256(data: bytes) -> str:
-	return hashlib.sha256(data).hexdigest()
+# file hashes and names being ingested right now -> set once that ingestion ends
+_in_flight: dict[str, asyncio.Event] = {}
 
 
-async def create_and_insert_chunks(
-	chunks: list[Chunk], file_id: PydanticObjectId
-) -> list[str]:
+_SPOOL_CHUNK = 1 << 20  # 1 MiB
+
+
+async def delete_file_and_chunks(file_id: str) -> dict[str, int]:
 	"""
-	Converts Chunk schemas to Beanie documents (ChunkDAO) and inserts them in bulk.
-	Returns the list of inserted IDs (as strings).
+	Removes the File and all its Chunks from MongoDB, and their vectors from Milvus.
+	Returns the total deleted: {"file_deleted": 0|1, "chunks_deleted": N}.
 	"""
-	if not chunks:
-		return []
-
 	try:
-		chunk_docs = []
-		for chunk in chunks:
-			data = chunk.model_dump(by_alias=True)
-			single_doc = ChunkDAO(**data, file_id=file_id)
-			chunk_docs.append(single_doc)
+		# ids arrive as strings; queries must match the stored ObjectIds
+		oid = PydanticObjectId(file_id)
+
+		try:
+			await vector_insert().delete(f'file_id == "{oid}"')
+		except Exception as e:
+			# left for the periodic reconciliation to purge
+			logger.warning(f"Milvus delete failed for file_id={file_id}: {e}")
+
+		# delete chunks
+		chunk_query = ChunkDAO.find(
+			ChunkDAO.file_id == oid,
+		)
 
-		result = await ChunkDAO.insert_many(chunk_docs)
+		del_chunks_res = await chunk_query.delete()
+		chunks_deleted = getattr(del_chunks_res, "deleted_count", 0)
+		if (dedup := get_dedup_index()) is not None:
+			dedup.remove(str(file_id))
 
-		inserted_ids = [str(id_) for id_ in result.inserted_ids]
-		logger.debug(f"Inserted {len(inserted_ids)} chunks into MongoDB")
+		file_deleted = 0
+		file_doc = await FileDAO.find_one(FileDAO.id == oid)
 
-		return inserted_ids
-	except Exception as e:
-		logger.exception(f"Error inserting chunks into MongoDB: {str(e)}")
-		return []
+		if file_doc:
+			del_file_res = await file_doc.delete()
+
+			file_deleted = getattr(del_file_res, "deleted_count", None) or 1
+		else:
+			logger.warning(f"No file record found for file_id={file_id}")
+
+		await bump_collection_version()
+		logger.info(
+			f"Cleanup done for file_id={file_id} | "
+			f"chunks_deleted={chunks_deleted} file_deleted={file_deleted}"
+		)
+
+		return {
+			"chunks_deleted": int(chunks_deleted or 0),
+			"file_deleted": int(file_deleted or 0),
+		}
+	except Exception:
+		logger.exception(f"Error deleting file and chunks for file_id={file_id}")
+		return {"chunks_deleted": 0, "file_deleted": 0}
 
 
 async def create_and_save_file_record(
@@ -77,94 +110,428 @@ async def create_and_save_file_record(
 	return file_id
 
 
-async def ingest(full_pdf: UploadFile) -> IndexingResult:
+async def discard_if_unindexed(res: IndexingResult) -> bool:
+	"""
+	If every chunk of the file failed to be indexed in Milvus, removes the file and
+	its chunks from MongoDB. Returns True when the file was discarded.
+	"""
+	if not res.total_chunks or res.total_chunks != len(res.errors):
+		return False
+
+	logger.warning(
+		"All chunks failed to be indexed for this file; "
+		"removing file and chunks from MongoDB."
+	)
+	file_id = res.inserted_file_id
+	if not file_id:
+		logger.error("No file_id found to delete the file and chunks.")
+	else:
+		await delete_file_and_chunks(file_id)
+	return True
+
+
+async def spool_upload(file: UploadFile, path: Path) -> tuple[str, int]:
+	"""
+	Streams an upload to `path`, computing its SHA-256 in the same pass, so the
+	whole file is never held in memory. Returns (sha256, size_bytes).
+	"""
+	digest = hashlib.sha256()
+	size = 0
+
+	def _write(fh: BinaryIO, data: bytes) -> None:
+		digest.update(data)
+		fh.write(data)
+
+	with path.open("wb") as fh:
+		while data := await file.read(_SPOOL_CHUNK):
+			size += len(data)
+			await asyncio.to_thread(_write, fh, data)
+	return digest.hexdigest(), size
+
+
+def _sha256_file(path: str) -> str:
+	digest = hashlib.sha256()
+	with open(path, "rb") as fh:
+		while data := fh.read(_SPOOL_CHUNK):
+			digest.update(data)
+	return digest.hexdigest()
+
+
+async def ingest(
+	full_pdf: UploadFile, progress: IngestProgress | None = None
+) -> IndexingResult:
+	"""Spools an uploaded PDF to disk and ingests it; see `ingest_file`."""
+	spool_dir = Path(Settings.get().INGEST_SPOOL_DIR)
+	spool_dir.mkdir(parents=True, exist_ok=True)
+	fd, path = tempfile.mkstemp(suffix=".pdf", dir=spool_dir)
+	os.close(fd)
+	try:
+		file_hash, size_bytes = await spool_upload(full_pdf, Path(path))
+		return await ingest_file(
+			path,
+			filename=full_pdf.filename,
+			mime=full_pdf.content_type or "application/pdf",
+			progress=progress,
+			file_hash=file_hash,
+			size_bytes=size_bytes,
+		)
+	finally:
+		Path(path).unlink(missing_ok=True)
+
+
+async def ingest_file(
+	path: str,
+	filename: str | None,
+	mime: str = "application/pdf",
+	progress: IngestProgress | None = None,
+	file_hash: str | None = None,
+	size_bytes: int | None = None,
+) -> IndexingResult:
 	"""
-	Complete ingestion of a PDF:
+	Complete ingestion of a PDF stored at `path`:
 	- Deduplicate by hash.
-	- Parse into markdown pages.
 	- Save the file record in MongoDB (Beanie).
-	- Chunkfy and save chunks in MongoDB (Beanie).
-	- Embed and insert into Milvus.
+	- Stream pages through the IngestPipeline: parse into markdown pages, chunkfy,
+	save chunks in MongoDB (Beanie), embed and insert into Milvus.
+	The parse and OCR workers open the file from disk, so memory use does not
+	depend on the file size. Pass `file_hash`/`size_bytes` when already known.
+	`progress`, when given, is updated in place as the stages advance.
 	Returns an IndexingResult with details of the operation.
 	"""
 	INGEST_FILES.inc()
+	progress = progress if progress is not None else IngestProgress()
+	progress.status = "running"
 
-	# 1) extract bytes check for duplicates
-	pdf_bytes = await full_pdf.read()
-	if not pdf_bytes:
+	# 1) check for duplicates
+	if size_bytes is None:
+		size_bytes = os.path.getsize(path)
+	if not size_bytes:
 		raise HTTPException(status_code=400, detail="Empty file")
 
-	file_hash = _sha256(pdf_bytes)
+	if file_hash is None:
+		file_hash = await asyncio.to_thread(_sha256_file, path)
 
-	existing = await FileDAO.find_one(FileDAO.file_hash == file_hash)
-	if existing:
-		INGEST_DUPLICATES.inc()
-		logger.debug(f"Duplicate file detected (hash={file_hash}); skipping embedding.")
-		return IndexingResult(
-			total_chunks=0,
-			errors=[],
-			message="Duplicate file; skipping embedding.",
-		)
+	# the same file (or another version of it) may be uploaded concurrently:
+	# wait for the running ingestion so that this one sees its result
+	keys = [file_hash] + ([f"name:{filename}"] if filename else [])
+	while (running := _running_ingestion(keys)) is not None:
+		await running.wait()
 
-	# 1.1) parse PDF to markdown
-	with observe("parse"):
-		doc = pdf_open(stream=pdf_bytes, filetype="pdf")
-		try:
-			pages = markdown_parse(doc)
-		finally:
-			try:
-				doc.close()
-			except Exception:
-				logger.debug("Failed to close PDF document handle (ignored).")
-
-		if not pages:
-			raise HTTPException(
-				status_code=400, detail="No text found in the PDF document."
+	# claim the keys before the next await, so a concurrent upload of the same
+	# file waits for this one instead of passing the check as well
+	done = asyncio.Event()
+	for key in keys:
+		_in_flight[key] = done
+	indexed = False
+	try:
+		existing = await FileDAO.find_one(FileDAO.file_hash == file_hash)
+		if existing:
+			INGEST_DUPLICATES.inc()
+			logger.debug(
+				f"Duplicate file detected (hash={file_hash}); skipping embedding."
+			)
+			return IndexingResult(
+				total_chunks=0,
+				errors=[],
+				message="Duplicate file; skipping embedding.",
 			)
+		indexed = True
+		return await _ingest_new(path, file_hash, size_bytes, filename, mime, progress)
+	finally:
+		for key in keys:
+			_in_flight.pop(key, None)
+		done.set()
+		if indexed:
+			# searches cached before (or during) this ingestion are stale now
+			await bump_collection_version()
+
+
+def _running_ingestion(keys: list[str]) -> asyncio.Event | None:
+	return next((_in_flight[k] for k in keys if k in _in_flight), None)
+
+
+def is_ingesting(file_hash: str, filename: str | None) -> bool:
+	"""True while this process ingests the file, or a new version of it."""
+	keys = [file_hash] + ([f"name:{filename}"] if filename else [])
+	return _running_ingestion(keys) is not None
+
+
+async def _ingest_new(
+	path: str,
+	file_hash: str,
+	size_bytes: int,
+	filename: str | None,
+	mime: str,
+	progress: IngestProgress,
+) -> IndexingResult:
+	engine = get_parse_engine()
+	page_count, metadata = await engine.inspect(path)
+	if not page_count:
+		raise HTTPException(
+			status_code=400, detail="No text found in the PDF document."
+		)
+	progress.total_pages = page_count
+
+	title = metadata.get("title") or None
+	page_hashes = await engine.page_hashes(path)
+
+	previous = await find_previous_version(filename, title)
+	if previous is not None:
+		return await _ingest_update(
+			previous,
+			path,
+			file_hash,
+			size_bytes,
+			filename,
+			title,
+			mime,
+			page_hashes,
+			progress,
+		)
 
 	file_id = await create_and_save_file_record(
 		file_hash=file_hash,
-		filename=full_pdf.filename,
-		title=(doc.metadata or {}).get("title") if hasattr(doc, "metadata") else None,
-		content=" ".join(p.get("text", "") for p in pages),
-		total_pages=len(pages),
-		size_bytes=len(pdf_bytes),
-		mime=full_pdf.content_type or "application/pdf",
+		filename=filename,
+		title=title,
+		content="",
+		total_pages=page_count,
+		size_bytes=size_bytes,
+		mime=mime,
 	)
+	progress.file_id = str(file_id)
 
+	# 2) stream pages -> chunks -> MongoDB -> embeddings -> Milvus
+	pipeline = _make_pipeline(file_id, filename, title, progress)
+	try:
+		result = await pipeline.run(engine.iter_pages(path, page_count))
+		# every chunk was a near-duplicate of indexed content: nothing to store,
+		# but the ingestion did not fail
+		fully_duplicate = not result.total_chunks and result.suppressed_chunks > 0
+		if not fully_duplicate and not result.inserted_chunk_ids:
+			raise HTTPException(
+				status_code=400, detail="Failed to insert chunks into MongoDB."
+			)
+	except BaseException:
+		# do not leave a half-ingested file behind: its hash would mark any
+		# retry as a duplicate
+		await delete_file_and_chunks(str(file_id))
+		raise
+
+	content, page_offsets = _join_pages(
+		[pipeline.page_texts.get(i, "") for i in range(1, page_count + 1)]
+	)
+	await FileDAO.find_one(FileDAO.id == file_id).update(
+		{
+			"$set": {
+				"content": content,
+				"total_pages": pipeline.total_pages,
+				"page_hashes": page_hashes,
+				"page_offsets": page_offsets,
+				"updated_at": now_utc(),
+			}
+		}
+	)
+	if fully_duplicate:
+		INGEST_DUPLICATES.inc()
+		logger.info(
+			f"All {result.suppressed_chunks} chunks of file_id={file_id} are "
+			"near-duplicates of indexed content; nothing new was indexed."
+		)
+		return result.model_copy(
+			update={
+				"message": "Near-duplicate of indexed content; nothing new to index."
+			}
+		)
 	logger.debug(
-		f"Extracted {len(pages)} pages from PDF, "
-		f"and file saved on MongoDB (file_id={file_id})"
+		f"Ingested {pipeline.total_pages} pages into {result.total_chunks} chunks "
+		f"(file_id={file_id})"
 	)
+	return result
 
-	with observe("chunkfy"):
-		chunks: list[Chunk] = chunkfy_pages(
-			pages,
-			file_id=str(file_id),
-			filename=full_pdf.filename,
-			title=(doc.metadata or {}).get("title")
-			if hasattr(doc, "metadata")
-			else None,
-			max_chars=1200,
-			overlap=150,
-		)
 
-	logger.debug(f"Chunked into {len(chunks)} text chunks")
+async def find_previous_version(
+	filename: str | None, title: str | None
+) -> FileDAO | None:
+	"""
+	Latest stored document with the same filename, preferring one that also has
+	the same title. A title alone is not enough: generic titles ("Untitled",
+	"Report") are shared by unrelated documents, and treating one as a new
+	version would replace its pages.
+	"""
+	if not filename:
+		return None
+	candidates = (
+		await FileDAO.find({"filename": filename}).sort("-created_at").to_list()
+	)
+	if title:
+		same_title = [f for f in candidates if f.title == title]
+		if same_title:
+			return same_title[0]
+	return candidates[0] if candidates else None
+
 
-	inserted_chunks = await create_and_insert_chunks(chunks, file_id=file_id)
-	if not inserted_chunks:
-		raise HTTPException(
-			status_code=400, detail="Failed to insert chunks into MongoDB."
+async def _ingest_update(
+	previous: FileDAO,
+	path: str,
+	file_hash: str,
+	size_bytes: int,
+	filename: str | None,
+	title: str | None,
+	mime: str,
+	page_hashes: list[str],
+	progress: IngestProgress,
+) -> IndexingResult:
+	"""
+	Ingests a new version of `previous` in place (same file_id). Only the pages
+	whose fingerprint changed are parsed, chunked and embedded; the chunks and
+	vectors of the other pages are kept, and those of changed or removed pages
+	are deleted from MongoDB and Milvus.
+	"""
+	file_id = previous.id
+	assert file_id is not None
+	page_count = len(page_hashes)
+	old_hashes = previous.page_hashes
+
+	# chunk texts embed the filename and title, so a rename re-ingests every page
+	comparable = (
+		previous.filename == filename
+		and (previous.title or None) == title
+		and len(previous.page_offsets) == len(old_hashes)
+	)
+	if comparable:
+		changed = [
+			i
+			for i, h in enumerate(page_hashes)
+			if i >= len(old_hashes) or old_hashes[i] != h
+		]
+		old_texts = _split_pages(previous.content, previous.page_offsets)
+	else:
+		changed = list(range(page_count))
+		old_texts = []
+
+	old_count = max(previous.total_pages, len(old_hashes))
+	stale = sorted({i + 1 for i in changed} | set(range(page_count + 1, old_count + 1)))
+
+	progress.file_id = str(file_id)
+	progress.total_pages = len(changed)
+	logger.info(
+		f"New version of file_id={file_id}: re-ingesting {len(changed)}/{page_count} "
+		f"pages, dropping chunks of {len(stale)} pages"
+	)
+
+	await _delete_pages(file_id, stale)
+	pipeline = _make_pipeline(file_id, filename, title, progress)
+	try:
+		result = await pipeline.run(
+			get_parse_engine().iter_pages(path, page_count, pages=changed)
 		)
-	INGEST_CHUNKS.inc(len(chunks))
+		if result.total_chunks and not result.inserted_chunk_ids:
+			raise HTTPException(
+				status_code=400, detail="Failed to insert chunks into MongoDB."
+			)
+		if result.total_chunks and len(result.errors) == result.total_chunks:
+			raise HTTPException(
+				status_code=502, detail="All chunks failed to be indexed."
+			)
+	except BaseException:
+		# the old chunks of the stale pages are gone: drop whatever was written
+		# for them and forget their fingerprints, so a retry parses them again
+		try:
+			await _delete_pages(file_id, stale)
+			hashes = ["" if i + 1 in stale else h for i, h in enumerate(old_hashes)]
+			await FileDAO.find_one(FileDAO.id == file_id).update(
+				{"$set": {"page_hashes": hashes, "updated_at": now_utc()}}
+			)
+		except Exception:
+			logger.exception(f"Cleanup of failed update failed (file_id={file_id})")
+		raise
 
-	# 4) embed + insert on Milvus
-	embedder = AsyncEmbedder()
-	milvus_client = MilvusInsert()
+	content, page_offsets = _join_pages(
+		[
+			pipeline.page_texts[i + 1]
+			if i + 1 in pipeline.page_texts
+			else (old_texts[i] if i < len(old_texts) else "")
+			for i in range(page_count)
+		]
+	)
+	await FileDAO.find_one(FileDAO.id == file_id).update(
+		{
+			"$set": {
+				"file_hash": file_hash,
+				"filename": filename,
+				"title": title,
+				"content": content,
+				"total_pages": page_count,
+				"size_bytes": size_bytes,
+				"mime": mime,
+				"page_hashes": page_hashes,
+				"page_offsets": page_offsets,
+				"updated_at": now_utc(),
+			}
+		}
+	)
 
-	return await milvus_client.upload_chunks(
-		chunks,
-		embedder=embedder,
-		file_id=str(file_id),
-		chunk_ids=inserted_chunks,
+	result.pages_reused = page_count - len(changed)
+	result.message = (
+		f"Document updated; {len(changed)} of {page_count} pages re-ingested."
 	)
+	return result
+
+
+async def _delete_pages(file_id: PydanticObjectId, pages: list[int]) -> None:
+	"""
+	Removes the vectors (Milvus), chunks (MongoDB) and near-duplicate signatures
+	of the given pages, so their re-parsed chunks are not suppressed as copies
+	of themselves.
+	"""
+	if not pages:
+		return
+	await vector_insert().delete(f'file_id == "{file_id}" and page_idx in {pages}')
+	res = await ChunkDAO.find({"file_id": file_id, "page_idx": {"$in": pages}}).delete()
+	if (dedup := get_dedup_index()) is not None:
+		dedup.remove(str(file_id), pages)
+	logger.debug(
+		f"Deleted {getattr(res, 'deleted_count', 0)} chunks of {len(pages)} pages "
+		f"(file_id={file_id})"
+	)
+
+
+def _make_pipeline(
+	file_id: PydanticObjectId,
+	filename: str | None,
+	title: str | None,
+	progress: IngestProgress,
+) -> IngestPipeline:
+	settings = Settings.get()
+	return IngestPipeline(
+		file_id=file_id,
+		filename=filename,
+		title=title,
+		embedder=get_embedder(),
+		milvus_client=vector_insert(),
+		batch_size=settings.INGEST_BATCH_SIZE,
+		queue_size=settings.INGEST_QUEUE_SIZE,
+		max_chars=1200,
+		overlap=150,
+		max_tokens=settings.CHUNK_MAX_TOKENS
+		if settings.CHUNK_MODE == "tokens"
+		else None,
+		overlap_tokens=settings.CHUNK_OVERLAP_TOKENS,
+		progress=progress,
+		dedup=get_dedup_index(),
+		retry_budget=settings.INDEX_RETRY_BUDGET,
+	)
+
+
+def _join_pages(texts: list[str]) -> tuple[str, list[int]]:
+	"""Joins page texts into FileDAO.content; returns it with each page's offset."""
+	offsets, pos = [], 0
+	for text in texts:
+		offsets.append(pos)
+		pos += len(text) + 1
+	return " ".join(texts), offsets
+
+
+def _split_pages(content: str, offsets: list[int]) -> list[str]:
+	ends = offsets[1:] + [len(content) + 1]
+	return [content[start : end - 1] for start, end in zip(offsets, ends)]
@@ -0,0 +1,237 @@
+import asyncio
+from typing import AsyncIterator, Dict, List
+
+from beanie import PydanticObjectId
+from loguru import logger
+
+from app.core.connectors.milvus import MilvusInsert
+from app.core.connectors.retry import RetryBudget
+from app.core.metrics import INGEST_CHUNKS, INGEST_CHUNKS_SUPPRESSED, observe
+from app.rag.models import ChunkDAO
+from app.rag.schemas import Chunk, FailedChunk, IndexingResult, IngestProgress
+
+from .chunkfier import chunkfy_pages
+from .dedup import SimHashIndex
+from .embedder import AsyncEmbedder
+
+_DONE = None  # end-of-stream marker between stages
+
+
+async def create_and_insert_chunks(
+	chunks: list[Chunk], file_id: PydanticObjectId
+) -> list[str]:
+	"""
+	Converts Chunk schemas to Beanie documents (ChunkDAO) and inserts them in bulk.
+	Returns the list of inserted IDs (as strings).
+	"""
+	if not chunks:
+		return []
+
+	try:
+		chunk_docs = []
+		for chunk in chunks:
+			data = chunk.model_dump(by_alias=True)
+			single_doc = ChunkDAO(**data, file_id=file_id)
+			chunk_docs.append(single_doc)
+
+		result = await ChunkDAO.insert_many(chunk_docs)
+
+		inserted_ids = [str(id_) for id_ in result.inserted_ids]
+		logger.debug(f"Inserted {len(inserted_ids)} chunks into MongoDB")
+
+		return inserted_ids
+	except Exception as e:
+		logger.exception(f"Error inserting chunks into MongoDB: {str(e)}")
+		return []
+
+
+class IngestPipeline:
+	"""
+	Streaming ingestion of one document:
+
+		pages -> chunkfy -> Mongo (ChunkDAO) -> embed + Milvus insert
+
+	Stages are connected by bounded queues, so parsing, embedding and inserting
+	overlap and only a few batches of chunks are held in memory at a time.
+	"""
+
+	def __init__(
+		self,
+		file_id: PydanticObjectId,
+		filename: str | None,
+		title: str | None,
+		embedder: AsyncEmbedder,
+		milvus_client: MilvusInsert,
+		batch_size: int = 256,
+		queue_size: int = 4,
+		max_chars: int = 1200,
+		overlap: int = 150,
+		max_tokens: int | None = None,
+		overlap_tokens: int = 0,
+		progress: IngestProgress | None = None,
+		dedup: SimHashIndex | None = None,
+		retry_budget: int = 50,
+	):
+		self.file_id = file_id
+		self.filename = filename
+		self.title = title
+		self.embedder = embedder
+		self.milvus_client = milvus_client
+		self.batch_size = max(1, batch_size)
+		self.queue_size = max(1, queue_size)
+		self.max_chars = max_chars
+		self.overlap = overlap
+		# token budget per chunk; None chunks by characters
+		self.max_tokens = max_tokens
+		self.overlap_tokens = overlap_tokens
+		self.progress = progress if progress is not None else IngestProgress()
+		self.dedup = dedup
+		# transient embed/insert failures retried across the whole document
+		self.retry_budget = RetryBudget(retry_budget)
+
+		# page number -> text, joined into FileDAO.content once the stream ends
+		self.page_texts: Dict[int, str] = {}
+		self.total_pages = 0
+		self.total_chunks = 0
+		self.suppressed_chunks = 0
+		self.errors: List[FailedChunk] = []
+		self.inserted_chunk_ids: List[str] = []
+
+	async def run(self, page_batches: AsyncIterator[List[dict]]) -> IndexingResult:
+		chunk_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+		index_q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+		if self.dedup is not None:
+			await self.dedup.ensure_loaded()
+
+		# a failure in any stage cancels the others
+		try:
+			async with asyncio.TaskGroup() as tg:
+				tg.create_task(self._chunk_stage(page_batches, chunk_q))
+				tg.create_task(self._store_stage(chunk_q, index_q))
+				tg.create_task(self._index_stage(index_q))
+		except ExceptionGroup as eg:
+			raise eg.exceptions[0]
+
+		return IndexingResult(
+			total_chunks=self.total_chunks,
+			errors=self.errors,
+			message="Documents uploaded successfully",
+			inserted_file_id=str(self.file_id),
+			inserted_chunk_ids=self.inserted_chunk_ids,
+			suppressed_chunks=self.suppressed_chunks,
+			retries=self.retry_budget.used,
+		)
+
+	async def _chunk_stage(
+		self, page_batches: AsyncIterator[List[dict]], out: asyncio.Queue
+	) -> None:
+		buffer: List[Chunk] = []
+		async for pages in page_batches:
+			self.total_pages += len(pages)
+			self.page_texts.update((int(p["page"]), p.get("text", "")) for p in pages)
+			# splitting and SimHash signatures are pure Python (about 2 ms per
+			# chunk): keep them off the event loop
+			with observe("chunkfy"):
+				chunks = await asyncio.to_thread(
+					chunkfy_pages,
+					pages,
+					file_id=str(self.file_id),
+					filename=self.filename,
+					title=self.title,
+					max_chars=self.max_chars,
+					overlap=self.overlap,
+					max_tokens=self.max_tokens,
+					overlap_tokens=self.overlap_tokens,
+					signatures=self.dedup is not None,
+				)
+			if self.dedup is not None:
+				chunks = self._suppress_near_duplicates(chunks)
+			buffer.extend(chunks)
+			self.progress.pages_parsed += len(pages)
+			self.progress.chunks_total += len(chunks)
+			while len(buffer) >= self.batch_size:
+				await out.put(buffer[: self.batch_size])
+				buffer = buffer[self.batch_size :]
+		if buffer:
+			await out.put(buffer)
+		await out.put(_DONE)
+
+	def _suppress_near_duplicates(self, chunks: List[Chunk]) -> List[Chunk]:
+		"""
+		Drops chunks whose signature is near one already seen, in this document or
+		in any indexed one, and registers the signatures of the chunks kept.
+		"""
+		assert self.dedup is not None
+		kept: List[Chunk] = []
+		for c in chunks:
+			if c.simhash is None:
+				kept.append(c)
+			elif self.dedup.find(c.simhash) is not None:
+				self.suppressed_chunks += 1
+				INGEST_CHUNKS_SUPPRESSED.inc()
+			else:
+				self.dedup.add(c.simhash, (str(self.file_id), c.page_idx))
+				kept.append(c)
+		return kept
+
+	async def _store_stage(self, inp: asyncio.Queue, out: asyncio.Queue) -> None:
+		while (batch := await inp.get()) is not _DONE:
+			self.total_chunks += len(batch)
+			chunk_ids = await create_and_insert_chunks(batch, file_id=self.file_id)
+			if not chunk_ids:
+				self.errors.extend(
+					FailedChunk(chunk=c, error="store: failed to insert into MongoDB")
+					for c in batch
+				)
+				self.progress.chunks_failed += len(batch)
+				if self.dedup is not None:
+					# not stored, so they must not shadow later copies
+					self.dedup.remove(str(self.file_id), {c.page_idx for c in batch})
+				continue
+			INGEST_CHUNKS.inc(len(batch))
+			self.progress.chunks_stored += len(batch)
+			self.inserted_chunk_ids.extend(chunk_ids)
+			await out.put((batch, chunk_ids))
+		await out.put(_DONE)
+
+	async def _forget_signatures(
+		self, batch: List[Chunk], chunk_ids: List[str], failed: List[FailedChunk]
+	) -> None:
+		"""
+		Chunks that could not be indexed are not searchable, so their signatures
+		must not suppress later copies: they leave the index, and the stored
+		chunks lose theirs so a reload does not bring them back.
+		"""
+		assert self.dedup is not None
+		keys = {(f.chunk.page_idx, f.chunk.chunk_idx) for f in failed}
+		ids = [
+			PydanticObjectId(cid)
+			for c, cid in zip(batch, chunk_ids)
+			if (c.page_idx, c.chunk_idx) in keys
+		]
+		# signatures are tracked per page: drop the pages, re-add the indexed chunks
+		self.dedup.remove(str(self.file_id), {page for page, _ in keys})
+		for c in batch:
+			if c.simhash is not None and (c.page_idx, c.chunk_idx) not in keys:
+				self.dedup.add(c.simhash, (str(self.file_id), c.page_idx))
+		await ChunkDAO.find({"_id": {"$in": ids}}).update({"$set": {"simhash": None}})
+
+	async def _index_stage(self, inp: asyncio.Queue) -> None:
+		while (item := await inp.get()) is not _DONE:
+			batch, chunk_ids = item
+			res = await self.milvus_client.upload_chunks(
+				batch,
+				embedder=self.embedder,
+				file_id=str(self.file_id),
+				chunk_ids=chunk_ids,
+				retry_budget=self.retry_budget,
+			)
+			self.errors.extend(res.errors)
+			self.progress.chunks_indexed += len(batch) - len(res.errors)
+			self.progress.chunks_failed += len(res.errors)
+			if res.errors and self.dedup is not None:
+				await self._forget_signatures(batch, chunk_ids, res.errors)
+			logger.debug(
+				f"Indexed {len(batch) - len(res.errors)}/{len(batch)} chunks "
+				f"(file_id={self.file_id})"
+			)
@@ -0,0 +1,270 @@
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from beanie import UpdateResponse
+from loguru import logger
+
+from app.core.connectors.retry import RetryBudget, with_retries
+from app.core.connectors.vector_backend import vector_search
+from app.core.fusion import diversify
+from app.core.metrics import (
+	SEARCH_CACHE_HITS,
+	SEARCH_CACHE_MISSES,
+	SEARCH_CACHE_SAVED_SECONDS,
+)
+from app.core.pdf_uploader.embedder import get_embedder
+from app.rag.models import CounterDAO
+from app.settings import Settings
+
+# query, weights, top_k, filter, search profile, fusion, MMR lambda
+ResultKey = tuple[str, float, float, int, str, str, str, float | None]
+
+
+def normalize_query(query: str) -> str:
+	"""Case, width and whitespace variants of a question share cache entries."""
+	return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+@dataclass
+class _Entry:
+	value: Any
+	cost: float  # seconds it took to compute
+	expires_at: float = 0.0
+	version: int = 0
+
+
+class SearchCache:
+	"""
+	Two-level cache in front of hybrid search:
+
+	- embeddings: normalized query -> query vector (LRU);
+	- results: (query, search parameters) -> hits (LRU + TTL).
+
+	Result entries belong to a collection version, which increases on every
+	ingest or delete, so a search never serves hits from before a change. The
+	version is a MongoDB counter, so a change made by another worker process
+	(or the job runner) invalidates this process's results too.
+	"""
+
+	def __init__(
+		self, max_queries: int = 10_000, max_results: int = 2_000, ttl: float = 300
+	):
+		self.max_queries = max_queries
+		self.max_results = max_results
+		self.ttl = ttl
+		self.version = 0
+		self._embeddings: OrderedDict[str, _Entry] = OrderedDict()
+		self._results: OrderedDict[ResultKey, _Entry] = OrderedDict()
+
+	def set_version(self, version: int) -> None:
+		if version != self.version:
+			self.version = version
+			self._results.clear()
+
+	def get_embedding(self, query: str) -> list[float] | None:
+		entry = self._embeddings.get(query)
+		if entry is None:
+			SEARCH_CACHE_MISSES.labels("embedding").inc()
+			return None
+		self._embeddings.move_to_end(query)
+		SEARCH_CACHE_HITS.labels("embedding").inc()
+		SEARCH_CACHE_SAVED_SECONDS.labels("embedding").inc(entry.cost)
+		return entry.value
+
+	def put_embedding(self, query: str, vector: list[float], cost: float) -> None:
+		self._embeddings[query] = _Entry(vector, cost)
+		self._embeddings.move_to_end(query)
+		while len(self._embeddings) > self.max_queries > 0:
+			self._embeddings.popitem(last=False)
+
+	def get_results(self, key: ResultKey) -> list[dict] | None:
+		entry = self._results.get(key)
+		if entry is not None and (
+			entry.version != self.version or entry.expires_at < time.monotonic()
+		):
+			del self._results[key]
+			entry = None
+		if entry is None:
+			SEARCH_CACHE_MISSES.labels("results").inc()
+			return None
+		self._results.move_to_end(key)
+		SEARCH_CACHE_HITS.labels("results").inc()
+		SEARCH_CACHE_SAVED_SECONDS.labels("results").inc(entry.cost)
+		return entry.value
+
+	def put_results(
+		self, key: ResultKey, hits: list[dict], cost: float, version: int
+	) -> None:
+		"""Stores hits computed at `version`; dropped if the collection moved on."""
+		if version != self.version:
+			return
+		self._results[key] = _Entry(hits, cost, time.monotonic() + self.ttl, version)
+		self._results.move_to_end(key)
+		while len(self._results) > self.max_results > 0:
+			self._results.popitem(last=False)
+
+
+_search_cache_singleton: Optional[SearchCache] = None
+
+
+def get_search_cache() -> SearchCache | None:
+	"""The shared cache, or None when SEARCH_CACHE_ENABLED is off."""
+	global _search_cache_singleton
+	s = Settings.get()
+	if not s.SEARCH_CACHE_ENABLED:
+		return None
+	if _search_cache_singleton is None:
+		_search_cache_singleton = SearchCache(
+			max_queries=s.SEARCH_CACHE_MAX_QUERIES,
+			max_results=s.SEARCH_CACHE_MAX_RESULTS,
+			ttl=s.SEARCH_CACHE_TTL,
+		)
+	return _search_cache_singleton
+
+
+_VERSION_COUNTER = "search_collection_version"
+
+
+async def _shared_version() -> int:
+	doc = await CounterDAO.find_one(CounterDAO.name == _VERSION_COUNTER)
+	return doc.value if doc is not None else 0
+
+
+async def _bump_shared_version() -> int:
+	doc = await CounterDAO.find_one(CounterDAO.name == _VERSION_COUNTER).upsert(
+		{"$inc": {"value": 1}},
+		on_insert=CounterDAO(name=_VERSION_COUNTER, value=1),
+		response_type=UpdateResponse.NEW_DOCUMENT,
+	)
+	return doc.value if doc is not None else 0
+
+
+async def bump_collection_version() -> None:
+	"""Called whenever the indexed content may have changed (ingest, delete)."""
+	if (cache := get_search_cache()) is None:
+		return
+	try:
+		cache.set_version(await _bump_shared_version())
+	except Exception:
+		logger.exception("Failed to bump the shared search cache version")
+		cache.set_version(cache.version - 1)  # still drop the local results
+
+
+async def hybrid_search_hits(
+	query: str,
+	dense_weight: float,
+	sparse_weight: float,
+	top_k: int,
+	expr: str = "",
+	profile: str | None = None,
+	fusion: str = "weighted",
+	mmr_lambda: float | None = None,
+) -> list[dict]:
+	"""
+	Embeds the query and runs the Milvus hybrid search, through the cache.
+	Returns the hit dicts of the response (at most `top_k`).
+
+	`fusion` picks how the dense and BM25 legs are merged ("weighted" or "rrf").
+	With `mmr_lambda`, SEARCH_MMR_CANDIDATES times more fused hits are fetched
+	with their vectors and MMR keeps the `top_k` that are relevant but not
+	near-duplicates of each other (1.0 = relevance only).
+	"""
+	[hits] = await hybrid_search_hits_many(
+		[query], dense_weight, sparse_weight, top_k, expr, profile, fusion, mmr_lambda
+	)
+	return hits
+
+
+async def hybrid_search_hits_many(
+	queries: list[str],
+	dense_weight: float,
+	sparse_weight: float,
+	top_k: int,
+	expr: str = "",
+	profile: str | None = None,
+	fusion: str = "weighted",
+	mmr_lambda: float | None = None,
+) -> list[list[dict]]:
+	"""
+	`hybrid_search_hits` for several queries: the ones not answered by the cache
+	are embedded in one request and searched in one multi-vector Milvus call.
+	"""
+	cache = get_search_cache()
+	if cache is not None:
+		# one indexed read per search keeps every worker's cache coherent
+		try:
+			cache.set_version(await _shared_version())
+		except Exception as e:
+			logger.warning(f"Search cache bypassed: version unavailable ({e!r})")
+			cache = None
+	settings = Settings.get()
+	profile = profile or settings.SEARCH_PROFILE
+	normalized = [normalize_query(q) for q in queries]
+	keys: list[ResultKey] = [
+		(n, dense_weight, sparse_weight, top_k, expr, profile, fusion, mmr_lambda)
+		for n in normalized
+	]
+	results: list[list[dict] | None] = [
+		cache.get_results(k) if cache is not None else None for k in keys
+	]
+	# repeated queries of one batch are searched once
+	todo: dict[str, int] = {}
+	for i, hits in enumerate(results):
+		if hits is None:
+			todo.setdefault(normalized[i], i)
+	if not todo:
+		return results  # type: ignore[return-value]
+	version = cache.version if cache is not None else 0
+
+	embedder, milvus = get_embedder(), vector_search()
+	start = time.perf_counter()
+	vectors = {
+		n: v
+		for n in todo
+		if cache is not None and (v := cache.get_embedding(n)) is not None
+	}
+	missing = [n for n in todo if n not in vectors]
+	if missing:
+		# the provider client does not retry by itself: a user waits on this one,
+		# so transient failures get a few quick retries
+		fresh = await with_retries(
+			lambda: embedder.encode(
+				[queries[todo[n]] for n in missing], priority="interactive"
+			),
+			"query_embed",
+			RetryBudget(2),
+			attempts=3,
+			base_delay=0.2,
+			max_delay=2,
+		)
+		cost = (time.perf_counter() - start) / len(missing)
+		for n, v in zip(missing, fresh):
+			vectors[n] = v
+			if cache is not None:
+				cache.put_embedding(n, v, cost)
+
+	found = await milvus.asearch_many(
+		queries=[queries[i] for i in todo.values()],
+		dense_embeddings=[vectors[n] for n in todo],
+		expr=expr,
+		dense_weight=dense_weight,
+		sparse_weight=sparse_weight,
+		limit=top_k if mmr_lambda is None else top_k * settings.SEARCH_MMR_CANDIDATES,
+		profile=profile,
+		fusion=fusion,
+		with_vectors=mmr_lambda is not None,
+	)
+	if mmr_lambda is not None:
+		found = [diversify(hits, top_k, mmr_lambda) for hits in found]
+	by_query = dict(zip(todo, found))
+	cost = (time.perf_counter() - start) / len(todo)
+	for n, key in zip(todo, (keys[i] for i in todo.values())):
+		if cache is not None:
+			cache.put_results(key, by_query[n], cost, version)
+	return [
+		hits if hits is not None else by_query[n]
+		for hits, n in zip(results, normalized)
+	]
@@ -8,8 +8,7 @@ from motor.motor_asyncio import AsyncIOMotorClient
 # DAOs (Beanie)
 from app.agents.models import MessageDAO, ThreadDAO
 
-# Milvus bootstrap
-from app.core.connectors.milvus_bootstrap import init_milvus
+from app.core.pdf_uploader.parse_engine import shutdown_parse_engine
 from app.customers.models import (
 	AccountDAO,
 	ComplianceDAO,
@@ -20,7 +19,23 @@ from app.customers.models import (
 
 # Seeder
 from app.customers.seed import seed_customers
-from app.rag.models import ChunkDAO, FileDAO
+from app.rag.jobs import get_job_runner
+from app.rag.models import (
+	ChunkDAO,
+	CounterDAO,
+	EmbeddingCacheDAO,
+	FileDAO,
+	IngestJobDAO,
+)
+from app.rag.reconcile import get_reconciler
+
+# after app.rag: importing the embedder first would enter app.rag through its cache
+# (and the vector backend through the Milvus connector)
+from app.core.connectors.vector_backend import (
+	close_vector_backend,
+	init_vector_backend,
+)
+from app.core.pdf_uploader.embedder import close_embedder
 from app.settings import Settings
 
 
@@ -51,6 +66,9 @@ async def lifespan(app):
 			# RAG
 			FileDAO,
 			ChunkDAO,
+			IngestJobDAO,
+			EmbeddingCacheDAO,
+			CounterDAO,
 		],
 	)
 	logger.info("Beanie initialized successfully.")
@@ -61,15 +79,27 @@ async def lifespan(app):
 	except Exception:
 		logger.exception("Seeding customers failed (continuing).")
 
-	# 3) Milvus
+	# 3) Vector store (Milvus or the embedded one, see VECTOR_BACKEND)
 	try:
-		await init_milvus()
-		logger.info("Milvus bootstrap completed.")
+		await init_vector_backend()
 	except Exception:
-		logger.exception("Milvus bootstrap failed (continuing).")
+		logger.exception("Vector store bootstrap failed (continuing).")
+
+	# 4) Background ingestion jobs (resumes unfinished ones)
+	job_runner = get_job_runner()
+	await job_runner.start()
+
+	# 5) Periodic purge of vectors whose chunks were deleted
+	reconciler = get_reconciler()
+	await reconciler.start()
 
 	try:
 		yield
 	finally:
+		await reconciler.stop()
+		await job_runner.stop()
+		shutdown_parse_engine()
+		await close_embedder()
+		await close_vector_backend()
 		client.close()
 		logger.info("MongoDB connection closed.")
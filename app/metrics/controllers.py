@@ -1,16 +1,28 @@
 from typing import Any, Dict, List, Tuple
 
 from app.core.metrics import (
+	EMBED_CACHE_BYTES,
+	EMBED_CACHE_ENTRIES,
+	EMBED_CACHE_HITS,
+	EMBED_CACHE_MISSES,
+	EMBED_QUEUE_DEPTH,
 	EMBED_REQUESTS,
 	EMBED_VECTORS,
+	INDEX_RETRIES,
 	INGEST_CHUNKS,
+	INGEST_CHUNKS_SUPPRESSED,
 	INGEST_DUPLICATES,
 	INGEST_FILES,
 	INGEST_OCR_PAGES,
+	INGEST_OCR_QUEUE_DEPTH,
 	MILVUS_INSERT_BATCHES,
 	MILVUS_INSERT_ERRORS,
+	MILVUS_ORPHANS_PURGED,
 	QUERY_ERRORS,
 	QUERY_REQUESTS,
+	SEARCH_CACHE_HITS,
+	SEARCH_CACHE_MISSES,
+	SEARCH_CACHE_SAVED_SECONDS,
 	SEARCH_ERRORS,
 	SEARCH_REQUESTS,
 	STAGE_LATENCY,
@@ -24,6 +36,18 @@ def _counter_value(c) -> int:
 		return 0
 
 
+def _cache_stats(level: str) -> Dict[str, Any]:
+	"""Hits, hit rate and saved seconds of one search cache level."""
+	hits = _counter_value(SEARCH_CACHE_HITS.labels(level))
+	misses = _counter_value(SEARCH_CACHE_MISSES.labels(level))
+	saved = SEARCH_CACHE_SAVED_SECONDS.labels(level)._value.get()  # type: ignore[attr-defined]
+	return {
+		"hits": hits,
+		"hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+		"saved_seconds": round(saved, 3),
+	}
+
+
 def _stage_latency_stats() -> Dict[str, Any]:
 	"""Return per-stage histogram stats: count, sum, avg, p50/p90/p99, buckets."""
 	result: Dict[str, Any] = {}
@@ -97,15 +121,31 @@ def get_ui_metrics() -> Dict[str, Any]:
 				"files": _counter_value(INGEST_FILES),
 				"duplicates": _counter_value(INGEST_DUPLICATES),
 				"chunks": _counter_value(INGEST_CHUNKS),
+				"chunks_suppressed": _counter_value(INGEST_CHUNKS_SUPPRESSED),
 				"ocr_pages": _counter_value(INGEST_OCR_PAGES),
+				"ocr_queue_depth": _counter_value(INGEST_OCR_QUEUE_DEPTH),
 			},
 			"embed": {
 				"requests": _counter_value(EMBED_REQUESTS),
 				"vectors": _counter_value(EMBED_VECTORS),
+				"cache_hits_memory": _counter_value(EMBED_CACHE_HITS.labels("memory")),
+				"cache_hits_persistent": _counter_value(
+					EMBED_CACHE_HITS.labels("persistent")
+				),
+				"cache_misses": _counter_value(EMBED_CACHE_MISSES),
+				"cache_entries": _counter_value(EMBED_CACHE_ENTRIES),
+				"cache_bytes": _counter_value(EMBED_CACHE_BYTES),
+				"queue_interactive": _counter_value(
+					EMBED_QUEUE_DEPTH.labels("interactive")
+				),
+				"queue_bulk": _counter_value(EMBED_QUEUE_DEPTH.labels("bulk")),
 			},
 			"milvus": {
 				"insert_batches": _counter_value(MILVUS_INSERT_BATCHES),
 				"insert_errors": _counter_value(MILVUS_INSERT_ERRORS),
+				"orphans_purged": _counter_value(MILVUS_ORPHANS_PURGED),
+				"retries_embed": _counter_value(INDEX_RETRIES.labels("embed")),
+				"retries_insert": _counter_value(INDEX_RETRIES.labels("insert")),
 			},
 			"question": {
 				"requests": _counter_value(QUERY_REQUESTS),
@@ -114,6 +154,11 @@ def get_ui_metrics() -> Dict[str, Any]:
 			"search": {
 				"requests": _counter_value(SEARCH_REQUESTS),
 				"errors": _counter_value(SEARCH_ERRORS),
+				**{
+					f"cache_{level}_{k}": v
+					for level in ("embedding", "results")
+					for k, v in _cache_stats(level).items()
+				},
 			},
 		},
 		"stage_latency": _stage_latency_stats(),
@@ -1,51 +1,51 @@
+import asyncio
 from typing import List
 
+from beanie import PydanticObjectId
 from fastapi import HTTPException, UploadFile
 from loguru import logger
 
-from app.core.connectors.milvus import MilvusSearch
-from app.core.pdf_uploader.embedder import AsyncEmbedder
-from app.core.pdf_uploader.pdf_ingestion import ingest
-from app.rag.models import ChunkDAO, FileDAO
-from app.rag.schemas import IndexingResult, SearchResult, UploadResponse
-
-
-async def delete_file_and_chunks(file_id: str) -> dict[str, int]:
+from app.core.connectors.milvus import filter_expr
+from app.core.pdf_uploader.pdf_ingestion import discard_if_unindexed, ingest
+from app.core.search_cache import hybrid_search_hits, hybrid_search_hits_many
+from app.rag.jobs import get_job_runner
+from app.rag.models import IngestJobDAO
+from app.rag.schemas import (
+	HybridSearchBatchRequest,
+	HybridSearchBatchResponse,
+	IndexingResult,
+	IngestJobOut,
+	JobAccepted,
+	JobFileOut,
+	SearchFilters,
+	SearchResult,
+	UploadResponse,
+)
+from app.settings import Settings
+
+
+async def _ingest_one(
+	file: UploadFile, limit: asyncio.Semaphore
+) -> tuple[IndexingResult | None, bool]:
 	"""
-	Removes the File and all its Chunks from MongoDB.
-	Returns the total deleted: {"file_deleted": 0|1, "chunks_deleted": N}.
+	Ingests one file under the concurrency limit.
+	Returns (result, discarded); result is None when ingestion failed.
 	"""
-	try:
-		# delete chunks
-		chunk_query = ChunkDAO.find(
-			ChunkDAO.file_id == file_id,
-		)
-
-		del_chunks_res = await chunk_query.delete()
-		chunks_deleted = getattr(del_chunks_res, "deleted_count", 0)
-
-		file_deleted = 0
-		file_doc = await FileDAO.find_one(FileDAO.id == file_id)
-
-		if file_doc:
-			del_file_res = await file_doc.delete()
-
-			file_deleted = getattr(del_file_res, "deleted_count", None) or 1
-		else:
-			logger.warning(f"No file record found for file_id={file_id}")
+	fname = file.filename
+	async with limit:
+		logger.debug(f"Processing file: {fname}")
+		try:
+			res = await ingest(file)
+		except Exception:
+			logger.exception(f"Error during ingestion for file {fname}")
+			return None, False
 
-		logger.info(
-			f"Cleanup done for file_id={file_id} | "
-			f"chunks_deleted={chunks_deleted} file_deleted={file_deleted}"
-		)
+	if not res:
+		logger.error(f"Ingestion returned no result for file {fname}")
+		return None, False
 
-		return {
-			"chunks_deleted": int(chunks_deleted or 0),
-			"file_deleted": int(file_deleted or 0),
-		}
-	except Exception:
-		logger.exception(f"Error deleting file and chunks for file_id={file_id}")
-		return {"chunks_deleted": 0, "file_deleted": 0}
+	# if all chunks failed to index in Milvus, clean up MongoDB for this file
+	return res, await discard_if_unindexed(res)
 
 
 async def upload_pdf_documents(files: list[UploadFile]):
@@ -54,6 +54,15 @@ async def upload_pdf_documents(files: list[UploadFile]):
 	failed_files: list[str] = []
 	failed_chunks = []
 
+	if not files:
+		return UploadResponse(
+			message="No files were provided.",
+			documents_indexed=0,
+			total_chunks=0,
+			failed_chunks=[],
+			failed_files=[],
+		)
+
 	for file in files:
 		fname = getattr(file, "filename", None)
 		if not fname or not fname.lower().endswith(".pdf"):
@@ -61,18 +70,14 @@ async def upload_pdf_documents(files: list[UploadFile]):
 				status_code=400, detail=f"File {fname} is not a PDF document."
 			)
 
-		logger.debug(f"Processing file: {fname}")
+	# files are ingested concurrently, so one file's OCR overlaps another's
+	# embedding; results are aggregated in upload order
+	limit = asyncio.Semaphore(max(1, Settings.get().UPLOAD_CONCURRENCY))
+	outcomes = await asyncio.gather(*(_ingest_one(f, limit) for f in files))
 
-		res: IndexingResult | None = None
-		try:
-			res = await ingest(file)
-		except Exception:
-			logger.exception(f"Error during ingestion for file {fname}")
-			failed_files.append(fname or "<unknown>")
-			continue
-
-		if not res:
-			logger.error(f"Ingestion returned no result for file {fname}")
+	for file, (res, discarded) in zip(files, outcomes):
+		fname = file.filename
+		if res is None:
 			failed_files.append(fname or "<unknown>")
 			continue
 
@@ -81,32 +86,11 @@ async def upload_pdf_documents(files: list[UploadFile]):
 		else:
 			total_chunks += res.total_chunks
 			failed_chunks.extend(res.errors)
-
-			# if all chunks failed to index in Milvus, clean up MongoDB for this file
-			if res.total_chunks == len(res.errors):
-				logger.warning(
-					"All chunks failed to be indexed for this file; "
-					"removing file and chunks from MongoDB."
-				)
-				file_id = res.inserted_file_id
-				if not file_id:
-					logger.error("No file_id found to delete the file and chunks.")
-				else:
-					await delete_file_and_chunks(file_id)
-
+			if discarded:
 				failed_files.append(fname or "<unknown>")
 
 	msg = f"Documents indexed successfully ({duplicate_files} duplicates found)."
 
-	if not files:
-		return UploadResponse(
-			message="No files were provided.",
-			documents_indexed=0,
-			total_chunks=0,
-			failed_chunks=[],
-			failed_files=[],
-		)
-
 	docs_indexed = len(files) - duplicate_files - len(failed_files)
 	logger.info(
 		f"Indexing complete. {docs_indexed} documents indexed, "
@@ -133,50 +117,94 @@ async def upload_pdf_documents(files: list[UploadFile]):
 	)
 
 
-async def hybrid_search(
-	query: str,
-	sparse_weight: float = 0.5,
-	dense_weight: float = 0.5,
-	top_k: int = 5,
-) -> List[SearchResult]:
-	embedder = AsyncEmbedder()
-	milvus = MilvusSearch()
+async def submit_ingest_job(files: list[UploadFile]) -> JobAccepted:
+	"""Spools the files and queues them for background ingestion."""
+	if not files:
+		raise HTTPException(status_code=400, detail="No files were provided.")
 
-	# embed the query
-	[qvec] = await embedder.encode([query])
+	job = await get_job_runner().submit(files)
+	return JobAccepted(
+		job_id=str(job.id),
+		status=job.status,
+		files=[jf.filename for jf in job.files],
+	)
 
-	raw = milvus.search(
-		query=query,
-		dense_embedding=qvec,
-		expr="",
-		dense_weight=dense_weight,
-		sparse_weight=sparse_weight,
-		limit=top_k,
+
+async def read_ingest_job(job_id: str) -> IngestJobOut:
+	try:
+		oid = PydanticObjectId(job_id)
+	except Exception:
+		raise HTTPException(status_code=400, detail="Invalid job_id")
+
+	job = await IngestJobDAO.get(oid)
+	if not job:
+		raise HTTPException(status_code=404, detail="Job not found")
+
+	return IngestJobOut(
+		job_id=str(job.id),
+		status=job.status,
+		created_at=job.created_at.isoformat(),
+		updated_at=job.updated_at.isoformat(),
+		files=[
+			JobFileOut.model_validate(jf.model_dump(exclude={"mime", "spool_path"}))
+			for jf in job.files
+		],
 	)
 
-	hits: list = []
-	if isinstance(raw, dict):
-		maybe_hits = raw.get("data")
-		if isinstance(maybe_hits, list):
-			hits = maybe_hits
-	elif isinstance(raw, list):
-		hits = raw
 
+def _search_results(hits: list[dict]) -> List[SearchResult]:
 	results: list[SearchResult] = []
-	for h in hits[:top_k]:
-		if not isinstance(h, dict):
-			continue
+	for h in hits:
 		text = h.get("text") or ""
 		results.append(
 			SearchResult(
 				text=str(text),
 				source=h.get("source"),
 				file_id=h.get("file_id"),
-				page=h.get("page"),
-				chunk_index=h.get("chunk_index"),
+				page=h.get("page_idx"),
+				chunk_index=h.get("chunk_idx"),
 				filename=h.get("filename"),
 				score=h.get("distance"),
 			)
 		)
 
 	return results
+
+
+async def hybrid_search(
+	query: str,
+	sparse_weight: float = 0.5,
+	dense_weight: float = 0.5,
+	top_k: int = 5,
+	filters: SearchFilters | None = None,
+	profile: str | None = None,
+	fusion: str = "weighted",
+	mmr_lambda: float | None = None,
+) -> List[SearchResult]:
+	hits = await hybrid_search_hits(
+		query,
+		dense_weight=dense_weight,
+		sparse_weight=sparse_weight,
+		top_k=top_k,
+		expr=filter_expr(filters),
+		profile=profile,
+		fusion=fusion,
+		mmr_lambda=mmr_lambda,
+	)
+	return _search_results(hits)
+
+
+async def hybrid_search_batch(
+	request: HybridSearchBatchRequest,
+) -> HybridSearchBatchResponse:
+	hits = await hybrid_search_hits_many(
+		request.queries,
+		dense_weight=request.dense_weight,
+		sparse_weight=request.sparse_weight,
+		top_k=request.top_k,
+		expr=filter_expr(request.filters),
+		profile=request.profile,
+		fusion=request.fusion,
+		mmr_lambda=request.mmr_lambda,
+	)
+	return HybridSearchBatchResponse(results=[_search_results(h) for h in hits])
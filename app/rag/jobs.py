@@ -0,0 +1,279 @@
+import asyncio
+import os
+import shutil
+import socket
+import uuid
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from beanie import PydanticObjectId, UpdateResponse
+from fastapi import HTTPException, UploadFile
+from loguru import logger
+
+from app.core.db.timestamps import now_utc
+from app.core.pdf_uploader.pdf_ingestion import (
+	delete_file_and_chunks,
+	discard_if_unindexed,
+	ingest_file,
+	spool_upload,
+)
+from app.rag.models import IngestJobDAO
+from app.rag.schemas import JobFile
+from app.settings import Settings
+
+_MAX_FAILED_CHUNKS = 50  # failures kept per file on the job document
+_UNFINISHED = ["queued", "running"]
+
+
+class IngestJobRunner:
+	"""
+	In-process worker pool for asynchronous ingestion jobs.
+	Uploads are spooled to disk and tracked as IngestJobDAO documents, so jobs that
+	were queued or running when the process stopped are picked up again.
+	Several processes may share the jobs collection: a runner claims a job
+	atomically before running it and renews a lease on every progress save, and
+	takes over (resetting its interrupted files) only jobs whose lease expired.
+	"""
+
+	def __init__(
+		self,
+		workers: int = 2,
+		spool_dir: str = "/tmp/agentic-rag/spool",
+		lease_seconds: float = 60,
+	) -> None:
+		self.workers = max(1, workers)
+		self.spool_dir = Path(spool_dir)
+		self.flush_interval = 1.0
+		self.lease_seconds = max(self.flush_interval * 5, lease_seconds)
+		self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+		self._queue: asyncio.Queue[PydanticObjectId] = asyncio.Queue()
+		self._tasks: list[asyncio.Task] = []
+
+	async def start(self) -> None:
+		self.spool_dir.mkdir(parents=True, exist_ok=True)
+		self._tasks = [
+			asyncio.create_task(self._worker(), name=f"ingest-job-worker-{i}")
+			for i in range(self.workers)
+		]
+		await self._resume()
+		self._tasks.append(
+			asyncio.create_task(self._resume_periodically(), name="ingest-job-resumer")
+		)
+		logger.info(f"Ingestion job runner started with {self.workers} workers")
+
+	async def stop(self) -> None:
+		for task in self._tasks:
+			task.cancel()
+		await asyncio.gather(*self._tasks, return_exceptions=True)
+		self._tasks = []
+
+	async def submit(self, files: list[UploadFile]) -> IngestJobDAO:
+		job_id = PydanticObjectId()
+		job_dir = self.spool_dir / str(job_id)
+		job_dir.mkdir(parents=True, exist_ok=True)
+
+		job_files: list[JobFile] = []
+		for i, file in enumerate(files):
+			fname = getattr(file, "filename", None)
+			if not fname or not fname.lower().endswith(".pdf"):
+				shutil.rmtree(job_dir, ignore_errors=True)
+				raise HTTPException(
+					status_code=400, detail=f"File {fname} is not a PDF document."
+				)
+			path = job_dir / f"{i}.pdf"
+			file_hash, size_bytes = await spool_upload(file, path)
+			job_files.append(
+				JobFile(
+					filename=fname,
+					mime=file.content_type or "application/pdf",
+					spool_path=str(path),
+					file_hash=file_hash,
+					size_bytes=size_bytes,
+				)
+			)
+
+		job = IngestJobDAO(
+			id=job_id,
+			files=job_files,
+			owner=self.owner,
+			lease_until=now_utc() + timedelta(seconds=self.lease_seconds),
+		)
+		await job.insert()
+		self._queue.put_nowait(job_id)
+		logger.info(f"Queued ingestion job {job_id} with {len(job_files)} files")
+		return job
+
+	async def _save(self, job: IngestJobDAO) -> None:
+		# progress lives in nested models, which do not bump updated_at by
+		# themselves; every save also renews the lease on the job
+		job.updated_at = now_utc()
+		job.lease_until = job.updated_at + timedelta(seconds=self.lease_seconds)
+		await job.save()
+
+	async def _claim(self, job_id: PydanticObjectId) -> IngestJobDAO | None:
+		"""
+		Atomically takes the lease on an unfinished job that is unclaimed, already
+		ours, or whose owner stopped renewing it. None when another runner holds it.
+		"""
+		now = now_utc()
+		return await IngestJobDAO.find_one(
+			{
+				"_id": job_id,
+				"status": {"$in": _UNFINISHED},
+				"$or": [
+					{"owner": None},
+					{"owner": self.owner},
+					{"lease_until": {"$lt": now}},
+				],
+			}
+		).update(
+			{
+				"$set": {
+					"owner": self.owner,
+					"lease_until": now + timedelta(seconds=self.lease_seconds),
+					"updated_at": now,
+				}
+			},
+			response_type=UpdateResponse.NEW_DOCUMENT,
+		)
+
+	async def _resume(self) -> None:
+		"""Takes over unfinished jobs whose runner stopped renewing their lease."""
+		stale = await IngestJobDAO.find(
+			{
+				"status": {"$in": _UNFINISHED},
+				"owner": {"$ne": self.owner},
+				"$or": [{"owner": None}, {"lease_until": {"$lt": now_utc()}}],
+			}
+		).to_list()
+		resumed = 0
+		for candidate in stale:
+			job = await self._claim(candidate.id)  # type: ignore[arg-type]
+			if job is None:
+				continue  # another runner took it first
+			for jf in job.files:
+				if jf.status != "running":
+					continue
+				# the interrupted attempt may have left a partial file behind,
+				# which would make the retry look like a duplicate
+				if jf.file_id:
+					await delete_file_and_chunks(jf.file_id)
+				jf.status = "queued"
+				jf.file_id = None
+				jf.pages_parsed = jf.chunks_total = jf.chunks_stored = 0
+				jf.chunks_indexed = jf.chunks_failed = 0
+				jf.failed_chunks = []
+			job.status = "queued"
+			await self._save(job)
+			self._queue.put_nowait(job.id)  # type: ignore[arg-type]
+			resumed += 1
+		if resumed:
+			logger.info(f"Resumed {resumed} unfinished ingestion jobs")
+
+	async def _resume_periodically(self) -> None:
+		# picks up the jobs of runners that stopped while this one is running
+		while True:
+			await asyncio.sleep(self.lease_seconds)
+			try:
+				await self._resume()
+			except Exception:
+				logger.exception("Failed to resume unfinished ingestion jobs")
+
+	async def _worker(self) -> None:
+		while True:
+			job_id = await self._queue.get()
+			try:
+				await self._run_job(job_id)
+			except asyncio.CancelledError:
+				raise
+			except Exception:
+				logger.exception(f"Ingestion job {job_id} crashed")
+			finally:
+				self._queue.task_done()
+
+	async def _run_job(self, job_id: PydanticObjectId) -> None:
+		job = await self._claim(job_id)
+		if job is None:
+			return  # finished, or being run by another runner
+
+		job.status = "running"
+		await self._save(job)
+
+		for index in range(len(job.files)):
+			if job.files[index].status in ("queued", "running"):
+				await self._run_file(job, index)
+
+		failed = sum(1 for jf in job.files if jf.status == "failed")
+		job.status = "failed" if job.files and failed == len(job.files) else "completed"
+		await self._save(job)
+		shutil.rmtree(self.spool_dir / str(job.id), ignore_errors=True)
+		logger.info(
+			f"Ingestion job {job.id} {job.status} "
+			f"({len(job.files) - failed}/{len(job.files)} files ok)"
+		)
+
+	async def _run_file(self, job: IngestJobDAO, index: int) -> None:
+		# saving a document rebuilds its nested models, so progress is tracked on a
+		# detached copy that is written back on every flush
+		jf = job.files[index].model_copy(deep=True)
+		logger.debug(f"Job {job.id}: processing file {jf.filename}")
+		flusher = asyncio.create_task(self._flush_periodically(job, index, jf))
+		try:
+			if not Path(jf.spool_path).exists():
+				raise RuntimeError("spooled upload is missing")
+
+			# the job file doubles as the live progress record
+			res = await ingest_file(
+				jf.spool_path,
+				filename=jf.filename,
+				mime=jf.mime,
+				progress=jf,
+				file_hash=jf.file_hash,
+				size_bytes=jf.size_bytes,
+			)
+			jf.failed_chunks = res.errors[:_MAX_FAILED_CHUNKS]
+			if res.total_chunks == 0:
+				jf.status = "duplicate"
+			elif await discard_if_unindexed(res):
+				jf.status = "failed"
+				jf.error = "All chunks failed to be indexed."
+			else:
+				jf.status = "completed"
+		except Exception as e:
+			logger.exception(f"Job {job.id}: error during ingestion of {jf.filename}")
+			jf.status = "failed"
+			jf.error = str(getattr(e, "detail", None) or f"{type(e).__name__}: {e}")
+		finally:
+			flusher.cancel()
+			job.files[index] = jf
+			await self._save(job)
+
+		# kept on cancellation so the file can be resumed on the next start
+		Path(jf.spool_path).unlink(missing_ok=True)
+
+	async def _flush_periodically(
+		self, job: IngestJobDAO, index: int, jf: JobFile
+	) -> None:
+		while True:
+			await asyncio.sleep(self.flush_interval)
+			try:
+				job.files[index] = jf.model_copy()
+				await self._save(job)
+			except Exception:
+				logger.exception(f"Failed to persist progress of job {job.id}")
+
+
+_job_runner_singleton: Optional[IngestJobRunner] = None
+
+
+def get_job_runner() -> IngestJobRunner:
+	global _job_runner_singleton
+	if _job_runner_singleton is None:
+		s = Settings.get()
+		_job_runner_singleton = IngestJobRunner(
+			workers=s.INGEST_JOB_WORKERS,
+			spool_dir=s.INGEST_SPOOL_DIR,
+			lease_seconds=s.INGEST_JOB_LEASE_SECONDS,
+		)
+	return _job_runner_singleton
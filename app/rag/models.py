@@ -3,7 +3,9 @@ from beanie import Document, PydanticObjectId
 
 from app.core.db.timestamps import TimestampingMixin
 
-from .schemas import Chunk, File
+from app.settings import Settings
+
+from .schemas import CachedEmbedding, Chunk, File, IngestJob
 
 
 class FileDAO(File, TimestampingMixin, Document):
@@ -11,6 +13,7 @@ class FileDAO(File, TimestampingMixin, Document):
 		name = "files"
 		indexes = [
 			pymongo.IndexModel([("file_hash", pymongo.ASCENDING)]),
+			pymongo.IndexModel([("filename", pymongo.ASCENDING)]),
 			pymongo.IndexModel([("created_at", pymongo.DESCENDING)]),
 		]
 
@@ -21,6 +24,50 @@ class ChunkDAO(Chunk, TimestampingMixin, Document):
 	class Settings:
 		name = "chunks"
 		indexes = [
-			pymongo.IndexModel([("file_id", pymongo.ASCENDING)]),
+			pymongo.IndexModel(
+				[("file_id", pymongo.ASCENDING), ("page_idx", pymongo.ASCENDING)]
+			),
 			pymongo.IndexModel([("created_at", pymongo.DESCENDING)]),
 		]
+
+
+class IngestJobDAO(IngestJob, TimestampingMixin, Document):
+	class Settings:
+		name = "ingest_jobs"
+		indexes = [
+			pymongo.IndexModel([("status", pymongo.ASCENDING)]),
+			pymongo.IndexModel([("created_at", pymongo.DESCENDING)]),
+		]
+
+
+def _embedding_cache_indexes() -> list[pymongo.IndexModel]:
+	indexes = [pymongo.IndexModel([("key", pymongo.ASCENDING)], unique=True)]
+	ttl_days = Settings.get().EMBED_CACHE_TTL_DAYS
+	if ttl_days > 0:
+		indexes.append(
+			pymongo.IndexModel(
+				[("created_at", pymongo.ASCENDING)],
+				expireAfterSeconds=int(ttl_days * 86400),
+			)
+		)
+	else:
+		# oldest-first eviction of EMBED_CACHE_PERSIST_MAX_ENTRIES
+		indexes.append(pymongo.IndexModel([("created_at", pymongo.ASCENDING)]))
+	return indexes
+
+
+class EmbeddingCacheDAO(CachedEmbedding, TimestampingMixin, Document):
+	class Settings:
+		name = "embedding_cache"
+		indexes = _embedding_cache_indexes()
+
+
+class CounterDAO(Document):
+	"""Named counter shared by every process, e.g. the search cache version."""
+
+	name: str
+	value: int = 0
+
+	class Settings:
+		name = "counters"
+		indexes = [pymongo.IndexModel([("name", pymongo.ASCENDING)], unique=True)]
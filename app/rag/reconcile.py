@@ -0,0 +1,139 @@
+import asyncio
+import json
+from typing import Optional
+
+from beanie import PydanticObjectId
+from bson import ObjectId
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from app.core.connectors.milvus import MilvusInsert
+from app.core.connectors.vector_backend import vector_insert
+from app.core.metrics import MILVUS_ORPHANS_PURGED
+from app.core.pdf_uploader.pdf_ingestion import is_ingesting
+from app.core.search_cache import bump_collection_version
+from app.rag.models import ChunkDAO, FileDAO
+from app.settings import Settings
+
+
+class _FileRef(BaseModel):
+	id: PydanticObjectId = Field(alias="_id")
+	file_hash: str
+	filename: str | None = None
+
+
+class _ChunkRef(BaseModel):
+	id: PydanticObjectId = Field(alias="_id")
+
+
+class MilvusReconciler:
+	"""
+	Periodically purges Milvus vectors whose chunks no longer exist in MongoDB
+	(left behind when a Milvus delete failed), then compacts the collection so
+	searches stop scanning them.
+
+	Vectors are always written after their MongoDB chunk, so a vector without a
+	chunk is an orphan. Files being ingested by this process are skipped, and a
+	file is purged only if it is still missing from MongoDB after its vectors were
+	found, so files created during the sweep are left alone.
+	"""
+
+	def __init__(self, interval: float = 3600, milvus: MilvusInsert | None = None):
+		self.interval = interval
+		self.milvus = milvus or vector_insert()
+		self._task: asyncio.Task | None = None
+
+	async def start(self) -> None:
+		if self.interval <= 0:
+			logger.info("Milvus reconciliation disabled")
+			return
+		self._task = asyncio.create_task(self._loop(), name="milvus-reconciler")
+
+	async def stop(self) -> None:
+		if self._task is not None:
+			self._task.cancel()
+			await asyncio.gather(self._task, return_exceptions=True)
+			self._task = None
+
+	async def _loop(self) -> None:
+		while True:
+			await asyncio.sleep(self.interval)
+			try:
+				await self.run_once()
+			except Exception:
+				logger.exception("Milvus reconciliation failed (will retry)")
+
+	async def run_once(self) -> int:
+		"""Purges the orphaned vectors; returns how many were found."""
+		files = await FileDAO.find_all().project(_FileRef).to_list()
+		if not files:
+			# an empty (or wrong) database would make every vector an orphan
+			logger.info("Milvus reconciliation skipped: no files in MongoDB")
+			return 0
+
+		# vectors of files that are gone, deleted by explicit file id
+		known = json.dumps([str(f.id) for f in files])
+		orphans = 0
+		purged: set[str] = set()
+		while gone := await self._gone_file_ids(known) - purged:
+			expr = f"file_id in {json.dumps(sorted(gone))}"
+			orphans += await self.milvus.count(expr)
+			await self.milvus.delete(expr)
+			purged |= gone
+
+		# vectors of chunks that are gone, in files that still exist
+		for f in files:
+			if is_ingesting(f.file_hash, f.filename):
+				continue
+			file_filter = f'file_id == "{f.id}"'
+			stored = await ChunkDAO.find(ChunkDAO.file_id == f.id).count()
+			extra = await self.milvus.count(file_filter) - stored
+			if extra <= 0:
+				continue
+			ids = [
+				str(c.id)
+				async for c in ChunkDAO.find(ChunkDAO.file_id == f.id).project(
+					_ChunkRef
+				)
+			]
+			await self.milvus.delete(
+				f"{file_filter} and chunk_id not in {json.dumps(ids)}"
+			)
+			orphans += extra
+
+		if orphans:
+			MILVUS_ORPHANS_PURGED.inc(orphans)
+			await bump_collection_version()
+			try:
+				await self.milvus.compact()
+			except Exception as e:
+				logger.warning(f"Milvus compaction could not be started: {e}")
+		logger.info(f"Milvus reconciliation purged {orphans} orphaned vectors")
+		return orphans
+
+	async def _gone_file_ids(self, known: str) -> set[str]:
+		"""
+		File ids of vectors outside `known` (a snapshot of MongoDB) that are still
+		missing from MongoDB now; a file created after the snapshot is kept.
+		"""
+		found = await self.milvus.file_ids(f"file_id not in {known}")
+		if not found:
+			return set()
+		ids = [ObjectId(i) for i in found if ObjectId.is_valid(i)]
+		existing = {
+			str(f.id)
+			async for f in FileDAO.find({"_id": {"$in": ids}}).project(_FileRef)
+		}
+		return found - existing
+
+
+_reconciler_singleton: Optional[MilvusReconciler] = None
+
+
+def get_reconciler() -> MilvusReconciler:
+	global _reconciler_singleton
+	if _reconciler_singleton is None:
+		_reconciler_singleton = MilvusReconciler(
+			interval=Settings.get().MILVUS_RECONCILE_INTERVAL
+		)
+	return _reconciler_singleton
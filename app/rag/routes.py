@@ -1,14 +1,25 @@
-from fastapi import APIRouter, UploadFile
+from fastapi import APIRouter, Query, UploadFile
+
+from app.core.connectors.search_profiles import SearchProfileName
+from app.core.fusion import FusionName
 
 from .controllers import (
 	hybrid_search,
+	hybrid_search_batch,
+	read_ingest_job,
+	submit_ingest_job,
 	upload_pdf_documents,
 )
 from .schemas import (
+	HybridSearchBatchRequest,
+	HybridSearchBatchResponse,
+	IngestJobOut,
+	JobAccepted,
+	SearchFilters,
 	UploadResponse,
 )
 
-router = APIRouter()
+router = APIRouter(prefix="/rag")
 
 
 @router.get("/hybrid_search")
@@ -17,15 +28,48 @@ async def search_hybrid_search(
 	top_k: int = 3,
 	sparse_weight: float = 0.5,
 	dense_weight: float = 0.5,
+	file_ids: list[str] = Query(default_factory=list),
+	filenames: list[str] = Query(default_factory=list),
+	titles: list[str] = Query(default_factory=list),
+	page_from: int | None = None,
+	page_to: int | None = None,
+	profile: SearchProfileName | None = None,
+	fusion: FusionName = "weighted",
+	mmr_lambda: float | None = Query(None, ge=0, le=1),
 ):
 	return await hybrid_search(
 		query=query,
 		sparse_weight=sparse_weight,
 		dense_weight=dense_weight,
 		top_k=top_k,
+		filters=SearchFilters(
+			file_ids=file_ids,
+			filenames=filenames,
+			titles=titles,
+			page_from=page_from,
+			page_to=page_to,
+		),
+		profile=profile,
+		fusion=fusion,
+		mmr_lambda=mmr_lambda,
 	)
 
 
+@router.post("/hybrid_search/batch", response_model=HybridSearchBatchResponse)
+async def search_hybrid_search_batch(request: HybridSearchBatchRequest):
+	return await hybrid_search_batch(request)
+
+
 @router.post("/upload", response_model=UploadResponse)
 async def upload_documents(files: list[UploadFile]):
 	return await upload_pdf_documents(files)
+
+
+@router.post("/upload/async", response_model=JobAccepted, status_code=202)
+async def upload_documents_async(files: list[UploadFile]):
+	return await submit_ingest_job(files)
+
+
+@router.get("/jobs/{job_id}", response_model=IngestJobOut)
+async def get_ingest_job(job_id: str):
+	return await read_ingest_job(job_id)
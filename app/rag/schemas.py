@@ -1,4 +1,10 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from app.core.connectors.search_profiles import SearchProfileName
+from app.core.fusion import FusionName
 
 
 class File(BaseModel):
@@ -9,6 +15,10 @@ class File(BaseModel):
 	total_pages: int
 	size_bytes: int
 	mime: str
+	# per-page fingerprints and start offsets into `content`, used to re-ingest
+	# only the pages that changed when a new version is uploaded
+	page_hashes: list[str] = Field(default_factory=list)
+	page_offsets: list[int] = Field(default_factory=list)
 
 
 class Chunk(BaseModel):
@@ -18,6 +28,8 @@ class Chunk(BaseModel):
 	chunk_idx: int
 	source: str
 	text: str
+	# near-duplicate signature of the text (see pdf_uploader.dedup)
+	simhash: str | None = None
 
 
 class FailedChunk(BaseModel):
@@ -34,7 +46,12 @@ class UploadResponse(BaseModel):
 
 
 class EmbeddedChunk(Chunk):
-	vector: list[float]
+	chunk_id: str = ""  # Mongo ChunkDAO id, primary key in Milvus
+	file_id: str = ""
+	# int components in int8 storage mode (see connectors.vector_format)
+	vector: list[float] | list[int]
+	# ingestion-only; never serialised into the Milvus entity (dynamic field)
+	simhash: str | None = Field(default=None, exclude=True)
 
 
 class IndexingResult(BaseModel):
@@ -43,6 +60,12 @@ class IndexingResult(BaseModel):
 	errors: list[FailedChunk]
 	inserted_file_id: str | None = None
 	inserted_chunk_ids: list[str] | None = None
+	# set when a new version of an existing document was ingested incrementally
+	pages_reused: int = 0
+	# near-duplicate chunks dropped before storing/embedding
+	suppressed_chunks: int = 0
+	# transient embed/insert failures that were retried
+	retries: int = 0
 
 
 class SearchResult(BaseModel):
@@ -53,3 +76,91 @@ class SearchResult(BaseModel):
 	page: int | None = None
 	chunk_index: int | None = None
 	score: float | None = None
+
+
+class SearchFilters(BaseModel):
+	"""Restricts a search to matching chunks; empty fields do not filter."""
+
+	file_ids: list[str] = Field(default_factory=list)
+	filenames: list[str] = Field(default_factory=list)
+	titles: list[str] = Field(default_factory=list)
+	page_from: int | None = None  # page numbers (page_idx), inclusive
+	page_to: int | None = None
+
+
+class HybridSearchBatchRequest(BaseModel):
+	# one embeddings request and one Milvus search for all of them
+	queries: list[str] = Field(min_length=1, max_length=100)
+	top_k: int = 3
+	sparse_weight: float = 0.5
+	dense_weight: float = 0.5
+	filters: SearchFilters | None = None
+	profile: SearchProfileName | None = None  # default: SEARCH_PROFILE
+	fusion: FusionName = "weighted"
+	# diversify the results with MMR (1.0 = relevance only), None = off
+	mmr_lambda: float | None = Field(None, ge=0, le=1)
+
+
+class HybridSearchBatchResponse(BaseModel):
+	results: list[list[SearchResult]]  # one list per query, in request order
+
+
+class IngestProgress(BaseModel):
+	"""Live counters of one file's ingestion, one group per pipeline stage."""
+
+	status: Literal["queued", "running", "completed", "duplicate", "failed"] = "queued"
+	file_id: str | None = None
+	# parse
+	total_pages: int = 0
+	pages_parsed: int = 0
+	# chunkfy + MongoDB
+	chunks_total: int = 0
+	chunks_stored: int = 0
+	# embed + Milvus
+	chunks_indexed: int = 0
+	chunks_failed: int = 0
+	error: str | None = None
+
+
+class JobFile(IngestProgress):
+	filename: str
+	mime: str
+	spool_path: str
+	file_hash: str | None = None
+	size_bytes: int | None = None
+	# first failures only, to keep job documents small
+	failed_chunks: list[FailedChunk] = Field(default_factory=list)
+
+
+class IngestJob(BaseModel):
+	status: Literal["queued", "running", "completed", "failed"] = "queued"
+	files: list[JobFile]
+	# runner that claimed the job, and until when its claim holds without a
+	# heartbeat (see IngestJobRunner)
+	owner: str | None = None
+	lease_until: datetime | None = None
+
+
+class JobFileOut(IngestProgress):
+	filename: str
+	failed_chunks: list[FailedChunk] = Field(default_factory=list)
+
+
+class IngestJobOut(BaseModel):
+	job_id: str
+	status: str
+	created_at: str
+	updated_at: str
+	files: list[JobFileOut]
+
+
+class JobAccepted(BaseModel):
+	job_id: str
+	status: str
+	files: list[str]
+
+
+class CachedEmbedding(BaseModel):
+	key: str  # sha256(model, text)
+	model: str
+	vector: bytes  # float32, native byte order
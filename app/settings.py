@@ -1,16 +1,35 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
-	# openai
-	OPENAI_API_KEY: str
+	# openai (only needed by the agents and EMBED_PROVIDER=openai)
+	OPENAI_API_KEY: str = ""
 
-	# milvus stuff
-	MILVUS_URL: str
-	MILVUS_SECRET: str
-	MILVUS_COLLECTION: str
+	# vector store: a Milvus cluster, or in-process (single node, one API worker)
+	VECTOR_BACKEND: Literal["milvus", "embedded"] = "milvus"
+	EMBEDDED_STORE_PATH: str = "data/vector_store"  # snapshot directory, "" = memory
+	EMBEDDED_SNAPSHOT_INTERVAL: float = 30  # seconds between snapshots of writes
+
+	# milvus stuff (not needed with VECTOR_BACKEND=embedded)
+	MILVUS_URL: str = ""
+	MILVUS_SECRET: str = ""
+	MILVUS_COLLECTION: str = "doc_chunks"
+	MILVUS_HTTP_MAX_CONNECTIONS: int = 32  # pooled keep-alive connections
+	MILVUS_HTTP_TIMEOUT: float = 60  # seconds per request
+	MILVUS_HTTP2: bool = False  # HTTP/2 via h2
+	# gzip request bodies; only if the server/gateway accepts Content-Encoding
+	MILVUS_HTTP_COMPRESSION: bool = False
+	MILVUS_INSERT_MAX_BYTES: int = 4 * 1024 * 1024  # estimated JSON per insert
+	MILVUS_RECONCILE_INTERVAL: float = 3600  # seconds between orphan purges, 0 = off
+	INDEX_EMBED_CONCURRENCY: int = 4  # embedding batches in flight per upload
+	INDEX_INSERT_CONCURRENCY: int = 2  # Milvus inserts in flight per upload
+	INDEX_RETRY_ATTEMPTS: int = 4  # tries per embed/insert batch on transient errors
+	INDEX_RETRY_BUDGET: int = 50  # retries per ingested document, 0 = no retries
+	INDEX_RETRY_BASE_DELAY: float = 0.5  # seconds, doubled per retry (with jitter)
+	INDEX_RETRY_MAX_DELAY: float = 30  # seconds
 
 	# fastapi
 	HOST: str = "0.0.0.0"
@@ -23,6 +42,56 @@ class Settings(BaseSettings):
 	MONGO_URI: str
 	MONGO_DB: str
 
+	# ingestion
+	PARSE_WORKERS: int = 0  # 0 = one parse process per CPU
+	PARSE_PAGES_PER_TASK: int = 8
+	OCR_WORKERS: int = 0  # 0 = one OCR process per CPU
+	OCR_PAGE_TIMEOUT: float = 120  # seconds per page, 0 = no limit
+	INGEST_BATCH_SIZE: int = 256  # chunks per pipeline batch
+	INGEST_QUEUE_SIZE: int = 4  # batches buffered between pipeline stages
+	UPLOAD_CONCURRENCY: int = 4  # files of one upload ingested concurrently
+	INGEST_JOB_WORKERS: int = 2  # background ingestion jobs run concurrently
+	INGEST_JOB_LEASE_SECONDS: float = 60  # a job unclaimed this long is taken over
+	INGEST_SPOOL_DIR: str = "/tmp/agentic-rag/spool"
+	CHUNK_MODE: Literal["chars", "tokens"] = "chars"  # unit of chunk size/overlap
+	CHUNK_MAX_TOKENS: int = 300  # CHUNK_MODE=tokens
+	CHUNK_OVERLAP_TOKENS: int = 40  # CHUNK_MODE=tokens
+	DEDUP_ENABLED: bool = True  # drop near-duplicate chunks before embedding
+	DEDUP_MAX_DISTANCE: int = 3  # SimHash bits (of 64) to count as a duplicate
+
+	# embeddings
+	EMBED_PROVIDER: Literal["openai", "hashing", "fake"] = "openai"
+	EMBED_MODEL: str = "text-embedding-3-small"  # EMBED_PROVIDER=openai
+	# openai text-embedding-3: Matryoshka-truncated dimension, 0 = full size
+	EMBED_DIMENSIONS: int = 0
+	# Milvus vector type: float32 | float16 | bfloat16 | int8 (Milvus >= 2.6)
+	VECTOR_STORAGE: Literal["float32", "float16", "bfloat16", "int8"] = "float32"
+	EMBED_DIM: int = 384  # EMBED_PROVIDER=hashing|fake
+	EMBED_BATCH_SIZE: int = 64  # texts per provider request
+	EMBED_CONCURRENCY: int = 8  # provider requests in flight per process
+	EMBED_COALESCE_MS: float = 5  # wait for more texts before sending a partial batch
+	EMBED_MAX_BATCH_TOKENS: int = 100_000  # tokens per provider request
+	EMBED_RPM: int = 0  # provider requests per minute, 0 = unlimited
+	EMBED_TPM: int = 0  # provider tokens per minute, 0 = unlimited
+
+	# ANN effort of searches that do not pick one (see search_profiles)
+	SEARCH_PROFILE: Literal["fast", "balanced", "exhaustive"] = "balanced"
+	SEARCH_MMR_CANDIDATES: int = 4  # fused hits per result that MMR chooses from
+
+	# search cache (query embeddings + results, dropped on every ingest/delete)
+	SEARCH_CACHE_ENABLED: bool = True
+	SEARCH_CACHE_MAX_QUERIES: int = 10_000  # query embeddings kept, 0 = unbounded
+	SEARCH_CACHE_MAX_RESULTS: int = 2_000  # result lists kept, 0 = unbounded
+	SEARCH_CACHE_TTL: float = 300  # seconds a result list stays valid
+
+	# embedding cache
+	EMBED_CACHE_ENABLED: bool = True
+	EMBED_CACHE_MAX_ENTRIES: int = 50_000  # in-memory tier, 0 = unbounded
+	EMBED_CACHE_MAX_BYTES: int = 256 * 1024 * 1024  # in-memory tier, 0 = unbounded
+	EMBED_CACHE_PERSIST: bool = True  # second tier in Mongo (embedding_cache)
+	EMBED_CACHE_TTL_DAYS: float = 30  # persistent tier expiry, 0 = never
+	EMBED_CACHE_PERSIST_MAX_ENTRIES: int = 2_000_000  # oldest evicted, 0 = unbounded
+
 	class Config:
 		env_file = ".env"
 		env_file_encoding = "utf-8"
@@ -0,0 +1,20 @@
+"""
+Standalone performance benchmarks. Run them as modules from the repo root, e.g.:
+
+	python -m benchmarks.parse_throughput
+
+Importing anything under `app` loads `Settings`, so placeholder values are set for
+the required variables that a benchmark does not need (real ones win).
+"""
+
+import os
+
+for _key, _value in {
+	"OPENAI_API_KEY": "benchmark",
+	"MILVUS_URL": "http://localhost:19530",
+	"MILVUS_SECRET": "",
+	"MILVUS_COLLECTION": "doc_chunks",
+	"MONGO_URI": "mongodb://localhost:27017",
+	"MONGO_DB": "benchmark",
+}.items():
+	os.environ.setdefault(_key, _value)
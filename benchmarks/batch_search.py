@@ -0,0 +1,98 @@
+"""
+Batched hybrid search: queries/sec of N sequential single searches (what N
+`GET /rag/hybrid_search` calls do) vs one `POST /rag/hybrid_search/batch`.
+
+Both go through the same controllers as the endpoints. Each single search pays
+an embeddings round trip and a Milvus round trip; the batch pays one of each
+for all N queries. Every query is distinct, so the search cache never answers.
+Embeddings come from the fake provider after --embed-latency-ms; without --url
+the searches go to a local Milvus stand-in that answers after --latency-ms.
+
+	python -m benchmarks.batch_search --queries 1 10 50 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import time
+from typing import List
+
+from app.core.connectors.milvus_http import close_milvus_http
+from app.core.pdf_uploader import embedder as embedder_module
+from app.core.pdf_uploader.embedder import AsyncEmbedder
+from app.core.pdf_uploader.embedding_providers import FakeProvider
+from app.rag.controllers import hybrid_search, hybrid_search_batch
+from app.rag.schemas import HybridSearchBatchRequest
+from app.settings import Settings
+from benchmarks.milvus_stub import MilvusStub
+
+
+class SlowFakeProvider(FakeProvider):
+	"""Fake vectors after a fixed delay, standing in for the embeddings API."""
+
+	def __init__(self, dim: int, latency: float):
+		super().__init__(dim)
+		self.latency = latency
+
+	async def embed(self, texts: List[str]) -> List[List[float]]:
+		await asyncio.sleep(self.latency)
+		return await super().embed(texts)
+
+
+async def run(args: argparse.Namespace, url: str) -> None:
+	Settings.get().MILVUS_URL = url  # MilvusSearch is created per search
+	embedder = AsyncEmbedder(
+		provider=SlowFakeProvider(args.dim, args.embed_latency_ms / 1000)
+	)
+	embedder.cache = None
+	embedder_module._embedder_singleton = embedder
+	counter = itertools.count()
+
+	def fresh(n: int) -> list[str]:
+		return [f"taxas da maquininha {next(counter)}" for _ in range(n)]
+
+	print(
+		f"target {args.url or f'stub ({args.latency_ms} ms)'}, "
+		f"embeddings {args.embed_latency_ms} ms, dim {args.dim}, top_k {args.top_k}"
+	)
+	print(f"{'queries':>7} {'sequential qps':>15} {'batch qps':>10} {'speedup':>8}")
+	try:
+		await hybrid_search(fresh(1)[0])  # connections, scheduler
+		for n in args.queries:
+			start = time.perf_counter()
+			for _ in range(args.rounds):
+				for q in fresh(n):
+					await hybrid_search(q, top_k=args.top_k)
+			sequential = n * args.rounds / (time.perf_counter() - start)
+
+			start = time.perf_counter()
+			for _ in range(args.rounds):
+				await hybrid_search_batch(
+					HybridSearchBatchRequest(queries=fresh(n), top_k=args.top_k)
+				)
+			batch = n * args.rounds / (time.perf_counter() - start)
+			speedup = batch / sequential
+			print(f"{n:>7} {sequential:>15,.1f} {batch:>10,.1f} {speedup:>7.1f}x")
+	finally:
+		await embedder.close()
+		await close_milvus_http()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--url", default="", help="real Milvus REST endpoint")
+	parser.add_argument("--queries", type=int, nargs="+", default=[1, 10, 50])
+	parser.add_argument("--rounds", type=int, default=5)
+	parser.add_argument("--latency-ms", type=float, default=20)
+	parser.add_argument("--embed-latency-ms", type=float, default=40)
+	parser.add_argument("--top-k", type=int, default=5)
+	parser.add_argument("--dim", type=int, default=1536)
+	args = parser.parse_args()
+	with contextlib.ExitStack() as stack:
+		url = args.url or stack.enter_context(MilvusStub(args.latency_ms / 1000)).url
+		asyncio.run(run(args, url))
+
+
+if __name__ == "__main__":
+	main()
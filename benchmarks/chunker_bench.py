@@ -0,0 +1,109 @@
+"""
+Chunker micro-benchmark: character-budget vs token-budget chunking.
+
+Runs `_chunk_text` (chars) and `_chunk_text_tokens` (tokens) over large
+synthetic pages and reports chars/sec, chunk count and the spread of chunk
+sizes in tokens (measured with the same token counter the token mode uses).
+
+	python -m benchmarks.chunker_bench --pages 50 --page-chars 20000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from typing import Callable, List
+
+from app.core.pdf_uploader.chunkfier import (
+	_chunk_text,
+	_chunk_text_tokens,
+	get_token_counter,
+)
+
+WORDS = (
+	"maquininha pagamento aproximacao chip tarja transfer settles next business "
+	"day las tasas dependen del plan contratado volumen mensual merchant fees "
+	"boleto pix antecipacao recebiveis chargeback suporte atendimento conta"
+).split()
+
+
+def build_page(rng: random.Random, chars: int) -> str:
+	"""Markdown-ish page: sentences, hyphenated line breaks and an image."""
+	parts: List[str] = []
+	size = 0
+	while size < chars:
+		n = rng.randint(6, 28)
+		sentence = " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+		sentence += rng.choice([".", ".", ".", "?", "!"])
+		if rng.random() < 0.05:
+			sentence = sentence.replace(" ", "-\n", 1)
+		if rng.random() < 0.02:
+			sentence += " ![figura](img/fig.png)"
+		parts.append(sentence)
+		size += len(sentence) + 1
+	return "\n".join(parts)
+
+
+def bench(
+	name: str,
+	chunk: Callable[[str], List[str]],
+	pages: List[str],
+	count_tokens: Callable[[str], int],
+	repeat: int,
+) -> None:
+	total_chars = sum(len(p) for p in pages)
+	best = float("inf")
+	chunks: List[str] = []
+	for _ in range(repeat):
+		start = time.perf_counter()
+		chunks = [c for p in pages for c in chunk(p)]
+		best = min(best, time.perf_counter() - start)
+
+	sizes = [count_tokens(c) for c in chunks]
+	print(
+		f"{name:<8} chars/sec={total_chars / best:12,.0f} chunks={len(chunks):<6} "
+		f"tokens/chunk mean={statistics.mean(sizes):6.1f} "
+		f"stdev={statistics.pstdev(sizes):6.1f} min={min(sizes):<4} max={max(sizes)}"
+	)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--pages", type=int, default=50)
+	parser.add_argument("--page-chars", type=int, default=20_000)
+	parser.add_argument("--max-chars", type=int, default=1200)
+	parser.add_argument("--overlap", type=int, default=150)
+	parser.add_argument("--max-tokens", type=int, default=300)
+	parser.add_argument("--overlap-tokens", type=int, default=40)
+	parser.add_argument("--repeat", type=int, default=3)
+	parser.add_argument("--seed", type=int, default=7)
+	args = parser.parse_args()
+
+	rng = random.Random(args.seed)
+	pages = [build_page(rng, args.page_chars) for _ in range(args.pages)]
+	count_tokens = get_token_counter()
+	print(f"{args.pages} pages x ~{args.page_chars} chars, best of {args.repeat} runs")
+
+	bench(
+		"chars",
+		lambda p: _chunk_text(p, max_chars=args.max_chars, overlap=args.overlap),
+		pages,
+		count_tokens,
+		args.repeat,
+	)
+	bench(
+		"tokens",
+		lambda p: _chunk_text_tokens(
+			p,
+			max_tokens=args.max_tokens,
+			overlap_tokens=args.overlap_tokens,
+			count_tokens=count_tokens,
+		),
+		pages,
+		count_tokens,
+		args.repeat,
+	)
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,116 @@
+"""
+Milvus insert throughput (batches/sec): per-request clients vs the shared pool.
+
+"before" reproduces the old insert path, which opens a new httpx.AsyncClient
+per batch and serialises with `json=`. "after" goes through `MilvusInsert.upsert`,
+which uses the shared keep-alive client and the fast encoder. Without --url the
+requests go to a local stub that speaks just enough of the REST API, so the
+numbers measure client overhead (connection setup + serialisation) only.
+
+	python -m benchmarks.milvus_insert_bench --batches 200 --batch-size 64 --dim 1536
+	python -m benchmarks.milvus_insert_bench --url http://localhost:19530
+"""
+
+import argparse
+import asyncio
+import contextlib
+import random
+import time
+from typing import List
+
+import httpx
+
+from app.core.connectors.milvus import MilvusInsert
+from app.core.connectors.milvus_http import close_milvus_http, orjson
+from app.rag.schemas import EmbeddedChunk
+from benchmarks.milvus_stub import MilvusStub
+
+
+def make_batches(n: int, size: int, dim: int, seed: int) -> List[List[EmbeddedChunk]]:
+	rng = random.Random(seed)
+	vector = [rng.uniform(-1, 1) for _ in range(dim)]
+	return [
+		[
+			EmbeddedChunk(
+				file_id="bench",
+				page_idx=b,
+				chunk_idx=i,
+				source="bench.pdf",
+				filename="bench.pdf",
+				title="bench",
+				text="A maquininha aceita pagamentos por aproximacao. " * 8,
+				vector=vector,
+			)
+			for i in range(size)
+		]
+		for b in range(n)
+	]
+
+
+async def insert_before(url: str, token: str, collection: str, batch) -> None:
+	headers = {"Content-Type": "application/json"}
+	if token:
+		headers["Authorization"] = f"Bearer {token}"
+	payload = {"collectionName": collection, "data": [d.model_dump() for d in batch]}
+	async with httpx.AsyncClient(timeout=60) as client:
+		resp = await client.post(url, json=payload, headers=headers)
+		resp.raise_for_status()
+		resp.json()
+
+
+async def timed(name: str, batches, concurrency: int, insert_one) -> None:
+	limit = asyncio.Semaphore(concurrency)
+
+	async def one(batch) -> None:
+		async with limit:
+			await insert_one(batch)
+
+	start = time.perf_counter()
+	await asyncio.gather(*(one(b) for b in batches))
+	elapsed = time.perf_counter() - start
+	print(
+		f"{name:<7} {len(batches) / elapsed:10,.1f} batches/sec "
+		f"({elapsed:.2f}s for {len(batches)})"
+	)
+
+
+async def run(args: argparse.Namespace, url: str) -> None:
+	milvus = MilvusInsert()
+	milvus.cluster_endpoint = url.rstrip("/")
+	batches = make_batches(args.batches, args.batch_size, args.dim, args.seed)
+	print(
+		f"{args.batches} batches x {args.batch_size} chunks x {args.dim} dims, "
+		f"concurrency {args.concurrency}, target {args.url or 'stub'}, "
+		f"encoder {'orjson' if orjson else 'json'}"
+	)
+	insert_url = f"{milvus.cluster_endpoint}/v2/vectordb/entities/insert"
+	try:
+		await timed(
+			"before",
+			batches,
+			args.concurrency,
+			lambda b: insert_before(
+				insert_url, milvus.token, milvus.collection_name, b
+			),
+		)
+		await timed("after", batches, args.concurrency, milvus.upsert)
+	finally:
+		await close_milvus_http()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--url", default="", help="real Milvus REST endpoint")
+	parser.add_argument("--batches", type=int, default=200)
+	parser.add_argument("--batch-size", type=int, default=64)
+	parser.add_argument("--dim", type=int, default=1536)
+	parser.add_argument("--concurrency", type=int, default=4)
+	parser.add_argument("--seed", type=int, default=7)
+	args = parser.parse_args()
+	with contextlib.ExitStack() as stack:
+		url = args.url or stack.enter_context(MilvusStub()).url
+		asyncio.run(run(args, url))
+
+
+if __name__ == "__main__":
+	main()
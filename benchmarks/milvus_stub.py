@@ -0,0 +1,96 @@
+"""
+Local stand-in for the Milvus REST API, for benchmarks that should measure the
+client side only. It runs its own event loop in a thread, so it keeps answering
+even while the benchmark blocks its loop, and answers every POST with code 0
+after `latency` seconds (a fixed list of hits per query for searches).
+"""
+
+import asyncio
+import functools
+import gzip
+import json
+import threading
+
+_INSERT_REPLY = b'{"code":0,"data":{"insertCount":0,"insertIds":[]}}'
+
+
+@functools.lru_cache(maxsize=None)
+def _search_reply(hits: int, nq: int = 1) -> bytes:
+	"""Hits of all `nq` queries in one flat list, split by "topks"."""
+	data = nq * [
+		{
+			"text": f"Trecho {i} sobre taxas da maquininha.",
+			"source": "stub.pdf",
+			"filename": "stub.pdf",
+			"file_id": "stub",
+			"title": "stub",
+			"page_idx": i,
+			"chunk_idx": i,
+			"distance": 1 / (i + 1),
+		}
+		for i in range(hits)
+	]
+	return json.dumps({"code": 0, "data": data, "topks": [hits] * nq}).encode()
+
+
+class MilvusStub:
+	def __init__(self, latency: float = 0.0, hits: int = 5):
+		self.latency = latency
+		self.hits = hits
+		self._loop = asyncio.new_event_loop()
+		self._server: asyncio.Server | None = None
+		self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+		self.url = ""
+
+	def __enter__(self) -> "MilvusStub":
+		self._thread.start()
+		self._server = asyncio.run_coroutine_threadsafe(
+			asyncio.start_server(self._connection, "127.0.0.1", 0), self._loop
+		).result()
+		self.url = f"http://127.0.0.1:{self._server.sockets[0].getsockname()[1]}"
+		return self
+
+	def __exit__(self, *exc) -> None:
+		async def shutdown() -> None:
+			assert self._server is not None
+			self._server.close()
+
+		asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result()
+		self._loop.call_soon_threadsafe(self._loop.stop)
+		self._thread.join()
+
+	async def _connection(
+		self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+	) -> None:
+		"""Minimal HTTP/1.1 keep-alive endpoint."""
+		try:
+			while True:
+				head = await reader.readuntil(b"\r\n\r\n")
+				lines = head.decode().split("\r\n")
+				headers = {
+					k.strip().lower(): v.strip()
+					for k, _, v in (line.partition(":") for line in lines[1:])
+					if k
+				}
+				body = await reader.readexactly(int(headers.get("content-length", 0)))
+				if headers.get("content-encoding") == "gzip":
+					body = gzip.decompress(body)
+				payload = json.loads(body)  # the server has to parse it too
+				if self.latency:
+					await asyncio.sleep(self.latency)
+				if "search" in lines[0]:
+					reply = _search_reply(self.hits, len(payload["search"][0]["data"]))
+				else:
+					reply = _INSERT_REPLY
+				writer.write(
+					b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+					+ f"Content-Length: {len(reply)}\r\n\r\n".encode()
+					+ reply
+				)
+				await writer.drain()
+				if headers.get("connection", "").lower() == "close":
+					break
+		except (asyncio.IncompleteReadError, ConnectionError):
+			pass
+		finally:
+			writer.close()
@@ -0,0 +1,89 @@
+"""
+PDF parse throughput (pages/sec) as parse workers are added.
+
+Builds a synthetic text PDF, parses it with `ParseEngine` at increasing pool
+sizes and reports pages/sec plus the worst event-loop stall observed meanwhile.
+
+	python -m benchmarks.parse_throughput --pages 200 --workers 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from pymupdf import open as pdf_open
+
+from app.core.pdf_uploader.parse_engine import ParseEngine
+
+LOREM = (
+	"A maquininha aceita pagamentos por aproximacao, chip e tarja. "
+	"Transfers settle on the next business day. "
+	"Las tasas dependen del plan contratado y del volumen mensual. "
+)
+
+
+def build_pdf(path: str, pages: int) -> None:
+	doc = pdf_open()
+	for i in range(pages):
+		page = doc.new_page()
+		lines = [f"Page {i + 1}", ""] + [
+			LOREM[j : j + 90] for j in range(0, 180, 90)
+		] * 20
+		page.insert_text((36, 48), "\n".join(lines), fontsize=9)
+	doc.save(path)
+	doc.close()
+
+
+async def _max_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+	worst = 0.0
+	while not stop.is_set():
+		start = time.perf_counter()
+		await asyncio.sleep(interval)
+		worst = max(worst, time.perf_counter() - start - interval)
+	return worst
+
+
+async def run(path: str, pages: int, workers: int, pages_per_task: int) -> None:
+	engine = ParseEngine(max_workers=workers, pages_per_task=pages_per_task)
+	try:
+		# warm the pool up so process start-up is not measured
+		await engine.inspect(path)
+
+		stop = asyncio.Event()
+		lag_task = asyncio.create_task(_max_loop_lag(stop))
+		start = time.perf_counter()
+		parsed = await engine.parse(path, page_count=pages)
+		elapsed = time.perf_counter() - start
+		stop.set()
+		lag = await lag_task
+	finally:
+		engine.shutdown()
+
+	assert [p["page"] for p in parsed] == list(range(1, pages + 1))
+	print(
+		f"workers={workers:<3} pages={pages:<5} time={elapsed:7.2f}s "
+		f"pages/sec={pages / elapsed:8.1f} max_loop_lag={lag * 1000:6.1f}ms"
+	)
+
+
+def main() -> None:
+	cpus = os.cpu_count() or 1
+	default_workers = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--pages", type=int, default=120)
+	parser.add_argument("--pages-per-task", type=int, default=8)
+	parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+	args = parser.parse_args()
+
+	with tempfile.TemporaryDirectory() as tmp:
+		path = os.path.join(tmp, "synthetic.pdf")
+		build_pdf(path, args.pages)
+		for w in args.workers:
+			asyncio.run(run(path, args.pages, w, args.pages_per_task))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,98 @@
+"""
+Hybrid search load test: queries/sec of one worker at 1, 10 and 100 concurrent
+callers, blocking `MilvusSearch.search` vs `MilvusSearch.asearch`.
+
+Callers are coroutines on one event loop, as agent runs and API requests are in
+a uvicorn worker. The blocking call holds the loop for the whole round trip, so
+its throughput stays flat as callers are added; the async one overlaps them.
+Without --url the requests go to a local Milvus stand-in that answers after
+--latency-ms, so the numbers isolate the client side.
+
+	python -m benchmarks.search_load --concurrency 1 10 100 --latency-ms 20
+"""
+
+import argparse
+import asyncio
+import contextlib
+import random
+import statistics
+import time
+
+from app.core.connectors.milvus import MilvusSearch
+from app.core.connectors.milvus_http import close_milvus_http
+from benchmarks.milvus_stub import MilvusStub
+
+
+async def load(
+	milvus: MilvusSearch,
+	mode: str,
+	callers: int,
+	duration: float,
+	vector: list[float],
+) -> tuple[int, list[float]]:
+	deadline = time.perf_counter() + duration
+	latencies: list[float] = []
+
+	async def caller() -> None:
+		while time.perf_counter() < deadline:
+			start = time.perf_counter()
+			kwargs = dict(
+				query="taxas da maquininha",
+				dense_embedding=vector,
+				expr="",
+				dense_weight=0.5,
+				sparse_weight=0.5,
+				limit=5,
+			)
+			if mode == "async":
+				await milvus.asearch(**kwargs)
+			else:
+				milvus.search(**kwargs)
+				await asyncio.sleep(0)  # yield, as the awaiting caller would
+			latencies.append(time.perf_counter() - start)
+
+	await asyncio.gather(*(caller() for _ in range(callers)))
+	return len(latencies), latencies
+
+
+async def run(args: argparse.Namespace, url: str) -> None:
+	milvus = MilvusSearch()
+	milvus.cluster_endpoint = url.rstrip("/")
+	rng = random.Random(args.seed)
+	vector = [rng.uniform(-1, 1) for _ in range(args.dim)]
+	print(
+		f"target {args.url or f'stub ({args.latency_ms} ms)'}, dim {args.dim}, "
+		f"{args.duration:.0f}s per run"
+	)
+	print(f"{'mode':<6} {'callers':>7} {'qps':>9} {'p50 ms':>8} {'p99 ms':>8}")
+	try:
+		for mode in ("sync", "async"):
+			for callers in args.concurrency:
+				done, latencies = await load(
+					milvus, mode, callers, args.duration, vector
+				)
+				cuts = statistics.quantiles(latencies, n=100) if done > 1 else [0] * 99
+				print(
+					f"{mode:<6} {callers:>7} {done / args.duration:>9,.1f} "
+					f"{cuts[49] * 1000:>8.1f} {cuts[98] * 1000:>8.1f}"
+				)
+	finally:
+		await close_milvus_http()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--url", default="", help="real Milvus REST endpoint")
+	parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+	parser.add_argument("--latency-ms", type=float, default=20)
+	parser.add_argument("--duration", type=float, default=5)
+	parser.add_argument("--dim", type=int, default=1536)
+	parser.add_argument("--seed", type=int, default=7)
+	args = parser.parse_args()
+	with contextlib.ExitStack() as stack:
+		url = args.url or stack.enter_context(MilvusStub(args.latency_ms / 1000)).url
+		asyncio.run(run(args, url))
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,194 @@
+"""
+Recall vs latency of the search profiles (fast, balanced, exhaustive).
+
+Loads a synthetic corpus (clustered unit vectors, texts drawn from a small
+vocabulary) into a scratch collection of a real Milvus, then runs the same
+queries under every profile:
+
+- recall@k: dense-only hybrid searches (weights 1/0) against the exact cosine
+  top-k computed with NumPy, so it measures what HNSW `ef` and over-fetch buy;
+- latency: p50/p99 of sequential hybrid searches with weights 0.5/0.5.
+
+	python -m benchmarks.search_profiles --url http://localhost:19530 \
+		--docs 50000 --dim 256 --queries 200 --k 10
+
+The scratch collection is dropped at the end (unless --keep). Vectors still in
+growing segments are searched without the index, so the corpus is flushed
+before measuring when the server supports it.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+import numpy as np
+
+from app.core.connectors.milvus import MilvusInsert, MilvusSearch
+from app.core.connectors.milvus_bootstrap import (
+	_post,
+	create_doc_chunks_collection,
+	create_index,
+	essential_indexes,
+	load_collection,
+	scalar_indexes,
+)
+from app.core.connectors.milvus_http import close_milvus_http
+from app.core.connectors.search_profiles import SEARCH_PROFILES
+from app.rag.schemas import EmbeddedChunk
+from app.settings import Settings
+
+_WORDS = (
+	"maquininha taxa debito credito pix boleto antecipacao parcelamento conta "
+	"cartao tarifa limite saque transferencia rendimento cobranca link venda "
+	"recebimento prazo suporte cadastro seguranca chip contactless bateria"
+).split()
+
+
+def make_corpus(
+	docs: int, dim: int, clusters: int, seed: int
+) -> tuple[np.ndarray, list[str], np.ndarray]:
+	"""Unit vectors around `clusters` centres, their texts and the centres."""
+	rng = np.random.default_rng(seed)
+	centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+	owner = rng.integers(0, clusters, size=docs)
+	vectors = centres[owner] + 0.6 * rng.normal(size=(docs, dim)).astype(np.float32)
+	vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+	words = random.Random(seed)
+	texts = [" ".join(words.choices(_WORDS, k=24)) for _ in range(docs)]
+	return vectors, texts, centres
+
+
+def make_queries(
+	centres: np.ndarray, n: int, seed: int
+) -> tuple[np.ndarray, list[str]]:
+	rng = np.random.default_rng(seed + 1)
+	picked = centres[rng.integers(0, len(centres), size=n)]
+	queries = picked + 0.8 * rng.normal(size=picked.shape).astype(np.float32)
+	queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+	words = random.Random(seed + 1)
+	texts = [" ".join(words.choices(_WORDS, k=5)) for _ in range(n)]
+	return queries, texts
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> list[set[int]]:
+	scores = queries @ corpus.T  # unit vectors: cosine similarity
+	top = np.argpartition(-scores, k, axis=1)[:, :k]
+	return [set(map(int, row)) for row in top]
+
+
+async def load_corpus(
+	url: str, token: str, collection: str, vectors: np.ndarray, texts: list[str]
+) -> None:
+	await create_doc_chunks_collection(url, token, collection, vectors.shape[1])
+	for spec in essential_indexes + scalar_indexes:
+		await create_index(url, token, collection, [spec])
+	await load_collection(url, token, collection)
+
+	milvus = MilvusInsert()
+	milvus.cluster_endpoint, milvus.collection_name = url.rstrip("/"), collection
+	batch = 500
+	for start in range(0, len(texts), batch):
+		await milvus.upsert(
+			[
+				EmbeddedChunk(
+					chunk_id=f"bench-{i}",
+					file_id="bench",
+					page_idx=0,
+					chunk_idx=i,
+					source="bench",
+					filename="bench",
+					title="bench",
+					text=texts[i],
+					vector=vectors[i].tolist(),
+				)
+				for i in range(start, min(start + batch, len(texts)))
+			]
+		)
+	try:
+		await _post(
+			url, "/v2/vectordb/collections/flush", token, {"collectionName": collection}
+		)
+	except Exception as e:
+		print(f"flush not available ({e}); recall may be optimistic")
+
+
+async def measure(
+	milvus: MilvusSearch,
+	profile: str,
+	vectors: np.ndarray,
+	texts: list[str],
+	truth: list[set[int]],
+	k: int,
+) -> tuple[float, float, float]:
+	"""(recall@k, p50 ms, p99 ms) of `profile`."""
+	recalls, latencies = [], []
+	for vector, text, expected in zip(vectors.tolist(), texts, truth):
+		raw = await milvus.asearch(text, vector, "", 1.0, 0.0, k, profile)
+		found = {int(h["chunk_idx"]) for h in raw.get("data", [])}
+		recalls.append(len(found & expected) / k)
+
+		start = time.perf_counter()
+		await milvus.asearch(text, vector, "", 0.5, 0.5, k, profile)
+		latencies.append(time.perf_counter() - start)
+	cuts = statistics.quantiles(latencies, n=100)
+	return statistics.fmean(recalls), cuts[49] * 1000, cuts[98] * 1000
+
+
+async def run(args: argparse.Namespace) -> None:
+	url = (args.url or Settings.get().MILVUS_URL).rstrip("/")
+	token = Settings.get().MILVUS_SECRET
+	corpus, texts, centres = make_corpus(args.docs, args.dim, args.clusters, args.seed)
+	queries, query_texts = make_queries(centres, args.queries, args.seed)
+	truth = exact_top_k(corpus, queries, args.k)
+
+	print(f"loading {args.docs} x {args.dim} into {args.collection} at {url}")
+	try:
+		await load_corpus(url, token, args.collection, corpus, texts)
+		milvus = MilvusSearch()
+		milvus.cluster_endpoint, milvus.collection_name = url, args.collection
+		print(
+			f"{'profile':<11} {'ef':>4} {'over':>4} {'consistency':<11} "
+			f"{f'recall@{args.k}':>9} {'p50 ms':>7} {'p99 ms':>7}"
+		)
+		for name in args.profiles:
+			p = SEARCH_PROFILES[name]
+			recall, p50, p99 = await measure(
+				milvus, name, queries, query_texts, truth, args.k
+			)
+			print(
+				f"{name:<11} {p.ef:>4} {p.overfetch:>4} {p.consistency:<11} "
+				f"{recall:>9.3f} {p50:>7.1f} {p99:>7.1f}"
+			)
+	finally:
+		if not args.keep:
+			await _post(
+				url,
+				"/v2/vectordb/collections/drop",
+				token,
+				{"collectionName": args.collection},
+			)
+		await close_milvus_http()
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--url", default="", help="Milvus REST endpoint")
+	parser.add_argument("--collection", default="bench_search_profiles")
+	parser.add_argument("--docs", type=int, default=20_000)
+	parser.add_argument("--dim", type=int, default=256)
+	parser.add_argument("--clusters", type=int, default=64)
+	parser.add_argument("--queries", type=int, default=200)
+	parser.add_argument("--k", type=int, default=10)
+	parser.add_argument(
+		"--profiles", nargs="+", default=list(SEARCH_PROFILES), choices=SEARCH_PROFILES
+	)
+	parser.add_argument("--seed", type=int, default=7)
+	parser.add_argument("--keep", action="store_true", help="keep the collection")
+	args = parser.parse_args()
+	asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+	main()
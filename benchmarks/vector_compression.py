@@ -0,0 +1,178 @@
+"""
+Recall vs size of the compact vector modes (EMBED_DIMENSIONS / VECTOR_STORAGE).
+
+Embeds a corpus (chunks of the given PDFs, or synthetic pages), uses a sample
+of perturbed chunks as queries and compares the exact top-k of every
+(dimension, storage) variant against full-size float32 vectors. Reports
+recall@k, bytes per stored vector and the size of the JSON insert payload.
+
+	python -m benchmarks.vector_compression --pdf docs/*.pdf --provider openai \
+		--dims 1536 1024 512 256 --k 10
+
+Truncation is only meaningful for Matryoshka models (OpenAI text-embedding-3);
+the offline providers (hashing, fake) exercise the quantization modes.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import List
+
+import numpy as np
+
+from app.core.connectors.vector_format import (
+	BYTES_PER_DIM,
+	MILVUS_VECTOR_TYPES,
+	encode_vector,
+	truncate,
+)
+from app.core.pdf_uploader.chunkfier import _chunk_text
+from app.core.pdf_uploader.embedding_providers import (
+	EmbeddingProvider,
+	FakeProvider,
+	HashingProvider,
+	OpenAIProvider,
+)
+from app.core.pdf_uploader.parse_engine import ParseEngine
+from benchmarks.chunker_bench import build_page
+
+
+async def load_corpus(pdfs: List[str], pages: int, seed: int) -> List[str]:
+	if not pdfs:
+		rng = random.Random(seed)
+		texts = [build_page(rng, 6000) for _ in range(pages)]
+	else:
+		engine = ParseEngine(max_workers=2)
+		try:
+			texts = [p["text"] for path in pdfs for p in await engine.parse(path)]
+		finally:
+			engine.shutdown()
+	return [c for t in texts for c in _chunk_text(t)]
+
+
+def perturb(rng: random.Random, text: str) -> str:
+	"""A query resembling `text`: a window of its words with some dropped."""
+	words = text.split()
+	start = rng.randrange(max(1, len(words) - 40))
+	window = words[start : start + 40]
+	return " ".join(w for w in window if rng.random() > 0.25) or text
+
+
+def stored(vectors: np.ndarray, storage: str) -> np.ndarray:
+	"""What Milvus keeps for `storage`, decoded back to float32 for scoring."""
+	if storage == "float16":
+		return vectors.astype(np.float16).astype(np.float32)
+	if storage == "bfloat16":
+		bits = vectors.astype(np.float32).view(np.uint32)
+		rounded = (bits + 0x7FFF + ((bits >> 16) & 1)) & 0xFFFF0000
+		return rounded.astype(np.uint32).view(np.float32)
+	if storage == "int8":
+		return np.array([encode_vector(v, "int8") for v in vectors], dtype=np.float32)
+	return vectors
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+	corpus = corpus / np.maximum(np.linalg.norm(corpus, axis=1, keepdims=True), 1e-12)
+	queries = queries / np.maximum(
+		np.linalg.norm(queries, axis=1, keepdims=True), 1e-12
+	)
+	scores = queries @ corpus.T
+	return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+	return statistics.mean(
+		len(set(f) & set(t)) / len(t) for f, t in zip(found.tolist(), truth.tolist())
+	)
+
+
+def build(name: str, dim: int) -> EmbeddingProvider:
+	if name == "openai":
+		return OpenAIProvider()
+	if name == "fake":
+		return FakeProvider(dim=dim)
+	return HashingProvider(dim=dim)
+
+
+async def embed_all(
+	provider: EmbeddingProvider, texts: List[str], batch: int = 64
+) -> np.ndarray:
+	out: List[List[float]] = []
+	for i in range(0, len(texts), batch):
+		out.extend(await provider.embed(texts[i : i + batch]))
+	return np.array(out, dtype=np.float32)
+
+
+async def run(args: argparse.Namespace) -> None:
+	rng = random.Random(args.seed)
+	chunks = await load_corpus(args.pdf, args.pages, args.seed)
+	queries = [
+		perturb(rng, c) for c in rng.sample(chunks, min(args.queries, len(chunks)))
+	]
+
+	provider = build(args.provider, args.dim)
+	try:
+		start = time.perf_counter()
+		corpus_vecs = await embed_all(provider, chunks)
+		query_vecs = await embed_all(provider, queries)
+		elapsed = time.perf_counter() - start
+	finally:
+		await provider.close()
+
+	full = corpus_vecs.shape[1]
+	truth = top_k(corpus_vecs, query_vecs, args.k)
+	print(
+		f"{len(chunks)} chunks, {len(queries)} queries, provider={provider.model} "
+		f"dim={full}, embedded in {elapsed:.1f}s, recall@{args.k} vs float32/{full}"
+	)
+	print(
+		f"{'dim':>5} {'storage':<9} {'milvus type':<15} {'recall':>7} "
+		f"{'bytes/vec':>10} {'json/vec':>9} {'ratio':>6}"
+	)
+
+	base_bytes = full * BYTES_PER_DIM["float32"]
+	for dim in sorted({d for d in args.dims if 0 < d <= full} | {full}, reverse=True):
+		corpus_dim = np.array([truncate(v, dim) for v in corpus_vecs], np.float32)
+		query_dim = np.array([truncate(v, dim) for v in query_vecs], np.float32)
+		for storage in args.storage:
+			found = top_k(
+				stored(corpus_dim, storage), stored(query_dim, storage), args.k
+			)
+			size = dim * BYTES_PER_DIM[storage]
+			payload = statistics.mean(
+				len(json.dumps(encode_vector(v.tolist(), storage)))
+				for v in corpus_dim[:200]
+			)
+			print(
+				f"{dim:>5} {storage:<9} {MILVUS_VECTOR_TYPES[storage]:<15} "
+				f"{recall(found, truth):>7.3f} {size:>10,} {payload:>9,.0f} "
+				f"{base_bytes / size:>5.1f}x"
+			)
+
+
+def main() -> None:
+	parser = argparse.ArgumentParser(description=__doc__)
+	parser.add_argument("--pdf", nargs="*", default=[], help="corpus PDFs")
+	parser.add_argument("--pages", type=int, default=60, help="synthetic pages")
+	parser.add_argument(
+		"--provider", choices=["openai", "hashing", "fake"], default="hashing"
+	)
+	parser.add_argument("--dim", type=int, default=384, help="hashing/fake size")
+	parser.add_argument("--dims", type=int, nargs="+", default=[256, 128])
+	parser.add_argument(
+		"--storage",
+		nargs="+",
+		choices=list(MILVUS_VECTOR_TYPES),
+		default=list(MILVUS_VECTOR_TYPES),
+	)
+	parser.add_argument("--queries", type=int, default=200)
+	parser.add_argument("--k", type=int, default=10)
+	parser.add_argument("--seed", type=int, default=7)
+	asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+	main()
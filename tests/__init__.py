@@ -0,0 +1,17 @@
+"""
+Unit tests, runnable without external services:
+
+	python -m unittest discover -s tests -t .
+
+Importing anything under `app` loads `Settings`, so placeholder values are set for
+the required variables (real ones win).
+"""
+
+import os
+
+for _key, _value in {
+	"OPENAI_API_KEY": "test",
+	"MONGO_URI": "mongodb://localhost:27017",
+	"MONGO_DB": "test",
+}.items():
+	os.environ.setdefault(_key, _value)
@@ -0,0 +1,53 @@
+import re
+import unittest
+
+from app.core.pdf_uploader.chunkfier import _chunk_text_tokens
+
+SENTENCE_RE = re.compile(r"[^ ][^.]*\.")
+
+
+def words(text: str) -> int:
+	return len(text.split())
+
+
+def sentence(i: int, n: int = 5) -> str:
+	return " ".join(f"s{i}w{j}" for j in range(n - 1)) + f" fim{i}."
+
+
+class ChunkTextTokensTest(unittest.TestCase):
+	def test_chunks_respect_the_token_budget(self):
+		text = " ".join(sentence(i) for i in range(40))
+		chunks = _chunk_text_tokens(text, 22, 10, words)
+		self.assertGreater(len(chunks), 1)
+		self.assertTrue(all(words(c) <= 22 for c in chunks))
+		# whole sentences only, and none is lost
+		self.assertTrue(all(c.endswith(".") for c in chunks))
+		self.assertEqual(
+			{s for c in chunks for s in SENTENCE_RE.findall(c)},
+			set(SENTENCE_RE.findall(text)),
+		)
+
+	def test_consecutive_chunks_share_the_overlap(self):
+		text = " ".join(sentence(i) for i in range(20))
+		chunks = _chunk_text_tokens(text, 20, 10, words)
+		for prev, nxt in zip(chunks, chunks[1:]):
+			tail = prev.split(" ")[-10:]
+			self.assertEqual(nxt.split(" ")[:10], tail)
+
+	def test_no_overlap_when_the_budget_is_zero(self):
+		text = " ".join(sentence(i) for i in range(20))
+		chunks = _chunk_text_tokens(text, 20, 0, words)
+		self.assertEqual(" ".join(chunks), text)
+
+	def test_oversized_sentences_are_split_on_words(self):
+		text = sentence(0, 50)
+		chunks = _chunk_text_tokens(text, 12, 0, words)
+		self.assertEqual([words(c) for c in chunks], [12, 12, 12, 12, 2])
+		self.assertEqual(" ".join(chunks), text)
+
+	def test_empty_text(self):
+		self.assertEqual(_chunk_text_tokens("  \n ", 20, 5, words), [])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,63 @@
+import random
+import unittest
+
+from app.core.pdf_uploader.dedup import SimHashIndex, signature
+
+TEXT = (
+	"a taxa de manutencao da maquininha e cobrada no primeiro dia util de cada "
+	"mes diretamente na conta do cliente cadastrada no aplicativo"
+)
+
+
+def flip(sig: str, bits: list[int]) -> str:
+	value = int(sig, 16)
+	for bit in bits:
+		value ^= 1 << bit
+	return f"{value:016x}"
+
+
+class SimHashIndexTest(unittest.TestCase):
+	def test_every_signature_within_distance_is_found(self):
+		rng = random.Random(7)
+		for max_distance in (0, 3, 6):
+			index = SimHashIndex(max_distance=max_distance)
+			sig = f"{rng.getrandbits(64):016x}"
+			index.add(sig, ("f", 1))
+			for _ in range(200):
+				near = flip(sig, rng.sample(range(64), rng.randint(0, max_distance)))
+				self.assertEqual(index.find(near), ("f", 1), (max_distance, near))
+				far = flip(sig, rng.sample(range(64), max_distance + 1))
+				self.assertIsNone(index.find(far))
+
+	def test_edited_text_is_a_near_duplicate(self):
+		index = SimHashIndex(max_distance=3)
+		index.add(signature(TEXT), ("f", 1))
+		self.assertEqual(index.find(signature(TEXT.upper())), ("f", 1))
+		self.assertIsNone(index.find(signature("limite do cartao " * 4)))
+
+	def test_short_texts_only_match_exactly(self):
+		index = SimHashIndex(max_distance=3)
+		short = signature("taxa do pix")
+		self.assertTrue(short.startswith("x"))
+		index.add(short, ("f", 1))
+		self.assertEqual(index.find(short), ("f", 1))
+		self.assertIsNone(index.find(signature("taxa do boleto")))
+
+	def test_remove_forgets_only_the_given_pages(self):
+		index = SimHashIndex()
+		sig = signature(TEXT)
+		index.add(sig, ("f", 1))
+		index.add(sig, ("f", 2))
+		index.add(sig, ("g", 1))
+		index.remove("f", [1])
+		self.assertEqual(index._refs[sig], {("f", 2), ("g", 1)})
+		index.remove("f")
+		self.assertEqual(index.find(sig), ("g", 1))
+		index.remove("g")
+		self.assertIsNone(index.find(sig))
+		self.assertEqual(len(index), 0)
+		self.assertTrue(all(not b for b in index._buckets))
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app.core.pdf_uploader import embed_scheduler
+from app.core.pdf_uploader.embed_scheduler import EmbeddingScheduler, TokenBucket
+
+
+class RecordingSend:
+	def __init__(self):
+		self.batches: list[list[str]] = []
+
+	async def __call__(self, texts: list[str]) -> list[list[float]]:
+		self.batches.append(texts)
+		await asyncio.sleep(0)
+		return [[float(len(t))] for t in texts]
+
+
+class FakeClock:
+	"""time.monotonic and asyncio.sleep of a clock that only moves when slept on."""
+
+	def __init__(self):
+		self.now = 0.0
+		self.slept: list[float] = []
+
+	def monotonic(self) -> float:
+		return self.now
+
+	async def sleep(self, seconds: float) -> None:
+		self.slept.append(seconds)
+		self.now += seconds
+
+
+class EmbeddingSchedulerTest(unittest.IsolatedAsyncioTestCase):
+	async def test_interactive_texts_are_sent_first(self):
+		send = RecordingSend()
+		scheduler = EmbeddingScheduler(
+			send, len, batch_size=2, window=0, max_concurrency=1
+		)
+		try:
+			bulk, query = await asyncio.gather(
+				scheduler.embed(["b0", "b1", "b2", "b3"], "bulk"),
+				scheduler.embed(["query"], "interactive"),
+			)
+		finally:
+			await scheduler.close()
+
+		self.assertEqual(send.batches[0], ["query", "b0"])
+		self.assertEqual(query, [[5.0]])
+		self.assertEqual(bulk, [[2.0]] * 4)
+
+	async def test_batches_respect_the_token_budget(self):
+		send = RecordingSend()
+		scheduler = EmbeddingScheduler(
+			send, len, batch_size=10, max_batch_tokens=6, window=0
+		)
+		try:
+			await scheduler.embed(["aaa", "bbb", "cc", "dddddddd"])
+		finally:
+			await scheduler.close()
+
+		# an oversized text still goes out, alone
+		self.assertEqual(send.batches, [["aaa", "bbb"], ["cc"], ["dddddddd"]])
+
+	async def test_failed_request_fails_only_its_callers(self):
+		async def send(texts):
+			if "bad" in texts:
+				raise RuntimeError("rejected")
+			return [[1.0] for _ in texts]
+
+		scheduler = EmbeddingScheduler(send, len, batch_size=1, window=0)
+		try:
+			ok, failed = await asyncio.gather(
+				scheduler.embed(["good"]),
+				scheduler.embed(["bad"]),
+				return_exceptions=True,
+			)
+		finally:
+			await scheduler.close()
+
+		self.assertEqual(ok, [[1.0]])
+		self.assertIsInstance(failed, RuntimeError)
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+	async def acquire_all(self, bucket_args, amounts) -> FakeClock:
+		clock = FakeClock()
+		with (
+			mock.patch.object(embed_scheduler, "time", clock),
+			mock.patch.object(
+				embed_scheduler, "asyncio", SimpleNamespace(sleep=clock.sleep)
+			),
+		):
+			bucket = TokenBucket(*bucket_args)
+			for amount in amounts:
+				await bucket.acquire(amount)
+		return clock
+
+	async def test_requests_are_paced_once_the_burst_is_spent(self):
+		clock = await self.acquire_all((60,), [1] * 63)
+		# 60 requests go out at once, then one per second
+		self.assertAlmostEqual(clock.now, 3.0)
+
+	async def test_oversized_amount_waits_for_a_full_bucket(self):
+		clock = await self.acquire_all((600, 100), [100, 1000])
+		self.assertAlmostEqual(clock.now, 10.0)
+
+	async def test_zero_rate_never_waits(self):
+		clock = await self.acquire_all((0,), [10**9] * 3)
+		self.assertEqual(clock.slept, [])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from app.core.connectors.embedded_store import EmbeddedSearch, EmbeddedStore
+from app.core.fusion import RRF_K
+from app.rag.schemas import EmbeddedChunk
+
+
+def make_store() -> EmbeddedStore:
+	store = EmbeddedStore()
+	store.upsert(
+		[
+			EmbeddedChunk(
+				chunk_id=f"c{i}",
+				file_id="f",
+				page_idx=1,
+				chunk_idx=i,
+				source="doc.pdf",
+				filename="doc.pdf",
+				title="doc",
+				text=text,
+				vector=vector,
+			)
+			for i, (text, vector) in enumerate(
+				[
+					("taxa do pix", [1.0, 0.0]),
+					("limite do cartao", [0.0, 1.0]),
+					("taxa do boleto", [0.7, 0.7]),
+				]
+			)
+		]
+	)
+	return store
+
+
+class EmbeddedSearchTest(unittest.IsolatedAsyncioTestCase):
+	async def test_asearch_forwards_fusion_and_vectors(self):
+		search = EmbeddedSearch(make_store())
+
+		raw = await search.asearch(
+			"taxa", [1.0, 0.0], "", 0.5, 0.5, 3, fusion="rrf", with_vectors=True
+		)
+
+		hits = raw["data"]
+		self.assertEqual(len(hits), 3)
+		self.assertTrue(all("vector" in h for h in hits))
+		# reciprocal rank scores, not weighted similarities
+		self.assertTrue(all(h["distance"] <= 2 / (RRF_K + 1) for h in hits))
+		self.assertEqual(hits[0]["chunk_id"], "c0")
+
+
+class EmbeddedSnapshotTest(unittest.TestCase):
+	def test_concurrent_saves_do_not_clobber_each_other(self):
+		with tempfile.TemporaryDirectory() as root:
+			store = make_store()
+			store.path = os.path.join(root, "store")
+			errors: list[BaseException] = []
+
+			def save():
+				try:
+					store.save()
+				except BaseException as e:
+					errors.append(e)
+
+			threads = [threading.Thread(target=save) for _ in range(8)]
+			for t in threads:
+				t.start()
+			for t in threads:
+				t.join()
+
+			self.assertEqual(errors, [])
+			loaded = EmbeddedStore(store.path)
+			loaded.load()
+			self.assertEqual(len(loaded), 3)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+
+from app.core.pdf_uploader import embedding_cache
+from app.core.pdf_uploader.embedding_cache import EmbeddingCache
+
+
+class FakeCursor:
+	def __init__(self, rows):
+		self.rows = rows
+
+	def sort(self, key: str, direction: int) -> "FakeCursor":
+		rows = sorted(self.rows, key=lambda r: r[key], reverse=direction < 0)
+		return FakeCursor(rows)
+
+	def limit(self, n: int) -> "FakeCursor":
+		return FakeCursor(self.rows[:n])
+
+	def __aiter__(self):
+		async def rows():
+			for row in self.rows:
+				yield {"_id": row["_id"]}
+
+		return rows()
+
+
+class FakeCollection:
+	def __init__(self, n: int):
+		self.rows = [{"_id": i, "created_at": i} for i in range(n)]
+
+	async def estimated_document_count(self) -> int:
+		return len(self.rows)
+
+	def find(self, query: dict, projection: dict) -> FakeCursor:
+		return FakeCursor(self.rows)
+
+	async def delete_many(self, query: dict) -> None:
+		ids = set(query["_id"]["$in"])
+		self.rows = [r for r in self.rows if r["_id"] not in ids]
+
+
+class PersistentTrimTest(unittest.IsolatedAsyncioTestCase):
+	async def put(self, cache: EmbeddingCache, collection: FakeCollection) -> None:
+		dao = mock.MagicMock()
+		dao.get_pymongo_collection.return_value = collection
+		with (
+			mock.patch.object(embedding_cache, "EmbeddingCacheDAO", dao),
+			mock.patch.object(cache, "_store"),
+		):
+			await cache.put_many("model", {"k": [1.0, 0.0]})
+
+	async def test_oldest_entries_are_evicted_past_the_cap(self):
+		collection = FakeCollection(10)
+		await self.put(EmbeddingCache(persist_max_entries=6), collection)
+		self.assertEqual([r["_id"] for r in collection.rows], [4, 5, 6, 7, 8, 9])
+
+	async def test_size_is_checked_at_most_once_per_interval(self):
+		cache, collection = EmbeddingCache(persist_max_entries=6), FakeCollection(8)
+		await self.put(cache, collection)
+		collection.rows += [{"_id": i, "created_at": i} for i in range(10, 14)]
+		await self.put(cache, collection)
+		self.assertEqual(len(collection.rows), 10)
+
+	async def test_zero_cap_is_unbounded(self):
+		collection = FakeCollection(10)
+		await self.put(EmbeddingCache(persist_max_entries=0), collection)
+		self.assertEqual(len(collection.rows), 10)
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from app.core.connectors.embedded_store import parse_filter
+from app.core.connectors.milvus import filter_expr
+from app.rag.schemas import SearchFilters
+
+
+class ParseFilterTest(unittest.TestCase):
+	def test_parses_the_expressions_the_app_writes(self):
+		filters = SearchFilters(
+			file_ids=["f1", "f2"], titles=['Tarifas "PJ"'], page_from=2, page_to=9
+		)
+		self.assertEqual(
+			parse_filter(filter_expr(filters)),
+			[
+				("file_id", "in", ["f1", "f2"]),
+				("title", "in", ['Tarifas "PJ"']),
+				("page_idx", ">=", 2),
+				("page_idx", "<=", 9),
+			],
+		)
+
+	def test_operators(self):
+		self.assertEqual(
+			parse_filter('chunk_id not in ["a"] and page_idx != 3 and source == "x"'),
+			[
+				("chunk_id", "not in", ["a"]),
+				("page_idx", "!=", 3),
+				("source", "==", "x"),
+			],
+		)
+
+	def test_empty_expression_matches_everything(self):
+		self.assertEqual(parse_filter(""), [])
+		self.assertEqual(filter_expr(SearchFilters()), "")
+		self.assertEqual(filter_expr(None), "")
+
+	def test_rejects_unsupported_expressions(self):
+		for expr in (
+			'vector in ["a"]',
+			'file_id in ["a"] or page_idx > 1',
+			"page_idx >= two",
+			'file_id like "a%"',
+			"page_idx > 1 and",
+		):
+			with self.subTest(expr=expr), self.assertRaises(ValueError):
+				parse_filter(expr)
+
+
+if __name__ == "__main__":
+	unittest.main()
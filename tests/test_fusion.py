@@ -0,0 +1,43 @@
+import unittest
+
+import numpy as np
+
+from app.core.fusion import diversify, mmr
+
+# two near-duplicates of one chunk and an unrelated one
+VECTORS = np.asarray([[1.0, 0.0], [0.99, 0.05], [0.0, 1.0]])
+RELEVANCE = np.asarray([0.9, 0.85, 0.5])
+
+
+class MmrTest(unittest.TestCase):
+	def test_near_duplicates_drop_below_diverse_hits(self):
+		self.assertEqual(mmr(RELEVANCE, VECTORS, 3, 0.5), [0, 2, 1])
+
+	def test_lambda_one_keeps_the_relevance_order(self):
+		self.assertEqual(mmr(RELEVANCE, VECTORS, 3, 1.0), [0, 1, 2])
+
+	def test_k_is_clipped(self):
+		self.assertEqual(mmr(RELEVANCE, VECTORS, 1, 0.5), [0])
+		self.assertEqual(len(mmr(RELEVANCE, VECTORS, 10, 0.5)), 3)
+		self.assertEqual(mmr(RELEVANCE, VECTORS, 0, 0.5), [])
+		self.assertEqual(mmr(np.zeros(0), np.zeros((0, 2)), 3, 0.5), [])
+
+	def test_zero_vectors_and_equal_scores(self):
+		vectors = np.asarray([[0.0, 0.0], [1.0, 0.0]])
+		self.assertEqual(sorted(mmr(np.ones(2), vectors, 2, 0.5)), [0, 1])
+
+	def test_diversify_drops_vectors_and_falls_back_without_them(self):
+		hits = [
+			{"id": i, "distance": float(r), "vector": v.tolist()}
+			for i, (r, v) in enumerate(zip(RELEVANCE, VECTORS))
+		]
+		kept = diversify([dict(h) for h in hits], 2, 0.5)
+		self.assertEqual([h["id"] for h in kept], [0, 2])
+		self.assertTrue(all("vector" not in h for h in kept))
+
+		hits[1]["vector"] = None
+		self.assertEqual([h["id"] for h in diversify(hits, 2, 0.5)], [0, 1])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from app.core.pdf_uploader import pdf_ingestion
+from app.rag.schemas import IndexingResult
+
+
+class IngestConcurrencyTest(unittest.IsolatedAsyncioTestCase):
+	async def test_same_file_uploaded_twice_is_ingested_once(self):
+		stored: set[str] = set()
+		ingested: list[str] = []
+
+		async def find_one(_query):
+			await asyncio.sleep(0)  # a real lookup yields to the other upload
+			return object() if stored else None
+
+		async def ingest_new(path, file_hash, *args):
+			ingested.append(file_hash)
+			await asyncio.sleep(0.01)
+			stored.add(file_hash)
+			return IndexingResult(total_chunks=3, errors=[], message="ok")
+
+		file_dao = mock.MagicMock()
+		file_dao.find_one = find_one
+		with (
+			mock.patch.object(pdf_ingestion, "FileDAO", file_dao),
+			mock.patch.object(pdf_ingestion, "_ingest_new", ingest_new),
+			mock.patch.object(pdf_ingestion, "bump_collection_version"),
+		):
+			results = await asyncio.gather(
+				*(
+					pdf_ingestion.ingest_file(
+						"doc.pdf", "doc.pdf", file_hash="h", size_bytes=10
+					)
+					for _ in range(2)
+				)
+			)
+
+		self.assertEqual(ingested, ["h"])
+		self.assertEqual(sorted(r.total_chunks for r in results), [0, 3])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pymupdf
+
+from app.core.pdf_uploader import ocr_pool
+
+
+def write_pdf(path: str) -> None:
+	doc = pymupdf.open()
+	doc.new_page()
+	doc.save(path)
+	doc.close()
+
+
+class OcrDocCacheTest(unittest.TestCase):
+	def setUp(self):
+		self.root = tempfile.TemporaryDirectory()
+		self.spool = Path(self.root.name, "spool")
+		self.spool.mkdir()
+		ocr_pool._DOC_CACHE.clear()
+
+	def tearDown(self):
+		for doc in ocr_pool._DOC_CACHE.values():
+			doc.close()
+		ocr_pool._DOC_CACHE.clear()
+		self.root.cleanup()
+
+	def ocr(self, path: str) -> None:
+		with (
+			mock.patch.object(ocr_pool, "_spool_dir", return_value=self.spool),
+			mock.patch.object(ocr_pool, "_ocr_page", return_value="text"),
+		):
+			ocr_pool._ocr_task(path, 0, 200, "por", 0)
+
+	def test_spooled_files_are_not_kept_open(self):
+		path = str(self.spool / "upload.pdf")
+		write_pdf(path)
+		self.ocr(path)
+		self.assertEqual(len(ocr_pool._DOC_CACHE), 0)
+
+	def test_other_files_are_cached(self):
+		path = os.path.join(self.root.name, "doc.pdf")
+		write_pdf(path)
+		self.ocr(path)
+		self.ocr(path)
+		self.assertEqual([k[0] for k in ocr_pool._DOC_CACHE], [path])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+from unittest import mock
+
+from beanie import PydanticObjectId
+
+from app.core.pdf_uploader import pipeline
+from app.core.pdf_uploader.dedup import SimHashIndex, signature
+from app.core.pdf_uploader.pipeline import IngestPipeline
+from tests.test_upload_bisection import RecordingInsert, bad_request
+
+GOOD = "the monthly fee of the card machine is charged on the first business day"
+POISONED = "this poisoned page is rejected by the embedding provider every time"
+
+
+class RejectingEmbedder:
+	async def encode(self, texts: list[str], priority: str = "bulk"):
+		if any("poisoned" in t for t in texts):
+			raise bad_request()
+		return [[1.0, 0.0] for _ in texts]
+
+
+async def pages():
+	yield [{"page": 1, "text": GOOD}, {"page": 2, "text": POISONED}]
+
+
+class PipelineDedupTest(unittest.IsolatedAsyncioTestCase):
+	async def test_unindexed_chunks_leave_the_dedup_index(self):
+		dedup = SimHashIndex()
+		dedup._loaded = True
+		chunk_dao = mock.MagicMock()
+		chunk_dao.find.return_value.update = mock.AsyncMock()
+		ids = [str(PydanticObjectId()), str(PydanticObjectId())]
+
+		async def store(chunks, file_id):
+			return ids[: len(chunks)]
+
+		run = IngestPipeline(
+			PydanticObjectId(),
+			"doc.pdf",
+			"doc",
+			embedder=RejectingEmbedder(),  # type: ignore[arg-type]
+			milvus_client=RecordingInsert(),
+			dedup=dedup,
+			retry_budget=0,
+		)
+		with (
+			mock.patch.object(pipeline, "create_and_insert_chunks", store),
+			mock.patch.object(pipeline, "ChunkDAO", chunk_dao),
+		):
+			result = await run.run(pages())
+
+		self.assertEqual([e.chunk.page_idx for e in result.errors], [2])
+		self.assertIsNotNone(dedup.find(signature(GOOD)))
+		self.assertIsNone(dedup.find(signature(POISONED)))
+		# the stored chunk loses its signature too, so a reload does not restore it
+		query = chunk_dao.find.call_args.args[0]
+		self.assertEqual(query, {"_id": {"$in": [PydanticObjectId(ids[1])]}})
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from app.core.pdf_uploader import pdf_ingestion
+
+STORED = [
+	SimpleNamespace(filename="a.pdf", title="Report", created_at=1),
+	SimpleNamespace(filename="b.pdf", title="Handbook", created_at=2),
+	SimpleNamespace(filename="b.pdf", title="Untitled", created_at=3),
+]
+
+
+class FakeQuery:
+	def __init__(self, rows):
+		self.rows = rows
+
+	def sort(self, key: str) -> "FakeQuery":
+		assert key == "-created_at"
+		return FakeQuery(sorted(self.rows, key=lambda f: -f.created_at))
+
+	async def to_list(self):
+		return self.rows
+
+
+class FakeFileDAO:
+	@staticmethod
+	def find(query: dict) -> FakeQuery:
+		return FakeQuery([f for f in STORED if f.filename == query["filename"]])
+
+
+class FindPreviousVersionTest(unittest.IsolatedAsyncioTestCase):
+	async def find(self, filename, title):
+		with mock.patch.object(pdf_ingestion, "FileDAO", FakeFileDAO):
+			return await pdf_ingestion.find_previous_version(filename, title)
+
+	async def test_title_collision_is_not_a_new_version(self):
+		self.assertIsNone(await self.find("other.pdf", "Report"))
+		self.assertIsNone(await self.find(None, "Report"))
+
+	async def test_same_filename_is_a_new_version(self):
+		self.assertIs(await self.find("a.pdf", "Annual report"), STORED[0])
+
+	async def test_title_breaks_ties_between_same_filenames(self):
+		self.assertIs(await self.find("b.pdf", "Handbook"), STORED[1])
+		self.assertIs(await self.find("b.pdf", "Something else"), STORED[2])
+
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+import httpx
+import openai
+
+from app.core import search_cache
+
+
+class RateLimitedOnceEmbedder:
+	def __init__(self):
+		self.calls = 0
+
+	async def encode(self, texts: list[str], priority: str = "bulk"):
+		self.calls += 1
+		if self.calls == 1:
+			request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+			raise openai.RateLimitError(
+				"slow down", response=httpx.Response(429, request=request), body=None
+			)
+		return [[1.0, 0.0] for _ in texts]
+
+
+class FakeSearch:
+	def __init__(self):
+		self.calls = 0
+
+	async def asearch_many(self, queries, dense_embeddings, **kwargs):
+		self.calls += 1
+		return [[{"chunk_id": q}] for q in queries]
+
+
+class FixedEmbedder:
+	async def encode(self, texts: list[str], priority: str = "bulk"):
+		return [[1.0, 0.0] for _ in texts]
+
+
+class QueryEmbeddingRetryTest(unittest.IsolatedAsyncioTestCase):
+	async def test_rate_limited_query_embedding_is_retried(self):
+		embedder = RateLimitedOnceEmbedder()
+		with (
+			mock.patch.object(search_cache, "get_embedder", return_value=embedder),
+			mock.patch.object(search_cache, "vector_search", return_value=FakeSearch()),
+			mock.patch.object(search_cache, "get_search_cache", return_value=None),
+		):
+			hits = await search_cache.hybrid_search_hits_many(["taxa"], 0.5, 0.5, 3)
+
+		self.assertEqual(hits, [[{"chunk_id": "taxa"}]])
+		self.assertEqual(embedder.calls, 2)
+
+
+class SharedVersionTest(unittest.IsolatedAsyncioTestCase):
+	async def test_version_bumped_elsewhere_invalidates_results(self):
+		cache, milvus = search_cache.SearchCache(), FakeSearch()
+		shared = mock.AsyncMock(return_value=4)
+		with (
+			mock.patch.object(
+				search_cache, "get_embedder", return_value=FixedEmbedder()
+			),
+			mock.patch.object(search_cache, "vector_search", return_value=milvus),
+			mock.patch.object(search_cache, "get_search_cache", return_value=cache),
+			mock.patch.object(search_cache, "_shared_version", shared),
+		):
+			await search_cache.hybrid_search_hits("taxa", 0.5, 0.5, 3)
+			await search_cache.hybrid_search_hits("taxa", 0.5, 0.5, 3)
+			self.assertEqual(milvus.calls, 1)
+
+			# another worker ingested or deleted a document
+			shared.return_value = 5
+			await search_cache.hybrid_search_hits("taxa", 0.5, 0.5, 3)
+			self.assertEqual(milvus.calls, 2)
+			self.assertEqual(cache.version, 5)
+
+	async def test_unreadable_version_bypasses_the_cache(self):
+		cache, milvus = search_cache.SearchCache(), FakeSearch()
+		with (
+			mock.patch.object(
+				search_cache, "get_embedder", return_value=FixedEmbedder()
+			),
+			mock.patch.object(search_cache, "vector_search", return_value=milvus),
+			mock.patch.object(search_cache, "get_search_cache", return_value=cache),
+			mock.patch.object(
+				search_cache, "_shared_version", side_effect=RuntimeError("down")
+			),
+		):
+			for _ in range(2):
+				await search_cache.hybrid_search_hits("taxa", 0.5, 0.5, 3)
+
+		self.assertEqual(milvus.calls, 2)
+
+
+if __name__ == "__main__":
+	unittest.main()
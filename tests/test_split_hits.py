@@ -0,0 +1,62 @@
+import json
+import unittest
+from unittest import mock
+
+import httpx
+
+from app.core.connectors.milvus import MilvusSearch, _split_hits
+
+
+def hits(*ids: str) -> list[dict]:
+	return [{"chunk_id": i} for i in ids]
+
+
+class SplitHitsTest(unittest.TestCase):
+	def test_nested_response(self):
+		raw = {"data": [hits("a", "b"), hits("c")]}
+		self.assertEqual(_split_hits(raw, 2, 2), [hits("a", "b"), hits("c")])
+
+	def test_flat_response_split_by_topks(self):
+		raw = {"data": hits("a", "b", "c"), "topks": [1, 2]}
+		self.assertEqual(_split_hits(raw, 2, 2), [hits("a"), hits("b", "c")])
+
+	def test_flat_response_of_full_pages(self):
+		raw = {"data": hits("a", "b", "c", "d")}
+		self.assertEqual(_split_hits(raw, 2, 2), [hits("a", "b"), hits("c", "d")])
+
+	def test_short_flat_response_without_topks_is_ambiguous(self):
+		# the first query may have found one hit or three
+		raw = {"data": hits("a", "b", "c")}
+		self.assertIsNone(_split_hits(raw, 2, 2))
+
+
+class FakeHttp:
+	"""Answers batch searches with an unsplittable flat list."""
+
+	def __init__(self):
+		self.nqs: list[int] = []
+
+	async def post(self, url: str, payload: dict, token: str) -> httpx.Response:
+		nq = len(payload["search"][0]["data"])
+		self.nqs.append(nq)
+		data = hits("a", "b", "c") if nq > 1 else hits(f"q{len(self.nqs)}")
+		request = httpx.Request("POST", url)
+		return httpx.Response(200, content=json.dumps({"data": data}), request=request)
+
+
+class SearchManyFallbackTest(unittest.IsolatedAsyncioTestCase):
+	async def test_unsplittable_batch_is_searched_per_query(self):
+		http = FakeHttp()
+		with mock.patch(
+			"app.core.connectors.milvus.get_milvus_http", return_value=http
+		):
+			result = await MilvusSearch().asearch_many(
+				["x", "y"], [[1.0, 0.0], [0.0, 1.0]], "", 0.5, 0.5, 2
+			)
+
+		self.assertEqual(http.nqs, [2, 1, 1])
+		self.assertEqual(result, [hits("q2"), hits("q3")])
+
+
+if __name__ == "__main__":
+	unittest.main()
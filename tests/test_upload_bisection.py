@@ -0,0 +1,174 @@
+import unittest
+from unittest import mock
+
+import httpx
+import openai
+
+from app.core.connectors import milvus as milvus_module
+from app.core.connectors.milvus import MilvusInsert
+from app.core.connectors.retry import RetryBudget
+from app.rag.schemas import Chunk, EmbeddedChunk
+
+POISON = "poisoned chunk"
+
+
+def bad_request() -> openai.BadRequestError:
+	request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+	return openai.BadRequestError(
+		"invalid input", response=httpx.Response(400, request=request), body=None
+	)
+
+
+class PoisonEmbedder:
+	"""Rejects every request that contains the poisoned text."""
+
+	def __init__(self):
+		self.calls = 0
+
+	async def encode(self, texts: list[str], priority: str = "bulk"):
+		self.calls += 1
+		if POISON in texts:
+			raise bad_request()
+		return [[float(len(t)), 1.0] for t in texts]
+
+
+class UnauthorizedEmbedder:
+	def __init__(self):
+		self.calls = 0
+
+	async def encode(self, texts: list[str], priority: str = "bulk"):
+		self.calls += 1
+		request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+		raise openai.AuthenticationError(
+			"bad key", response=httpx.Response(401, request=request), body=None
+		)
+
+
+class OverloadedEmbedder:
+	"""Answers 503 to every request that contains the poisoned text."""
+
+	def __init__(self):
+		self.calls = 0
+
+	async def encode(self, texts: list[str], priority: str = "bulk"):
+		self.calls += 1
+		if POISON in texts:
+			request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+			raise openai.InternalServerError(
+				"overloaded", response=httpx.Response(503, request=request), body=None
+			)
+		return [[float(len(t)), 1.0] for t in texts]
+
+
+class RecordingInsert(MilvusInsert):
+	def __init__(self):
+		super().__init__()
+		self.embed_batch_size = 8
+		self.inserted: list[EmbeddedChunk] = []
+
+	async def upsert(self, data: list[EmbeddedChunk]):
+		self.inserted.extend(data)
+		return {"code": 0}
+
+
+def make_chunks(n: int, poisoned: int) -> list[Chunk]:
+	return [
+		Chunk(
+			file_id="f",
+			page_idx=1,
+			chunk_idx=i,
+			source="doc.pdf",
+			filename="doc.pdf",
+			title="doc",
+			text=POISON if i == poisoned else f"chunk {i}",
+		)
+		for i in range(n)
+	]
+
+
+class UploadBisectionTest(unittest.IsolatedAsyncioTestCase):
+	async def test_poisoned_text_is_isolated(self):
+		milvus, embedder = RecordingInsert(), PoisonEmbedder()
+		chunks = make_chunks(8, poisoned=5)
+		ids = [f"id{i}" for i in range(8)]
+
+		result = await milvus.upload_chunks(chunks, embedder, "f", ids, RetryBudget(0))
+
+		self.assertEqual([e.chunk.chunk_idx for e in result.errors], [5])
+		self.assertEqual(
+			sorted(e.chunk_id for e in milvus.inserted),
+			[i for n, i in enumerate(ids) if n != 5],
+		)
+		# each chunk keeps its own id through the recursion
+		for ent in milvus.inserted:
+			self.assertEqual(ent.chunk_id, f"id{ent.chunk_idx}")
+		# 1 + 2 + 2 + 2 requests: the batch, then halves down to the poisoned one
+		self.assertEqual(embedder.calls, 7)
+
+	async def test_auth_error_is_raised_without_bisection(self):
+		milvus, embedder = RecordingInsert(), UnauthorizedEmbedder()
+		chunks = make_chunks(8, poisoned=-1)
+		ids = [f"id{i}" for i in range(8)]
+
+		with self.assertRaises(openai.AuthenticationError):
+			await milvus.upload_chunks(chunks, embedder, "f", ids, RetryBudget(0))
+		self.assertEqual(embedder.calls, 1)
+
+	async def test_exhausted_retries_fail_only_that_batch(self):
+		milvus, embedder = RecordingInsert(), OverloadedEmbedder()
+		chunks = make_chunks(16, poisoned=3)
+		ids = [f"id{i}" for i in range(16)]
+
+		result = await milvus.upload_chunks(chunks, embedder, "f", ids, RetryBudget(0))
+
+		# the first batch of 8 fails as a whole, without bisection
+		self.assertEqual([e.chunk.chunk_idx for e in result.errors], list(range(8)))
+		self.assertEqual(
+			sorted(e.chunk_idx for e in milvus.inserted), list(range(8, 16))
+		)
+		self.assertEqual(embedder.calls, 2)
+
+	async def test_schema_wide_insert_error_is_raised_without_bisection(self):
+		milvus, embedder = RecordingInsert(), PoisonEmbedder()
+		calls = 0
+
+		async def upsert(data):
+			nonlocal calls
+			calls += 1
+			request = httpx.Request("POST", "http://milvus/v2/vectordb/entities/upsert")
+			body = {"code": 1100, "message": "the dim (2) is not equal to schema (8)"}
+			response = httpx.Response(200, json=body, request=request)
+			raise httpx.HTTPStatusError("upsert", request=request, response=response)
+
+		milvus.upsert = upsert
+		chunks = make_chunks(8, poisoned=-1)
+		ids = [f"id{i}" for i in range(8)]
+
+		with self.assertRaises(httpx.HTTPStatusError):
+			await milvus.upload_chunks(chunks, embedder, "f", ids, RetryBudget(0))
+		self.assertEqual(calls, 1)
+
+
+class UpsertPayloadTest(unittest.IsolatedAsyncioTestCase):
+	async def test_simhash_is_not_sent_to_milvus(self):
+		chunk = make_chunks(1, poisoned=-1)[0].model_copy(update={"simhash": "ab12"})
+		http = mock.MagicMock()
+		http.post = mock.AsyncMock(
+			return_value=httpx.Response(
+				200, json={"code": 0}, request=httpx.Request("POST", "http://milvus")
+			)
+		)
+		milvus = RecordingInsert()
+		with mock.patch.object(milvus_module, "get_milvus_http", return_value=http):
+			entities, _ = await milvus._embed_entities(
+				[chunk], ["id0"], PoisonEmbedder(), "f", RetryBudget(0)
+			)
+			await MilvusInsert.upsert(milvus, entities)
+
+		payload = http.post.call_args.args[1]
+		self.assertNotIn("simhash", payload["data"][0])
+		self.assertEqual(payload["data"][0]["chunk_id"], "id0")
+
+
+if __name__ == "__main__":
+	unittest.main()